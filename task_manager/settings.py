@@ -48,6 +48,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'tasks.middleware.CurrentUserMiddleware',
+    'tasks.middleware.ActivityBufferMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'tasks.middleware.TaskNotificationMiddleware',
@@ -139,6 +141,55 @@ LOGIN_URL = 'log_in'
 # URL where @login_prohibited redirects to
 REDIRECT_URL_WHEN_LOGGED_IN = 'dashboard'
 
+# URL names that TaskNotificationMiddleware skips, because they only redirect and never show notifications.
+# A name ending in ':' skips a whole namespace.
+NOTIFICATION_SKIP_URL_NAMES = [
+    'admin:',
+    'mark_as_seen',
+    'log_out',
+    'submit_time',
+    'reset_time',
+    'reset_team_time',
+    'remove_task',
+    'remove_member',
+    'delete_team',
+    'task_search_api',
+    'changes_api',
+    'task_assignees_api',
+    'dashboard_deadlines',
+    'dashboard_team_tasks',
+]
+
+# If this is a list, TaskNotificationMiddleware only works out notifications for these URL names
+NOTIFICATION_URL_NAMES = None
+
+# How long (in seconds) a user's notifications stay cached. The cache is also cleared when their tasks or teams change.
+# Use a shared cache backend (e.g. memcached or the database cache) in production so every process sees the same entries.
+NOTIFICATION_CACHE_TIMEOUT = 60 * 60 * 24
+
+# How many upcoming deadlines the dashboard shows at a time, "Show more" loads the same number again
+DEADLINE_SIDEBAR_SIZE = 10
+
+# How many tasks each team's tab on the dashboard shows at a time ("Load more" gets the next ones),
+# and how many members show_team lists per page
+DASHBOARD_TASKS_PAGE_SIZE = 20
+TEAM_MEMBERS_PAGE_SIZE = 5
+
+# How many tasks /api/tasks/search returns at most, and how long (in seconds) each user's results are cached.
+# Results aren't cleared from the cache when tasks change, so keep the timeout short.
+TASK_SEARCH_RESULT_LIMIT = 10
+TASK_SEARCH_CACHE_TIMEOUT = 30
+
+# How long (in seconds) rendered team pages stay cached (see tasks/team_cache.py). They stop being used as soon
+# as the team changes, this only frees the space taken by ones that won't be used again.
+TEAM_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# How many team members the task assignee picker shows at a time
+ASSIGNEE_PAGE_SIZE = 20
+
+# How many changes /api/changes returns at a time
+CHANGE_FEED_PAGE_SIZE = 500
+
 # Convert Django ERROR messages to Bootstrap DANGER messages
 MESSAGE_TAGS = {
     messages.ERROR: 'danger',
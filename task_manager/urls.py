@@ -22,6 +22,8 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('', views.home, name='home'),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/deadlines/', views.dashboard_deadlines, name='dashboard_deadlines'),
+    path('dashboard/team/<int:team_id>/tasks/', views.dashboard_team_tasks, name='dashboard_team_tasks'),
     path('dashboard/create_team', views.create_team, name = "create_team"),
     path('dashboard/show_team/<int:team_id>/', views.show_team, name = "show_team"),
     path('dashboard/show_team/<int:team_id>/user_activity_log/<int:user_id>', views.user_activity_log, name = "activity_log"),
@@ -38,6 +40,10 @@ urlpatterns = [
     path('delete-team/<int:team_id>/', views.delete_team, name='delete_team'),
     path('dashboard/view-task/submit_time/<int:team_id>/<int:task_id>/', views.submit_time, name='submit_time'),
     path('dashboard/view-task/reset_time/<int:team_id>/<int:task_id>/', views.reset_time, name='reset_time'),
+    path('dashboard/show_team/<int:team_id>/reset_time/', views.reset_team_time, name='reset_team_time'),
     path('summary_report/', views.summary_report, name='summary_report'),
+    path('api/tasks/search', views.task_search_api, name='task_search_api'),
+    path('api/changes', views.changes_api, name='changes_api'),
+    path('api/teams/<int:team_id>/tasks/<int:task_id>/assignees', views.task_assignees_api, name='task_assignees_api'),
 ]
 
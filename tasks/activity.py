@@ -0,0 +1,61 @@
+"""Writing activity events, buffered so a request saves all of its events at once."""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from tasks.models import ActivityEvent
+
+#the events logged so far in this request, set by buffered_activity (None means write straight away)
+_activity_buffer = ContextVar('activity_buffer', default=None)
+
+def log_activity(user, event_type, description, target=None, **payload):
+    """Add an entry to the user's activity log and return it.
+
+    Inside buffered_activity the event is only saved when the buffer is flushed,
+    otherwise (management commands, tests saving models directly) it is saved straight away.
+    """
+
+    event = ActivityEvent(
+        actor=user,
+        event_type=event_type,
+        description=description,
+        payload=payload,
+    )
+    if target is not None:
+        #store the id rather than the object, the target may be deleted before the buffer is saved
+        event.target_type = ContentType.objects.get_for_model(target)
+        event.target_id = target.pk
+    buffer = _activity_buffer.get()
+    if buffer is None:
+        event.save()
+    else:
+        buffer.append(event)
+    return event
+
+def flush_activity(events):
+    """Save a list of buffered events in one query and empty the list."""
+
+    if events:
+        ActivityEvent.objects.bulk_create(events)
+        events.clear()
+
+@contextmanager
+def buffered_activity():
+    """Hold back the events logged inside the block and save them together once it ends and commits.
+
+    Nested blocks share the outer buffer, so everything is saved once by the outermost block.
+    If the block raises the events are dropped, and if the transaction is rolled back they are never saved.
+    """
+
+    if _activity_buffer.get() is not None:
+        yield
+        return
+    events = []
+    token = _activity_buffer.set(events)
+    try:
+        yield
+    finally:
+        _activity_buffer.reset(token)
+    #only log changes that actually happened, straight away if there's no transaction open
+    transaction.on_commit(partial(flush_activity, events))
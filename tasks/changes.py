@@ -0,0 +1,88 @@
+"""The change journal behind /api/changes, so clients can sync only what changed since they last asked.
+
+The signals in tasks/signals.py write a Change whenever a task or team is saved or deleted, or a task's
+assigned users or a team's members change. A client keeps the cursor from its last response and asks for
+the changes after it, which is one indexed query however much data the user's teams have.
+
+Changes are for the members of their team at the time they are read. Membership changes are also for the
+user they are about, so a user removed from a team still hears about it (and should forget that team),
+and a user added to a team should load it in full, as they won't have its earlier changes.
+When a team is deleted its members are told directly, and should forget the team's tasks along with it.
+"""
+from django.db.models import Q
+from tasks.models import Change, Task
+
+def record_changes(changes):
+    """Save these Change objects in one query."""
+
+    if changes:
+        Change.objects.bulk_create(changes)
+
+def task_changed(task, action='upsert'):
+    return Change(kind='task', action=action, object_id=task.pk, team_id=task.created_by_id)
+
+def team_changed(team, action='upsert', user_id=None):
+    return Change(kind='team', action=action, object_id=team.pk, team_id=team.pk, user_id=user_id,
+                  payload={'name': team.team_name})
+
+def assignment_changed(task_id, team_id, user_id, action):
+    return Change(kind='assignment', action=action, object_id=task_id, team_id=team_id, user_id=user_id)
+
+def membership_changed(team_id, user_id, action):
+    return Change(kind='membership', action=action, object_id=team_id, team_id=team_id, user_id=user_id)
+
+def latest_cursor():
+    return Change.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+def changes_since(user, since, limit):
+    """Return (changes, cursor, has_more): up to limit of the changes for the user after the cursor, as dicts.
+
+    Several changes to the same thing (e.g. a task edited twice) only give the latest one, with the task
+    as it is now. The returned cursor is the one to ask with next time.
+    """
+
+    entries = list(
+        Change.objects.filter(Q(team__in=user.teams.all()) | Q(user=user), id__gt=since)
+        .order_by('id')[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    cursor = entries[-1].id if entries else since
+    latest = {}
+    for entry in entries:
+        key = (entry.kind, entry.object_id, entry.user_id if entry.kind in ('assignment', 'membership') else None)
+        #moving the key to the end keeps the changes in the order they last happened
+        latest.pop(key, None)
+        latest[key] = entry
+    tasks = Task.objects.in_bulk([entry.object_id for entry in latest.values() if entry.kind == 'task' and entry.action == 'upsert'])
+    return [serialize_change(entry, tasks) for entry in latest.values()], cursor, has_more
+
+def serialize_change(entry, tasks):
+    change = {'cursor': entry.id, 'type': entry.kind, 'action': entry.action, 'team': entry.team_id}
+    if entry.kind == 'task':
+        task = tasks.get(entry.object_id)
+        change['id'] = entry.object_id
+        if task is None:
+            #deleted since, its tombstone comes in a later page
+            change['action'] = 'delete'
+        elif entry.action == 'upsert':
+            change['task'] = {
+                'id': task.id,
+                'title': task.title,
+                'description': task.description,
+                'due_date': task.due_date.isoformat(),
+                'priority': task.priority,
+                'completed': task.task_completed,
+                'team': task.created_by_id,
+                'updated_at': task.updated_at.isoformat(),
+            }
+    elif entry.kind == 'team':
+        change['id'] = entry.object_id
+        if entry.action == 'upsert':
+            change['name'] = entry.payload.get('name')
+    elif entry.kind == 'assignment':
+        change['task'] = entry.object_id
+        change['user'] = entry.user_id
+    else:
+        change['user'] = entry.user_id
+    return change
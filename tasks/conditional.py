@@ -0,0 +1,75 @@
+"""ETags for the dashboard, show_team and view_task, so unchanged pages get 304 Not Modified.
+
+An ETag is a hash of what the page shows:
+- the latest updated_at of the teams and tasks on it, plus how many there are (so deletions count too)
+- on a task's page, the time spent on it and its latest time log
+- the user and their notifications
+- the query string
+- today's date (tasks become overdue)
+- the CSRF secret (the pages have forms)
+
+updated_at is set whenever a team or task is saved, and is touched by the signals in tasks/signals.py
+when members or assignments change. Pages with flash messages waiting get no ETag, as those are only shown once.
+Only ETags are used (no Last-Modified), as a time alone can't tell that a task was deleted.
+"""
+import hashlib
+from datetime import date
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+from tasks.models import Task, Team, TimeLog, TimeSpent
+
+def page_etag(request, *state):
+    """Return the ETag of a page for the current user showing this state, or None if it shouldn't have one."""
+
+    user = request.user
+    if not user.is_authenticated or len(get_messages(request)):
+        return None
+    notifications = request.notifications_list
+    parts = [
+        user.pk, user.username, user.email, user.first_name, user.last_name,
+        list(notifications) if notifications else None,
+        request.GET.urlencode(), request.META.get('CSRF_COOKIE'), date.today().isoformat(), *state,
+    ]
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+def dashboard_etag(request):
+    """The user's teams and all of their tasks, in one query."""
+
+    if not request.user.is_authenticated:
+        return None
+    state = request.user.teams.aggregate(
+        teams=Count('id', distinct=True), teams_updated=Max('updated_at'),
+        tasks=Count('task'), tasks_updated=Max('task__updated_at'),
+    )
+    #the tab shown first comes from a cookie
+    return page_etag(request, sorted(state.items()), request.COOKIES.get('active_team'))
+
+def show_team_etag(request, team_id):
+    """The team, which is touched when its members change."""
+
+    team_updated = Team.objects.filter(pk=team_id).values_list('updated_at', flat=True).first()
+    if team_updated is None:
+        #the view redirects with a message
+        return None
+    return page_etag(request, team_id, team_updated)
+
+def view_task_etag(request, team_id=1, task_id=1):
+    """The task, its team's members and the time spent on it, in one query.
+
+    The page shows each member's time, which a total alone misses (e.g. one user's time reset as another's
+    is added), so the latest time log and how many there are count too: adding time logs it and resetting deletes logs.
+    """
+
+    time_spent = TimeSpent.objects.filter(task=OuterRef('pk')).values('task').annotate(total=Sum('time_spent')).values('total')
+    time_logs = TimeLog.objects.filter(task=OuterRef('pk')).values('task').annotate(
+        latest=Max('id'), count=Count('id'))
+    state = Task.objects.filter(pk=task_id, created_by=team_id).annotate(
+        team_updated=Subquery(Team.objects.filter(pk=team_id).values('updated_at')),
+        time_spent=Subquery(time_spent),
+        latest_time_log=Subquery(time_logs.values('latest')),
+        time_logs=Subquery(time_logs.values('count')),
+    ).values_list('updated_at', 'team_updated', 'time_spent', 'latest_time_log', 'time_logs').first()
+    if state is None or state[1] is None:
+        #the view redirects with a message
+        return None
+    return page_etag(request, team_id, task_id, state)
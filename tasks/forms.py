@@ -3,8 +3,10 @@ from django import forms
 from django.contrib import messages
 from django.contrib.auth import authenticate
 from django.core.validators import RegexValidator
-from .models import User, Task, Team, TimeSpent, TimeLog
-from datetime import date, timedelta, datetime
+from django.db import transaction
+from django.utils import timezone
+from .models import User, Task, Team, TimeSpent, TimeLog, ActivityEvent
+from datetime import date, timedelta, datetime, time
 
 class LogInForm(forms.Form):
     """Form enabling registered users to log in."""
@@ -204,7 +206,10 @@ class EditTaskForm(forms.ModelForm):
     def save(self, old_task):
         task = super().save(commit=False)
         task.id = old_task.id
+        #this is a new instance for the same row, so compare changes to what old_task was loaded with
+        task.track_changes_from(old_task)
         task.created_by = old_task.created_by
+        task.created_at = old_task.created_at
         task.task_completed = old_task.task_completed
         if old_task.due_date < date.today():
             task.due_date = old_task.due_date
@@ -212,39 +217,55 @@ class EditTaskForm(forms.ModelForm):
         return task
 
 class AssignTaskForm(forms.Form):
+    """Form to assign team members to a task and unassign others.
+
+    Only the change is sent: usernames are the members to assign and remove_usernames the users to unassign
+    (picked from task_assignees_api), so checking and saving it doesn't depend on how big the team is.
+    """
     usernames = forms.ModelMultipleChoiceField(
         queryset=None,
         to_field_name='username',
-        widget=forms.CheckboxSelectMultiple,
+        widget=forms.MultipleHiddenInput,
+        required=False,
+    )
+    remove_usernames = forms.ModelMultipleChoiceField(
+        queryset=User.objects.all(),
+        to_field_name='username',
+        widget=forms.MultipleHiddenInput,
         required=False,
     )
 
     def __init__(self, specific_team, specific_task, *args, **kwargs):
         super(AssignTaskForm, self).__init__(*args, **kwargs)
+        #only members of the team can be assigned, anyone can be unassigned (e.g. after leaving the team)
         self.fields['usernames'].queryset = specific_team.members.all()
 
-        assigned_users = specific_task.assigned_to.all()
-        self.initial['usernames'] = [user.username for user in assigned_users]
-
-    def get_assigned_users(self, specific_task):
-        return specific_task.assigned_to.all()
+    def clean(self):
+        cleaned_data = super().clean()
+        both = set(cleaned_data.get('usernames') or ()) & set(cleaned_data.get('remove_usernames') or ())
+        if both:
+            raise forms.ValidationError(f"Can't assign and unassign {', '.join(sorted(user.username for user in both))} at once.")
+        return cleaned_data
 
     def save(self, task):
-        original_users = set(task.assigned_to.all())
-        #task.assigned_to.clear()
-        selected_users = self.cleaned_data['usernames']
-        #task.assigned_to.add(*selected_users)
-
-        #remove users not in the final assignment
-        for user in task.assigned_to.all():
-            if user not in selected_users:
-                task.assigned_to.remove(user)
-
-        new_users = set(selected_users) - original_users
-        removed_users = original_users - set(selected_users)
-        task.assigned_to.add(*new_users) #add the new users
-
-        return (list(new_users), list(removed_users))
+        """Assign and unassign the chosen users, returning (added, removed) without the ones that already were.
+
+        Only the chosen users' assignments are read, and the change is one delete and one insert in a transaction,
+        so the assigned_to signals (activity log, reminders, caches) run once with every user removed or added.
+        """
+        chosen_users = [*self.cleaned_data['usernames'], *self.cleaned_data['remove_usernames']]
+        if not chosen_users:
+            return ([], [])
+        with transaction.atomic():
+            assigned_ids = set(Task.assigned_to.through.objects.filter(task=task, user__in=chosen_users).values_list('user_id', flat=True))
+            new_users = [user for user in self.cleaned_data['usernames'] if user.pk not in assigned_ids]
+            removed_users = [user for user in self.cleaned_data['remove_usernames'] if user.pk in assigned_ids]
+            if removed_users:
+                task.assigned_to.remove(*removed_users)
+            if new_users:
+                task.assigned_to.add(*new_users)
+
+        return (sorted(new_users, key=lambda user: user.username), sorted(removed_users, key=lambda user: user.username))
 
 class SubmitTimeForm(forms.Form):
     class Meta:
@@ -268,25 +289,48 @@ class SubmitTimeForm(forms.Form):
     def save(self, user, task):
         total_seconds = self.cleaned_hours * 3600 + self.cleaned_minutes * 60 + self.cleaned_seconds
         
-        # Get or create time spent instance of user on a task
-        user_time_spent, created = TimeSpent.objects.get_or_create(
-            user=user,
-            task=task,
-            defaults={'time_spent': total_seconds}
-        )
+        # Add the time and log the entry together, so the log always matches the total
+        with transaction.atomic():
+            TimeSpent.add_time(user, task, total_seconds)
+            TimeLog.objects.create(
+                user=user,
+                task=task,
+                logged_time=total_seconds,
+                timestamp=datetime.now()
+            )
 
-        # Update instance if found in database
-        if not created:
-            user_time_spent.time_spent += total_seconds
-        
-        user_time_spent.save()
-
-        # Log the entry with a specific timestamp
-        TimeLog.objects.create(
-            user=user,
-            task=task,
-            logged_time=total_seconds,
-            timestamp=datetime.now()
-        )
+        return task
+
+
+class ActivityLogFilterForm(forms.Form):
+    """Form for filtering a user's activity log by date and event type."""
+
+    date_from = forms.DateField(required=False, label='From',
+                                widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+    date_to = forms.DateField(required=False, label='To',
+                              widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+    event_type = forms.ChoiceField(required=False, label='Event',
+                                   choices=[('', 'All events')] + ActivityEvent.EVENT_TYPE_CHOICES,
+                                   widget=forms.Select(attrs={'class': 'form-control'}))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get('date_from')
+        date_to = cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            self.add_error('date_to', "The end date cannot be before the start date.")
+        return cleaned_data
 
-        return task
\ No newline at end of file
+    def filter(self, events):
+        """Return the events matching the form, the dates include the whole day in the current time zone."""
+
+        date_from = self.cleaned_data.get('date_from')
+        date_to = self.cleaned_data.get('date_to')
+        event_type = self.cleaned_data.get('event_type')
+        if date_from:
+            events = events.filter(timestamp__gte=timezone.make_aware(datetime.combine(date_from, time.min)))
+        if date_to:
+            events = events.filter(timestamp__lt=timezone.make_aware(datetime.combine(date_to + timedelta(1), time.min)))
+        if event_type:
+            events = events.filter(event_type=event_type)
+        return events
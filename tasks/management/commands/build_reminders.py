@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from tasks.notifications import build_reminders
+
+class Command(BaseCommand):
+    """Rebuild the reminder inbox of every user."""
+
+    help = 'Rebuilds the reminder inbox used for notifications. Schedule this to run once a day, just after midnight.'
+
+    def handle(self, *args, **options):
+        reminder_count = build_reminders()
+        self.stdout.write(f"Built {reminder_count} reminders.")
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from tasks.notifications import notification_cache_stats, reset_notification_cache_stats
+
+class Command(BaseCommand):
+    """Show how often notifications are served from the cache."""
+
+    help = 'Prints the notification cache hits, misses and hit ratio'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them')
+
+    def handle(self, *args, **options):
+        stats = notification_cache_stats()
+        self.stdout.write(f"Hits: {stats['hits']}")
+        self.stdout.write(f"Misses: {stats['misses']}")
+        self.stdout.write(f"Hit ratio: {stats['hit_ratio']:.1%}")
+        if options['reset']:
+            reset_notification_cache_stats()
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from tasks.search import fts_enabled, rebuild_search_index
+
+class Command(BaseCommand):
+    """Rebuild the full-text search table for tasks."""
+
+    help = 'Rebuilds the full-text task search table, e.g. after tasks were changed with QuerySet.update().'
+
+    def handle(self, *args, **options):
+        if not fts_enabled():
+            self.stdout.write("Full-text search isn't available on this database, tasks are searched with LIKE.")
+            return
+        task_count = rebuild_search_index()
+        self.stdout.write(f"Indexed {task_count} tasks.")
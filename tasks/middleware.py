@@ -1,40 +1,86 @@
-from django.shortcuts import render
-from .models import Task
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+from tasks.activity import buffered_activity
+from tasks.notifications import get_cached_notifications
+
+#the user whose actions are being logged, set per request by CurrentUserMiddleware
+_current_user = ContextVar('current_user', default=None)
+
+def get_current_user():
+    """Return the logged in user making the current request (or set with acting_as), otherwise None."""
+
+    user = _current_user.get()
+    if user is not None and user.is_authenticated:
+        return user
+    return None
+
+@contextmanager
+def acting_as(user):
+    """Set the user that signal handlers log actions for, e.g. in management commands and tests."""
+
+    token = _current_user.set(user)
+    try:
+        yield user
+    finally:
+        _current_user.reset(token)
+
+class CurrentUserMiddleware:
+    """Makes request.user available to the signal handlers. Must come after AuthenticationMiddleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with acting_as(request.user):
+            return self.get_response(request)
+
+class ActivityBufferMiddleware:
+    """Saves all the activity events logged during a request in one query once the response is ready and committed."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with buffered_activity():
+            return self.get_response(request)
 
 class TaskNotificationMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        request.notifications_list = self.get_notifications(request.user)
+        #only query the database when a view or template actually reads the notifications
+        request.notifications_list = SimpleLazyObject(lambda: self.get_notifications(request.user))
         response = self.get_response(request)
         return response
 
-    def key_for_sorting(self, notification_and_task):
-        priority_map = {'high': 1, 'medium': 2, 'low': 3}
-        task_id = notification_and_task[1]
-        return priority_map[Task.objects.get(pk=task_id).priority]
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        #routes that never show the notifications (redirects, admin...) don't get any
+        if self.is_skipped(request.resolver_match):
+            request.notifications_list = None
+
+    def is_skipped(self, resolver_match):
+        """Return True if notifications should not be worked out for this route.
+
+        Entries in NOTIFICATION_URL_NAMES / NOTIFICATION_SKIP_URL_NAMES are URL names,
+        or a namespace followed by ':' to match every URL in that namespace (e.g. 'admin:').
+        """
+
+        allowed = getattr(settings, 'NOTIFICATION_URL_NAMES', None)
+        skipped = getattr(settings, 'NOTIFICATION_SKIP_URL_NAMES', [])
+        if allowed is not None:
+            return not self.matches(resolver_match, allowed)
+        return self.matches(resolver_match, skipped)
+
+    def matches(self, resolver_match, url_names):
+        if resolver_match is None:
+            return False
+        return resolver_match.view_name in url_names or any(
+            name.endswith(':') and resolver_match.view_name.startswith(name) for name in url_names
+        )
 
     def get_notifications(self, user):
-        notifications = []
-        if user.is_authenticated:
-            teams = user.teams.all()
-        
-            for team in teams:
-                tasks_for_each_team = Task.objects.filter(created_by=team)
-                for task in tasks_for_each_team:
-                    if not task.seen and task.is_high_priority_due_soon() and user in task.assigned_to.all():
-                        message = f"<strong>REMINDER:</strong> <span style='color: red;'> <strong>High</strong> </span> priority task '{task.title}' is due on {task.due_date}."
-                        notifications.append((message, task.id))
-                    elif not task.seen and task.is_other_priority_due_soon() and user in task.assigned_to.all():
-                        if task.priority == "medium":
-                            message = f"<strong>REMINDER:</strong> <span style='color: yellow;'> <strong>Medium</strong> </span> priority task '{task.title}' is due on {task.due_date}."
-                        else:
-                            message = f"<strong>REMINDER:</strong> <span style='color: green;'> <strong>Low</strong> </span> priority task '{task.title}' is due on {task.due_date}."
-                        notifications.append((message, task.id))
-
-            notifications = sorted(notifications, key=self.key_for_sorting)
-
-            return notifications
-        
-        return None
\ No newline at end of file
+        #all the filtering and sorting is done in one query, and cached per user, see tasks/notifications.py
+        return get_cached_notifications(user)
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.6 on 2026-10-18 03:08
+
+from datetime import date, timedelta
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_reminders(apps, schema_editor):
+    """Fill the inbox for existing tasks (the same thing manage.py build_reminders does)."""
+    Task = apps.get_model('tasks', 'Task')
+    Reminder = apps.get_model('tasks', 'Reminder')
+    ranks = {'high': 1, 'medium': 2, 'low': 3}
+    assignments = Task.assigned_to.through.objects.filter(
+        task__task_completed=False,
+        task__reminder_days__isnull=False,
+        task__priority__in=list(ranks),
+        task__due_date__gte=date.today(),
+    ).values_list('user_id', 'task_id', 'task__priority', 'task__due_date', 'task__reminder_days', 'task__seen')
+    Reminder.objects.bulk_create([
+        Reminder(user_id=user_id, task_id=task_id, priority=ranks[priority], due_date=due_date,
+                 remind_from=due_date - timedelta(days=min(reminder_days, (due_date - date.min).days)), seen=seen)
+        for user_id, task_id, priority, due_date, reminder_days, seen in assignments
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0025_alter_task_reminder_days'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('priority', models.PositiveSmallIntegerField()),
+                ('remind_from', models.DateField()),
+                ('due_date', models.DateField()),
+                ('seen', models.BooleanField(default=False)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='tasks.task')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'seen', 'priority'], name='reminder_inbox_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='reminder',
+            constraint=models.UniqueConstraint(fields=('user', 'task'), name='unique_reminder_per_user_and_task'),
+        ),
+        migrations.RunPython(fill_reminders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 4.2.6 on 2026-10-18 03:13
+
+from datetime import datetime
+import re
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+import django.utils.timezone
+
+LOG_TIME_FORMAT = "%d/%m/%Y, %H:%M:%S"
+
+# Work out the event type of an old log entry from its message
+EVENT_TYPE_PATTERNS = [
+    (r' has logged in$', 'logged_in'),
+    (r' has logged out$', 'logged_out'),
+    (r' signed up$', 'signed_up'),
+    (r' edited their user details$', 'user_edited'),
+    (r' created a new task with title ', 'task_created'),
+    (r" (changed|updated) task '| marked '", 'task_edited'),
+    (r' deleted task ', 'task_deleted'),
+    (r' created a new team ', 'team_created'),
+    (r' deleted team ', 'team_deleted'),
+    (r' assigned .* to the task ', 'user_assigned'),
+    (r' removed .* from the task ', 'user_unassigned'),
+    (r" added .* to '", 'member_added'),
+    (r" removed .* from '", 'member_removed'),
+]
+
+
+def event_type_for(description):
+    for pattern, event_type in EVENT_TYPE_PATTERNS:
+        if re.search(pattern, description):
+            return event_type
+    return 'other'
+
+
+def parse_log_time(value):
+    try:
+        return timezone.make_aware(datetime.strptime(value, LOG_TIME_FORMAT))
+    except (TypeError, ValueError):
+        return timezone.now()
+
+
+def explode_activity_logs(apps, schema_editor):
+    """Turn every entry of the old JSON activity logs into its own ActivityEvent row."""
+    Activity_Log = apps.get_model('tasks', 'Activity_Log')
+    ActivityEvent = apps.get_model('tasks', 'ActivityEvent')
+    events = []
+    for activity_log in Activity_Log.objects.exclude(user=None).iterator():
+        for description, logged_at in activity_log.log:
+            events.append(ActivityEvent(
+                actor_id=activity_log.user_id,
+                event_type=event_type_for(description),
+                description=description[:500],
+                timestamp=parse_log_time(logged_at),
+            ))
+    ActivityEvent.objects.bulk_create(events, batch_size=500)
+
+
+def rebuild_activity_logs(apps, schema_editor):
+    """Put the events back into one JSON log per user."""
+    Activity_Log = apps.get_model('tasks', 'Activity_Log')
+    ActivityEvent = apps.get_model('tasks', 'ActivityEvent')
+    logs = {}
+    for event in ActivityEvent.objects.order_by('timestamp', 'id').iterator():
+        logged_at = timezone.localtime(event.timestamp).strftime(LOG_TIME_FORMAT)
+        logs.setdefault(event.actor_id, []).append((event.description, logged_at))
+    Activity_Log.objects.bulk_create([Activity_Log(user_id=user_id, log=log) for user_id, log in logs.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('tasks', '0027_reminder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('signed_up', 'Signed up'), ('user_edited', 'Edited user details'), ('logged_in', 'Logged in'), ('logged_out', 'Logged out'), ('task_created', 'Created a task'), ('task_edited', 'Edited a task'), ('task_deleted', 'Deleted a task'), ('team_created', 'Created a team'), ('team_deleted', 'Deleted a team'), ('member_added', 'Added a team member'), ('member_removed', 'Removed a team member'), ('user_assigned', 'Assigned a user to a task'), ('user_unassigned', 'Removed a user from a task'), ('other', 'Other')], max_length=20)),
+                ('description', models.CharField(max_length=500)),
+                ('target_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_events', to=settings.AUTH_USER_MODEL)),
+                ('target_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='contenttypes.contenttype')),
+            ],
+        ),
+        migrations.RunPython(explode_activity_logs, rebuild_activity_logs),
+        migrations.DeleteModel(
+            name='Activity_Log',
+        ),
+        migrations.AddIndex(
+            model_name='activityevent',
+            index=models.Index(fields=['actor', 'timestamp'], name='activity_actor_time_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.6 on 2026-10-18 03:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0028_activityevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activityevent',
+            index=models.Index(fields=['actor', 'event_type', 'timestamp'], name='activity_actor_type_time_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations, OperationalError
+
+FTS_TABLE = 'tasks_task_fts'
+
+
+def create_search_table(apps, schema_editor):
+    # Full-text search needs SQLite with FTS5, other databases search with LIKE instead (see tasks/search.py)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(title, description, "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+    except OperationalError:
+        # SQLite was built without FTS5
+        return
+    schema_editor.execute(f"INSERT INTO {FTS_TABLE} (rowid, title, description) SELECT id, title, description FROM tasks_task")
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0029_activityevent_type_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.6 on 2026-10-18 03:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0030_task_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['created_by', 'task_completed', 'due_date'], name='task_deadline_idx'),
+        ),
+    ]
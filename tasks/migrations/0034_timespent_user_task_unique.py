@@ -0,0 +1,31 @@
+# Generated by Django 4.2.6 on 2026-10-18 05:40
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_time_spent(apps, schema_editor):
+    """Add up the time of any users with several rows for the same task into their first row."""
+    TimeSpent = apps.get_model('tasks', 'TimeSpent')
+    duplicates = (TimeSpent.objects.values('user_id', 'task_id')
+                  .annotate(rows=Count('id'), first_id=Min('id'), total=Sum('time_spent'))
+                  .filter(rows__gt=1))
+    for duplicate in duplicates:
+        rows = TimeSpent.objects.filter(user_id=duplicate['user_id'], task_id=duplicate['task_id'])
+        rows.filter(pk=duplicate['first_id']).update(time_spent=duplicate['total'] or 0)
+        rows.exclude(pk=duplicate['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0033_change_journal'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_time_spent, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='timespent',
+            constraint=models.UniqueConstraint(fields=('user', 'task'), name='timespent_user_task_unique'),
+        ),
+    ]
@@ -1,6 +1,11 @@
 from django.core.validators import RegexValidator, MinValueValidator
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Sum, When, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 import datetime
 from datetime import date, datetime, timedelta
 from libgravatar import Gravatar
@@ -55,13 +60,118 @@ class User(AbstractUser):
         return self.gravatar(size=60)
 
 
-class Task(models.Model):
+class TrackChangesMixin:
+    """Remembers the values of tracked_fields an instance was loaded with,
+    so changes can be found without reading the row again (e.g. in pre_save signals).
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        #field_names are column attributes, e.g. admin_user_id for admin_user
+        names = {field.attname: field.name for field in cls._meta.concrete_fields}
+        instance._loaded_values = {
+            names[attname]: value for attname, value in zip(field_names, values)
+            if names[attname] in cls.tracked_fields and value is not models.DEFERRED
+        }
+        return instance
+
+    def loaded_value(self, field_name, default=None):
+        """Return the value a field had when the instance was loaded (or last saved),
+        or default if it wasn't loaded (e.g. deferred with only() or defer()).
+        """
+
+        return getattr(self, '_loaded_values', {}).get(field_name, default)
+
+    def changed_fields(self, fields=None):
+        """Return {field name: (old value, new value)} for the tracked fields that have changed.
+
+        New instances, and ones not loaded from the database, have no changes.
+        Values are compared after cleaning, so 'True' and True are the same.
+        """
+
+        loaded_values = getattr(self, '_loaded_values', {})
+        changes = {}
+        for name in (fields if fields is not None else self.tracked_fields):
+            if name not in loaded_values:
+                continue
+            field = self._meta.get_field(name)
+            new_value = field.to_python(getattr(self, field.attname))
+            if loaded_values[name] != new_value:
+                changes[name] = (loaded_values[name], new_value)
+        return changes
+
+    def is_tracking(self, fields):
+        """Return True if the loaded values of all these fields are known."""
+
+        return all(name in getattr(self, '_loaded_values', {}) for name in fields)
+
+    def track_changes_from(self, instance):
+        """Compare against the values another instance of the same row was loaded with,
+        e.g. when a form builds a new instance for an existing row.
+        """
+
+        self._loaded_values = dict(getattr(instance, '_loaded_values', {}))
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        #the saved values are what's in the database now
+        update_fields = kwargs.get('update_fields')
+        self._snapshot(update_fields if update_fields is not None else self.tracked_fields)
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self._snapshot(fields if fields is not None else self.tracked_fields)
+
+    def _snapshot(self, fields):
+        if not hasattr(self, '_loaded_values'):
+            self._loaded_values = {}
+        deferred = self.get_deferred_fields()
+        for name in fields:
+            if name in self.tracked_fields and name not in deferred:
+                field = self._meta.get_field(name)
+                self._loaded_values[name] = field.to_python(getattr(self, field.attname))
+
+
+class TimestampedModel(models.Model):
+    """Abstract model with created_at and updated_at times, updated_at is set on every save.
+
+    updated_at is saved even when save() is given update_fields. QuerySet.update() doesn't set it,
+    so use touch() for changes made without saving (e.g. to many-to-many fields).
+    """
+    #defaults rather than auto_now, so fixtures (which don't call save()) get them too
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    updated_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        self.updated_at = timezone.now()
+        update_fields = kwargs.get('update_fields')
+        if update_fields:
+            kwargs['update_fields'] = {*update_fields, 'updated_at'}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def touch(cls, pks):
+        """Set updated_at to now on these rows."""
+
+        pks = list(pks)
+        if pks:
+            cls.objects.filter(pk__in=pks).update(updated_at=timezone.now())
+
+
+class Task(TrackChangesMixin, TimestampedModel):
     """Model used for task creation, and assignment on team members"""
     PRIORITY_CHOICES = [
         ('low', 'Low'),
         ('medium', 'Medium'),
         ('high', 'High'),
     ]
+    #order used when sorting by priority, most urgent first
+    PRIORITY_RANKS = {'high': 1, 'medium': 2, 'low': 3}
     reminder_days = models.IntegerField(default=0, null=True, blank=True)
     
     title = models.CharField(max_length=30, blank=False)
@@ -73,6 +183,17 @@ class Task(models.Model):
     task_completed = models.BooleanField(default=False)
     seen = models.BooleanField(default=False)
 
+    tracked_fields = ('title', 'description', 'due_date', 'priority', 'reminder_days', 'task_completed', 'seen')
+
+    @staticmethod
+    def priority_rank():
+        """Return an expression ranking tasks by priority (high first), so it can be sorted in the database."""
+
+        return Case(
+            *[When(priority=priority, then=Value(rank)) for priority, rank in Task.PRIORITY_RANKS.items()],
+            default=Value(Task.PRIORITY_RANKS['low']),
+            output_field=models.IntegerField(),
+        )
 
     def is_high_priority_due_soon(self):
         today = date.today()
@@ -88,21 +209,131 @@ class Task(models.Model):
         return (self.reminder_days is not None and (self.priority == "medium" or self.priority == "low") and self.due_date >= today and self.due_date < due_remind_date  and self.task_completed==False
     )
 
+    class Meta:
+        """Model options."""
+
+        indexes = [
+            #for the dashboard's upcoming deadlines
+            models.Index(fields=['created_by', 'task_completed', 'due_date'], name='task_deadline_idx'),
+            #for the latest change to a team's tasks (see tasks/conditional.py)
+            models.Index(fields=['created_by', 'updated_at'], name='task_team_updated_idx'),
+        ]
 
-class Team(models.Model):
+
+class Team(TrackChangesMixin, TimestampedModel):
     """Model used to represent a team"""
     team_name = models.CharField(max_length=50, blank=False)
     admin_user = models.ForeignKey(User, on_delete = models.CASCADE, blank = False, null = True)
     members = models.ManyToManyField(User, related_name ='membership', blank=True)
 
+    tracked_fields = ('team_name', 'admin_user')
+
     def __str__(self):
         return self.team_name
     
 
-class Activity_Log(models.Model):
-    """Model used to store an activity log"""
-    log = models.JSONField('log', null=False, default=list)
-    user = models.ForeignKey(User, on_delete=models.CASCADE, null = True)
+class ActivityEvent(models.Model):
+    """Model used to store one entry in a user's activity log"""
+    EVENT_TYPE_CHOICES = [
+        ('signed_up', 'Signed up'),
+        ('user_edited', 'Edited user details'),
+        ('logged_in', 'Logged in'),
+        ('logged_out', 'Logged out'),
+        ('task_created', 'Created a task'),
+        ('task_edited', 'Edited a task'),
+        ('task_deleted', 'Deleted a task'),
+        ('team_created', 'Created a team'),
+        ('team_deleted', 'Deleted a team'),
+        ('member_added', 'Added a team member'),
+        ('member_removed', 'Removed a team member'),
+        ('user_assigned', 'Assigned a user to a task'),
+        ('user_unassigned', 'Removed a user from a task'),
+        ('other', 'Other'),
+    ]
+    actor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activity_events')
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPE_CHOICES)
+    description = models.CharField(max_length=500)
+    # What the event happened to, e.g. the task that was edited (may since have been deleted)
+    target_type = models.ForeignKey(ContentType, on_delete=models.SET_NULL, null=True, blank=True)
+    target_id = models.PositiveBigIntegerField(null=True, blank=True)
+    target = GenericForeignKey('target_type', 'target_id')
+    payload = models.JSONField(default=dict, blank=True)
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        """Model options."""
+
+        indexes = [
+            models.Index(fields=['actor', 'timestamp'], name='activity_actor_time_idx'),
+            #for the activity log's event type filter
+            models.Index(fields=['actor', 'event_type', 'timestamp'], name='activity_actor_type_time_idx'),
+        ]
+
+    def __str__(self):
+        return self.description
+
+
+class Change(models.Model):
+    """Model used to store one entry in the change journal read by /api/changes (see tasks/changes.py).
+
+    The id is the sync cursor: it only ever goes up (SQLite AUTOINCREMENT), so clients ask for the
+    changes after the last id they saw. team and user aren't real foreign keys, so the entries
+    (e.g. the tombstones of deleted teams) outlive what they point to.
+    """
+    KIND_CHOICES = [
+        ('task', 'Task'),
+        ('team', 'Team'),
+        ('assignment', 'Task assignment'),
+        ('membership', 'Team membership'),
+    ]
+    ACTION_CHOICES = [
+        ('upsert', 'Created or updated'),
+        ('delete', 'Deleted'),
+        ('add', 'Added'),
+        ('remove', 'Removed'),
+    ]
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    # The task or team that changed (for assignments the task, for memberships the team)
+    object_id = models.PositiveBigIntegerField()
+    # Whose members see this change
+    team = models.ForeignKey(Team, on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='+')
+    # The user this change is also for, even once they aren't in the team (e.g. being removed from it)
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='+')
+    payload = models.JSONField(default=dict, blank=True)
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        """Model options."""
+
+        indexes = [
+            models.Index(fields=['team', 'id'], name='change_team_idx'),
+            models.Index(fields=['user', 'id'], name='change_user_idx'),
+        ]
+
+
+class Reminder(models.Model):
+    """Model used to store the reminders in a user's notification inbox.
+
+    There is a row for every incomplete task with a reminder that is assigned to the user.
+    The notifications shown are the rows whose reminder window (remind_from to due_date) contains today.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reminders')
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='reminders')
+    priority = models.PositiveSmallIntegerField() # Task.PRIORITY_RANKS value, so it sorts most urgent first
+    remind_from = models.DateField()
+    due_date = models.DateField()
+    seen = models.BooleanField(default=False)
+
+    class Meta:
+        """Model options."""
+
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'task'], name='unique_reminder_per_user_and_task'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'seen', 'priority'], name='reminder_inbox_idx'),
+        ]
 
 
 class TimeSpent(models.Model):
@@ -111,7 +342,57 @@ class TimeSpent(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE)
     time_spent = models.BigIntegerField(default=0, null=True, validators=[MinValueValidator(0)]) # Specific time spent for each user
 
-class TimeLog(models.Model):
+    class Meta:
+        constraints = [
+            #one row per user and task, so time is always added to the same row (see SubmitTimeForm.save)
+            models.UniqueConstraint(fields=['user', 'task'], name='timespent_user_task_unique'),
+        ]
+
+    @classmethod
+    def add_time(cls, user, task, seconds):
+        """Add seconds to the user's time on the task, creating their row if needed, without losing concurrent additions.
+
+        The addition is done by the database (time_spent = time_spent + seconds), and if two requests both try
+        to create the row, the unique constraint stops the second one, which then adds to the first one's row.
+        """
+
+        add = {'time_spent': Coalesce(models.F('time_spent'), 0) + seconds}
+        with transaction.atomic():
+            if cls.objects.filter(user=user, task=task).update(**add):
+                return
+            try:
+                with transaction.atomic():
+                    cls.objects.create(user=user, task=task, time_spent=seconds)
+            except IntegrityError:
+                cls.objects.filter(user=user, task=task).update(**add)
+
+    @classmethod
+    def reset(cls, tasks, user=None):
+        """Set the time spent on these tasks (by the user, or by everyone) back to 0 and delete their time logs.
+
+        tasks can be a list of tasks or ids, or a queryset (used as a subquery). This is one UPDATE and one DELETE
+        in a transaction, however many tasks and users there are.
+        """
+
+        time_spent = cls.objects.filter(task__in=tasks)
+        time_logs = TimeLog.objects.filter(task__in=tasks)
+        if user is not None:
+            time_spent = time_spent.filter(user=user)
+            time_logs = time_logs.filter(user=user)
+        with transaction.atomic():
+            time_spent.update(time_spent=0)
+            time_logs.delete()
+
+    @classmethod
+    def time_by_member(cls, task):
+        """Return the time each user has spent on the task (most first), summed in one grouped query."""
+
+        return (cls.objects.filter(task=task)
+                .values('user_id', 'user__username', 'user__first_name', 'user__last_name')
+                .annotate(total=Coalesce(Sum('time_spent'), 0))
+                .order_by('-total', 'user__username'))
+
+class TimeLog(TimestampedModel):
     """Model used to log time spent on tasks after every update"""
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     task = models.ForeignKey(Task, on_delete=models.CASCADE)
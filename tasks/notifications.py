@@ -0,0 +1,158 @@
+"""Reminder notifications for tasks that are due soon."""
+from datetime import date, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from tasks.models import Task, Reminder
+
+PRIORITY_COLOURS = {'high': 'red', 'medium': 'yellow', 'low': 'green'}
+CACHE_HITS_KEY = 'notifications:hits'
+CACHE_MISSES_KEY = 'notifications:misses'
+#the Task fields a reminder is worked out from, or that are shown in the notification
+REMINDER_FIELDS = ('title', 'priority', 'due_date', 'reminder_days', 'task_completed', 'seen')
+
+def due_soon_reminders(user, today=None):
+    """Return the unseen reminders in the user's inbox whose reminder window contains today.
+
+    This is one indexed query on the Reminder table, no matter how many teams or tasks the user has.
+    """
+
+    if today is None:
+        today = date.today()
+    return (
+        Reminder.objects
+        .filter(
+            user=user,
+            seen=False,
+            remind_from__lte=today,
+            due_date__gte=today,
+            task__created_by__in=user.teams.all(),
+        )
+        #tasks with the same priority keep the order of their team, then the order they were created in
+        .order_by('priority', 'task__created_by', 'task_id')
+        .select_related('task')
+        .only('task__id', 'task__title', 'task__due_date', 'task__priority')
+    )
+
+def remind_from_date(due_date, reminder_days):
+    """Return the first day a task should be reminded about."""
+
+    #stop huge reminder_days going past the earliest possible date
+    return due_date - timedelta(days=min(reminder_days, (due_date - date.min).days))
+
+def new_reminders(assignments, today=None):
+    """Return unsaved Reminder rows for a queryset of Task.assigned_to.through rows.
+
+    Only assignments to incomplete tasks with a reminder that aren't overdue get a reminder.
+    """
+
+    if today is None:
+        today = date.today()
+    rows = assignments.filter(
+        task__task_completed=False,
+        task__reminder_days__isnull=False,
+        task__priority__in=list(PRIORITY_COLOURS),
+        task__due_date__gte=today,
+    ).values_list('user_id', 'task_id', 'task__priority', 'task__due_date', 'task__reminder_days', 'task__seen')
+    return [
+        Reminder(user_id=user_id, task_id=task_id, priority=Task.PRIORITY_RANKS[priority], due_date=due_date,
+                 remind_from=remind_from_date(due_date, reminder_days), seen=seen)
+        for user_id, task_id, priority, due_date, reminder_days, seen in rows
+    ]
+
+@transaction.atomic
+def build_reminders():
+    """Rebuild every user's reminder inbox in one pass, dropping reminders for tasks that are now overdue.
+
+    Returns the number of reminders in the inbox.
+    """
+
+    reminders = new_reminders(Task.assigned_to.through.objects.all())
+    affected_user_ids = set(Reminder.objects.values_list('user_id', flat=True).distinct())
+    Reminder.objects.all().delete()
+    Reminder.objects.bulk_create(reminders, batch_size=500)
+    affected_user_ids.update(reminder.user_id for reminder in reminders)
+    invalidate_notifications(affected_user_ids)
+    return len(reminders)
+
+@transaction.atomic
+def update_task_reminders(task_ids):
+    """Bring the reminders of these tasks up to date after they are saved or (un)assigned."""
+
+    old_reminders = Reminder.objects.filter(task_id__in=task_ids)
+    affected_user_ids = set(old_reminders.values_list('user_id', flat=True))
+    old_reminders.delete()
+    reminders = new_reminders(Task.assigned_to.through.objects.filter(task_id__in=task_ids))
+    Reminder.objects.bulk_create(reminders)
+    affected_user_ids.update(reminder.user_id for reminder in reminders)
+    invalidate_notifications(affected_user_ids)
+
+def notification_message(task):
+    """Return the reminder message shown in the notifications dropdown for a task."""
+
+    colour = PRIORITY_COLOURS[task.priority]
+    return f"<strong>REMINDER:</strong> <span style='color: {colour};'> <strong>{task.priority.capitalize()}</strong> </span> priority task '{task.title}' is due on {task.due_date}."
+
+def get_notifications(user):
+    """Return a list of (message, task_id) pairs for the user, most urgent priority first.
+
+    Returns None if the user is not logged in.
+    """
+
+    if not user.is_authenticated:
+        return None
+    return [(notification_message(reminder.task), reminder.task_id) for reminder in due_soon_reminders(user)]
+
+def notifications_cache_key(user_id, today=None):
+    """Return the cache key for a user's notifications.
+
+    The date is part of the key so that a new list is worked out after midnight,
+    when tasks move into their reminder window.
+    """
+
+    if today is None:
+        today = date.today()
+    return f'notifications:{user_id}:{today.isoformat()}'
+
+def get_cached_notifications(user):
+    """Same as get_notifications, but the list is cached per user until one of their tasks or teams changes."""
+
+    if not user.is_authenticated:
+        return None
+    key = notifications_cache_key(user.pk)
+    notifications = cache.get(key)
+    if notifications is None:
+        count_cache_event(CACHE_MISSES_KEY)
+        notifications = get_notifications(user)
+        cache.set(key, notifications, getattr(settings, 'NOTIFICATION_CACHE_TIMEOUT', 60 * 60 * 24))
+    else:
+        count_cache_event(CACHE_HITS_KEY)
+    return notifications
+
+def invalidate_notifications(user_ids):
+    """Remove the cached notifications of these users (called from tasks/signals.py)."""
+
+    cache.delete_many([notifications_cache_key(user_id) for user_id in user_ids])
+
+def count_cache_event(key):
+    #add() does nothing if the counter already exists, incr() is atomic on shared caches
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        #counter was evicted between add() and incr()
+        cache.set(key, 1, timeout=None)
+
+def notification_cache_stats():
+    """Return the notification cache hits, misses and hit ratio.
+
+    The counters are kept in the cache itself, so with a shared cache backend they cover every process.
+    """
+
+    hits = cache.get(CACHE_HITS_KEY, 0)
+    misses = cache.get(CACHE_MISSES_KEY, 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': hits / total if total else 0.0}
+
+def reset_notification_cache_stats():
+    cache.delete_many([CACHE_HITS_KEY, CACHE_MISSES_KEY])
@@ -0,0 +1,143 @@
+"""Keyset ("seek") pagination: pages start from where the last one ended instead of counting rows with OFFSET.
+
+A page is fetched with WHERE (keys) > (keys of the last row shown) ORDER BY keys LIMIT n, which takes
+the same time however deep into the list it is, and needs no COUNT. The keys are field or annotation
+names sorted ascending, they must not be null and together must be unique, so the last one should be id.
+The position is passed around in links as an opaque cursor string.
+"""
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+class KeysetPage(Sequence):
+    """One page of a keyset paginated queryset, a sequence of its objects like Django's Page.
+
+    The page is only fetched when it is first used, so templates can skip it (e.g. when their HTML is cached).
+    after/before are the cursors the page was asked for with, so the same page can be asked for again.
+    """
+
+    def __init__(self, queryset, keys, limit, after=None, before=None):
+        self.queryset = queryset
+        self.keys = tuple(keys)
+        self.limit = limit
+        fields = self.key_fields()
+        self._after_values = decode_cursor(after, fields)
+        self._before_values = decode_cursor(before, fields) if self._after_values is None else None
+        #invalid cursors are ignored, giving the first page, like Paginator.get_page does with bad page numbers
+        self.after = after if self._after_values is not None else None
+        self.before = before if self._before_values is not None else None
+
+    def key_fields(self):
+        """Return the model field or annotation output field of each key, used to check cursors."""
+
+        annotations = self.queryset.query.annotations
+        return [annotations[key].output_field if key in annotations else self.queryset.model._meta.get_field(key)
+                for key in self.keys]
+
+    def _fetch(self):
+        if '_object_list' in self.__dict__:
+            return
+        keys, limit = self.keys, self.limit
+        if self._before_values is not None:
+            #walk backwards from the cursor, then put the page back in order
+            rows = list(self.queryset.filter(seek_filter(keys, self._before_values, 'lt'))
+                        .order_by(*[f'-{key}' for key in keys])[:limit + 1])
+            self._object_list = rows[:limit][::-1]
+            self._has_next = True
+            self._has_previous = len(rows) > limit
+            return
+        queryset = self.queryset.order_by(*keys)
+        if self._after_values is not None:
+            queryset = queryset.filter(seek_filter(keys, self._after_values))
+        #one more than needed, to know if there is another page
+        rows = list(queryset[:limit + 1])
+        self._object_list = rows[:limit]
+        self._has_next = len(rows) > limit
+        self._has_previous = self._after_values is not None
+
+    @property
+    def object_list(self):
+        self._fetch()
+        return self._object_list
+
+    @property
+    def has_next(self):
+        self._fetch()
+        return self._has_next
+
+    @property
+    def has_previous(self):
+        self._fetch()
+        return self._has_previous
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    @property
+    def next_cursor(self):
+        """The cursor for the page after this one, or None if this is the last page."""
+
+        if not self.has_next or not self.object_list:
+            return None
+        return encode_cursor(key_values(self.object_list[-1], self.keys))
+
+    @property
+    def previous_cursor(self):
+        """The cursor for the page before this one (pass it as before), or None if this is the first page."""
+
+        if not self.has_previous or not self.object_list:
+            return None
+        return encode_cursor(key_values(self.object_list[0], self.keys))
+
+def key_values(obj, keys):
+    return [getattr(obj, key) for key in keys]
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, cls=DjangoJSONEncoder).encode()).decode()
+
+def decode_cursor(cursor, fields):
+    """Return the key values in the cursor converted to the fields' types,
+    or None if it is missing or not a cursor for these keys (e.g. a string where an id should be).
+    """
+
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    if not isinstance(values, list) or len(values) != len(fields):
+        return None
+    #keys are never null, and CharField would turn a list or dict into a string
+    if not all(isinstance(value, (str, int, float)) for value in values):
+        return None
+    try:
+        return [field.to_python(value) for field, value in zip(fields, values)]
+    except (ValueError, ValidationError, TypeError):
+        return None
+
+def seek_filter(keys, values, direction='gt'):
+    """Return a Q for the rows after (gt) or before (lt) these key values, e.g. for (due_date, id):
+    due_date > d OR (due_date = d AND id > i)
+    """
+
+    condition = Q()
+    for i, key in enumerate(keys):
+        equal = {earlier: value for earlier, value in zip(keys[:i], values)}
+        condition |= Q(**equal, **{f'{key}__{direction}': values[i]})
+    return condition
+
+def keyset_paginate(queryset, keys, limit, after=None, before=None):
+    """Return the KeysetPage of up to limit objects after (or before) the cursor, or the first page without one.
+
+    The page is fetched in one query when it is first used.
+    """
+
+    return KeysetPage(queryset, keys, limit, after=after, before=before)
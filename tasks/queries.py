@@ -0,0 +1,145 @@
+"""Querysets built for the dashboard: its search, sort and filter options and the upcoming deadlines."""
+from datetime import date
+from urllib.parse import urlencode
+from django.db.models import Min, Q
+from django.db.models.functions import Coalesce
+from tasks.models import Task
+from tasks.pagination import keyset_paginate, seek_filter
+from tasks.search import RANK_KEYS, SearchPage, filter_matching, fts_enabled, match_expression, search_tasks
+
+class DashboardQuery:
+    """The search, sort and filter chosen on the dashboard, turned into a single queryset.
+
+    Any combination of the three can be used together, everything is done in the database.
+    Searches are full-text (see tasks/search.py) and sorted best match first unless another order is chosen.
+    """
+
+    #order=... values and the fields/annotations they sort by, these end with id so the order is
+    #unique and the tasks can be paged through with keyset pagination (see tasks/pagination.py)
+    ORDERINGS = {
+        'id': ('id',),
+        'title': ('title', 'id'),
+        'created_by': ('created_by_id', 'id'),
+        'priority': ('priority_order', 'id'),
+        'task_completed': ('task_completed', 'id'),
+        #tasks with several assigned users are sorted by the first one (and only appear once),
+        #unassigned tasks come first as they did when this was NULL
+        'assigned_to': ('first_assigned_to', 'id'),
+        'due_date': ('due_date', 'id'),
+    }
+    #filter=... values, the filter they apply and how it is described on the dashboard
+    FILTERS = {
+        'priorityLow': (Q(priority='low'), 'low priority'),
+        'priorityMedium': (Q(priority='medium'), 'medium priority'),
+        'priorityHigh': (Q(priority='high'), 'high priority'),
+        'CompletedTrue': (Q(task_completed=True), 'tasks that are complete'),
+        'CompletedFalse': (Q(task_completed=False), 'tasks that are incomplete'),
+    }
+
+    def __init__(self, search='', order='default', filter=None):
+        self.search = search or ''
+        #unknown options are ignored rather than causing an error
+        self.order = order if order in self.ORDERINGS else 'default'
+        self.filter = filter if filter in self.FILTERS else None
+
+    @classmethod
+    def from_request(cls, request):
+        return cls(
+            search=request.GET.get('search_query', ''),
+            order=request.GET.get('order', 'default'),
+            filter=request.GET.get('filter', None),
+        )
+
+    @property
+    def filter_description(self):
+        """Return what the tasks are filtered by, e.g. 'high priority', or '' if they aren't."""
+
+        return self.FILTERS[self.filter][1] if self.filter else ""
+
+    def apply(self, tasks):
+        """Return the tasks searched, filtered and sorted.
+
+        Searches sorted by best match are a list (see tasks/search.py), otherwise this is a queryset.
+        """
+
+        tasks = self.filtered(tasks)
+        if self.ranked(tasks):
+            return search_tasks(tasks, self.search)
+        return tasks.order_by(*self.sort_keys(tasks))
+
+    def filtered(self, tasks):
+        """Return the tasks queryset filtered, and searched unless the search is ranked, with what sorting needs annotated."""
+
+        if self.search and not self.ranked(tasks):
+            tasks = filter_matching(tasks, self.search)
+        if self.filter:
+            tasks = tasks.filter(self.FILTERS[self.filter][0])
+        if self.order == 'priority':
+            tasks = tasks.annotate(priority_order=Task.priority_rank())
+        if self.order == 'assigned_to':
+            tasks = tasks.annotate(first_assigned_to=Coalesce(Min('assigned_to'), 0))
+        return tasks
+
+    def ranked(self, tasks):
+        """Return True if the tasks are sorted by how well they match the search, which needs full-text search."""
+
+        return self.order == 'default' and match_expression(self.search) is not None and fts_enabled(tasks.db)
+
+    def sort_keys(self, tasks):
+        """Return the names the tasks from apply() are sorted by, the chosen order or else best match/id."""
+
+        if self.order != 'default':
+            return self.ORDERINGS[self.order]
+        if self.ranked(tasks):
+            return RANK_KEYS
+        return ('id',)
+
+    def page(self, tasks, limit, after=None):
+        """Return a KeysetPage of the tasks searched, filtered and sorted, after the cursor if there is one."""
+
+        filtered = self.filtered(tasks)
+        if self.search:
+            return SearchPage(filtered, self.search, self.sort_keys(tasks), limit, after=after)
+        return keyset_paginate(filtered, self.sort_keys(tasks), limit, after=after)
+
+    def params(self, **changes):
+        """Return the query string for these options, with some of them changed (None removes one)."""
+
+        params = {'search_query': self.search, 'order': self.order, 'filter': self.filter}
+        params.update(changes)
+        return urlencode({name: value for name, value in params.items() if value and value != 'default'})
+
+    @property
+    def params_without_order(self):
+        return self.params(order=None)
+
+    @property
+    def params_without_filter(self):
+        return self.params(filter=None)
+
+
+def upcoming_deadlines(teams, limit, after=None, today=None):
+    """Return (tasks, has_more): the next incomplete tasks due in these teams, soonest first.
+
+    after is the (due_date, id) of the last task already shown, to get the ones after it.
+    This is one query, using Task's task_deadline_idx index.
+    """
+
+    tasks = upcoming_deadlines_queryset(teams, today)
+    if after is not None:
+        tasks = tasks.filter(seek_filter(('due_date', 'id'), after))
+    #one more than needed, to know if there are more to show
+    tasks = list(tasks[:limit + 1])
+    return tasks[:limit], len(tasks) > limit
+
+def upcoming_deadlines_queryset(teams, today=None):
+    """Return the incomplete tasks due from today onwards in these teams, soonest first."""
+
+    if today is None:
+        today = date.today()
+    #task_completed=False is written as NOT task_completed, which SQLite can't look up in the index, IN (False) it can
+    return (
+        Task.objects.filter(created_by__in=teams, task_completed__in=[False], due_date__gte=today)
+        .only('id', 'title', 'due_date', 'created_by')
+        .order_by('due_date', 'id')
+    )
@@ -0,0 +1,233 @@
+"""Full-text task search, using an SQLite FTS5 table when there is one.
+
+The tasks_task_fts table (created in migration 0030) holds the title and description of every
+task, with the task's id as its rowid. It is kept up to date by the signals in tasks/signals.py,
+and can be rebuilt with `python manage.py rebuild_task_search` (e.g. after QuerySet.update()).
+On databases without FTS5, searches fall back to LIKE on the title and description.
+"""
+import hashlib
+import re
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+from tasks.models import Task
+from tasks.pagination import KeysetPage
+
+FTS_TABLE = 'tasks_task_fts'
+#the Task fields in the search table
+SEARCH_FIELDS = ('title', 'description')
+#what the search matches are wrapped in by highlight() and snippet(), replaced by <mark> once escaped
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+SNIPPET_WORDS = 12
+#what ranked search results are sorted and paged by
+RANK_KEYS = ('search_rank', 'id')
+
+#whether each database has the FTS table, worked out the first time it is searched
+_fts_enabled = {}
+
+def fts_enabled(using='default'):
+    """Return True if the database has the full-text search table."""
+
+    if using not in _fts_enabled:
+        connection = connections[using]
+        _fts_enabled[using] = connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+    return _fts_enabled[using]
+
+def match_expression(text):
+    """Return an FTS5 MATCH expression finding every word in the text, the last one as a prefix
+    (so results show up while typing). Returns None if there are no words to search for.
+    """
+
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    #quoting each word stops FTS5 reading words like AND/OR/NEAR as operators
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+def filter_matching(tasks, text):
+    """Return the tasks matching the search text, as a queryset that can be filtered and sorted further.
+
+    The full-text search is an uncorrelated subquery (it runs once), nothing is ranked or marked.
+    """
+
+    match = match_expression(text)
+    if match is None or not fts_enabled(tasks.db):
+        return tasks.filter(Q(title__icontains=text) | Q(description__icontains=text))
+    return tasks.filter(id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]))
+
+def search_tasks(tasks, text, limit=None, after=None):
+    """Return a list of the tasks matching the search text, best match first.
+
+    With full-text search this is one query joining the search table to the tasks, for their ids, BM25 rank
+    and marked title and description (set as search_rank, search_title and search_snippet, see highlight_matches),
+    and one in_bulk() for the tasks. after=(search_rank, id) of a task continues from after it.
+    Without full-text search the LIKE matches are returned by id.
+    """
+
+    match = match_expression(text)
+    if match is None or not fts_enabled(tasks.db):
+        return list(filter_matching(tasks, text).order_by('id')[:limit])
+    try:
+        tasks_sql, tasks_params = tasks.order_by().values('pk').query.sql_with_params()
+    except EmptyResultSet:
+        return []
+    #+rowid stops SQLite giving the ids to the search table, which would run the MATCH again for each of them
+    sql = (
+        f"SELECT rowid AS id, bm25({FTS_TABLE}) AS rank, highlight({FTS_TABLE}, 0, char(2), char(3)) AS title, "
+        f"snippet({FTS_TABLE}, 1, char(2), char(3), '...', {SNIPPET_WORDS}) AS snippet "
+        f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND +rowid IN ({tasks_sql})"
+    )
+    params = [match, *tasks_params]
+    if after is not None:
+        sql = f"SELECT * FROM ({sql}) WHERE rank > %s OR (rank = %s AND id > %s)"
+        params += [after[0], after[0], after[1]]
+    #bm25() is lower for better matches
+    sql += " ORDER BY rank, id"
+    if limit is not None:
+        sql += " LIMIT %s"
+        params.append(limit)
+    with connections[tasks.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    found = tasks.in_bulk([row[0] for row in rows])
+    results = []
+    for task_id, rank, title, snippet in rows:
+        #a task could have been deleted in between
+        task = found.get(task_id)
+        if task is not None:
+            task.search_rank, task.search_title, task.search_snippet = rank, title, snippet
+            results.append(task)
+    return results
+
+def mark_matches(tasks, text):
+    """Set search_title and search_snippet on these tasks (already fetched, e.g. a page sorted another way)
+    with the matches for the search text marked, in one query on the search table.
+    """
+
+    match = match_expression(text)
+    if not tasks or match is None or not fts_enabled(tasks[0]._state.db):
+        return
+    by_id = {task.pk: task for task in tasks}
+    placeholders = ', '.join(['%s'] * len(by_id))
+    with connections[tasks[0]._state.db].cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, highlight({FTS_TABLE}, 0, char(2), char(3)), "
+            f"snippet({FTS_TABLE}, 1, char(2), char(3), '...', {SNIPPET_WORDS}) "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND +rowid IN ({placeholders})",
+            [match, *by_id],
+        )
+        for task_id, title, snippet in cursor.fetchall():
+            by_id[task_id].search_title, by_id[task_id].search_snippet = title, snippet
+
+class SearchPage(KeysetPage):
+    """A KeysetPage of search results, with the matches marked on its tasks.
+
+    Sorted by RANK_KEYS they are the best matches first, fetched with search_tasks. Sorted any other
+    way the page is fetched as usual from the queryset (which must already be filter_matching) and then marked.
+    """
+
+    def __init__(self, queryset, text, keys, limit, after=None):
+        self.text = text
+        super().__init__(queryset, keys, limit, after=after)
+
+    def key_fields(self):
+        if self.keys != RANK_KEYS:
+            return super().key_fields()
+        #the rank is worked out by search_tasks rather than annotated on the queryset
+        return [FloatField(), Task._meta.pk]
+
+    def _fetch(self):
+        if '_object_list' in self.__dict__:
+            return
+        if self.keys != RANK_KEYS:
+            super()._fetch()
+            mark_matches(self._object_list, self.text)
+            return
+        #one more than needed, to know if there is another page
+        rows = search_tasks(self.queryset, self.text, self.limit + 1, after=self._after_values)
+        self._object_list = rows[:self.limit]
+        self._has_next = len(rows) > self.limit
+        self._has_previous = self._after_values is not None
+
+def highlight_matches(text):
+    """Return the text from search_title or search_snippet as HTML, with the matches in <mark> tags."""
+
+    return mark_safe(escape(text).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>'))
+
+def index_task(task, using='default'):
+    """Add the task to the search table, or update it if it is already there."""
+
+    if fts_enabled(using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [task.pk])
+            cursor.execute(f'INSERT INTO {FTS_TABLE} (rowid, title, description) VALUES (%s, %s, %s)',
+                           [task.pk, task.title, task.description])
+
+def unindex_task(task_id, using='default'):
+    """Remove a task from the search table."""
+
+    if fts_enabled(using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [task_id])
+
+def rebuild_search_index(using='default'):
+    """Fill the search table again from the tasks table. Returns the number of tasks indexed."""
+
+    if not fts_enabled(using):
+        return 0
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(f'INSERT INTO {FTS_TABLE} (rowid, title, description) SELECT id, title, description FROM {Task._meta.db_table}')
+    return Task.objects.using(using).count()
+
+def search_user_tasks(user, text, limit):
+    """Return the best matches for the search text in all of the user's teams, as a list of dicts for JSON.
+
+    title_html and snippet_html are escaped, with the matches in <mark> tags.
+    """
+
+    tasks = search_tasks(Task.objects.filter(created_by__in=user.teams.all()).select_related('created_by'), text, limit)
+    results = []
+    for task in tasks:
+        #LIKE searches don't have anything marked
+        title_html = getattr(task, 'search_title', None)
+        snippet_html = getattr(task, 'search_snippet', None)
+        results.append({
+            'id': task.id,
+            'title': task.title,
+            'title_html': highlight_matches(title_html) if title_html else escape(task.title),
+            'snippet_html': highlight_matches(snippet_html) if snippet_html else escape(task.description[:80]),
+            'team': task.created_by.team_name,
+            'due_date': task.due_date.isoformat(),
+            'priority': task.priority,
+            'completed': task.task_completed,
+            'url': reverse('view_task', kwargs={'team_id': task.created_by_id, 'task_id': task.id}),
+        })
+    return results
+
+def search_cache_key(user_id, text, limit):
+    #hashed so any search text makes a valid cache key
+    digest = hashlib.sha1(text.strip().lower().encode()).hexdigest()
+    return f'task_search:{user_id}:{limit}:{digest}'
+
+def get_cached_search_results(user, text, limit):
+    """Same as search_user_tasks, but cached per user for TASK_SEARCH_CACHE_TIMEOUT seconds.
+
+    The cache isn't cleared when tasks change, so keep the timeout short.
+    """
+
+    key = search_cache_key(user.pk, text, limit)
+    results = cache.get(key)
+    if results is None:
+        results = search_user_tasks(user, text, limit)
+        cache.set(key, results, getattr(settings, 'TASK_SEARCH_CACHE_TIMEOUT', 30))
+    return results
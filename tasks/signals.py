@@ -1,54 +1,31 @@
-from django.db.models.signals import pre_save, post_save, pre_delete
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
 from django.contrib.auth.signals import user_logged_in, user_logged_out
-from tasks.models import User, Team, Task, Activity_Log
+from tasks.models import User, Team, Task, Reminder
+from tasks.activity import buffered_activity, log_activity
+from tasks.notifications import REMINDER_FIELDS, invalidate_notifications, update_task_reminders
+from tasks.search import SEARCH_FIELDS, index_task, unindex_task
+from tasks.team_cache import bump_team_generations_on_commit
+from tasks.changes import record_changes, task_changed, team_changed, assignment_changed, membership_changed
+from tasks.middleware import get_current_user
 from django.db.models.signals import m2m_changed
 from django.dispatch import receiver
-import inspect
-from datetime import datetime
 
-#Gets the user that made the request
+#Gets the user that made the request (set by CurrentUserMiddleware, or acting_as outside of requests)
 def get_requested_user():
-    #for call in python code 
-    for frame_record in inspect.stack():
-        #find where we last got a get request
-        if frame_record[3] == 'get_response':
-            request = frame_record[0].f_locals['request'] #get the request variable out of the frame
-            return request.user
-    else:
-        return None
-
-#Return the activity log for the user, or create a new one if they don't have one yet
-def get_activity_log(user):
-    if Activity_Log.objects.filter(user=user).exists():
-        activity_log = Activity_Log.objects.get(user=user)
-        return activity_log
-    else:
-        return Activity_Log.objects.create(log=[], user= user)
+    return get_current_user()
 
 """Basic callbacks"""
 @receiver(user_logged_in)
 def user_has_logged_in(sender, **kwargs):
     user = kwargs['user']#get_requested_user()
     if user!=None:
-        #Here, I should save it in the activity log, get the user and either create a new activity log or get an old one
-        activity_log = get_activity_log(user)
-        #The below code is to remove the erroneous update callback
-        #This is because when a user logs in, it also saves the model (this is from Abstract User)
-        if len(activity_log.log)> 0:
-            last_time = datetime.strptime(activity_log.log[len(activity_log.log)-1][1], "%d/%m/%Y, %H:%M:%S")
-            if (datetime.now() - last_time).total_seconds() < 2:
-                activity_log.log.pop(len(activity_log.log)-1) #remove the last entry (the update)
-        activity_log.log.append((f'{user.username} has logged in', datetime.now().strftime("%d/%m/%Y, %H:%M:%S")))
-        activity_log.save()
+        log_activity(user, 'logged_in', f'{user.username} has logged in', target=user)
 
 @receiver(user_logged_out)
 def user_has_logged_out(sender, **kwargs):
     user = kwargs['user']
     if user!=None:
-        #Here, I should save it in the activity log, get the user and either create a new activity log or get an old one
-        activity_log = get_activity_log(user)
-        activity_log.log.append((f'{user.username} has logged out', datetime.now().strftime("%d/%m/%Y, %H:%M:%S")))
-        activity_log.save()
+        log_activity(user, 'logged_out', f'{user.username} has logged out', target=user)
 
 """
 Signal callbacks for every model save function
@@ -58,155 +35,374 @@ Signal callbacks for every model save function
 def user_save(sender, **kwargs):
     user = kwargs['instance'] #get user instance we have created 
     created = kwargs['created']
-    activity_log = get_activity_log(user) 
-    current_time = datetime.now().strftime("%d/%m/%Y, %H:%M:%S")
+    #Logging in saves last_login on the user (this is from Abstract User), and saves the password
+    #when its hash is upgraded. Neither are the user editing their details, so don't log them
+    update_fields = kwargs['update_fields']
+    if update_fields is not None and set(update_fields) <= {'last_login', 'password'}:
+        return
     #if the user is not logged in, this must mean this user is signing up 
     if created: 
-        activity_log.log.append((f'{user.username} signed up', current_time))
+        log_activity(user, 'signed_up', f'{user.username} signed up', target=user)
     else:
         #User exists, so there are updating their profile
         #don't differentiate about what they're doing (e.g. password, username),
-        activity_log.log.append((f'{user.username} edited their user details', current_time))
-    activity_log.save()
+        log_activity(user, 'user_edited', f'{user.username} edited their user details', target=user)
 
 
 #Task Model
 @receiver(pre_save, sender=Task)
 def task_save(sender, **kwargs):
     user = get_requested_user()
-    #This line is for tests, as get_requested_user() doesn't work in tests because we aren't doing real requests
+    task = kwargs['instance']
+    #This line is for tests that save models directly instead of doing real requests
+    if user is None:
+        user = getattr(task, '_user',None)
+    #new tasks are logged in task_created, once they have an id
+    if user!=None:
+        #check what they did to the task (doesn't include changes to m2m fields), from the values it was loaded with
+        changes = task.changed_fields(kwargs['update_fields'])
+        #the logged changes name the task, if its title was deferred it hasn't changed (reading it loads it)
+        logged = changes.keys() & {'title', 'description', 'due_date', 'task_completed'}
+        old_title = task.loaded_value('title', task.title) if logged else None
+        if 'title' in changes:
+            #changed title
+            log_activity(user, 'task_edited', f'{user.username} changed task \'{old_title}\'s title to {task.title}', target=task,
+                         field='title', old=old_title, new=task.title)
+        if 'description' in changes:
+            #changed description
+            log_activity(user, 'task_edited', f'{user.username} changed task \'{old_title}\'s description to {task.description}', target=task,
+                         field='description', old=changes['description'][0], new=task.description)
+        if 'due_date' in changes:
+            #changed due date
+            old_due_date, due_date = changes['due_date']
+            log_activity(user, 'task_edited', f'{user.username} updated task \'{old_title}\'s due date to {due_date}', target=task,
+                         field='due_date', old=str(old_due_date), new=str(due_date))
+        if 'task_completed' in changes:
+            #changed completion (the views set it from the POST data, so it may be 'True' rather than True)
+            old_completed, completed = changes['task_completed']
+            completion = 'Complete' if completed else 'Incomplete'
+            log_activity(user, 'task_edited', f'{user.username} marked \'{old_title}\' as {completion}', target=task,
+                         field='task_completed', old=old_completed, new=completed)
+
+@receiver(post_save, sender=Task)
+def task_created(sender, **kwargs):
+    if not kwargs['created']:
+        return
+    user = get_requested_user()
+    #This line is for tests that save models directly instead of doing real requests
     if user is None:
         user = getattr(kwargs['instance'], '_user',None)
     if user!=None:
+        #They created a new task
         task = kwargs['instance']
-        #created = kwargs['created'] #if we have created a new record
-        #Here, I should save it in the activity log, get the user and either create a new activity log or get an old one
-        activity_log = get_activity_log(user)
-        current_time = datetime.now().strftime("%d/%m/%Y, %H:%M:%S")
-        #Check what they are doing, editing or creating
-        if not Task.objects.filter(pk=task.id).exists():#created:
-            #They created a new task
-            activity_log.log.append((f'{user.username} created a new task with title \'{task.title}\'', current_time))
-        else:
-            #check what they did to the task (doesn't include changes to m2m fields)
-            old_task = Task.objects.get(pk=task.id)
-            if old_task.title!=task.title:
-                #changed title
-                activity_log.log.append((f'{user.username} changed task \'{old_task.title}\'s title to {task.title}', current_time))
-            if old_task.description!=task.description:
-                #changed description
-                activity_log.log.append((f'{user.username} changed task \'{old_task.title}\'s description to {task.description}', current_time))
-            if old_task.due_date!=task.due_date:
-                #changed due date
-                activity_log.log.append((f'{user.username} updated task \'{old_task.title}\'s due date to {task.due_date}', current_time))
-            #have to use eval here because models.BooleanField is stored as a string, but it comes out as a boolean
-            if old_task.task_completed!= task.task_completed:
-                #changed completion
-                completion = 'Complete' if eval(task.task_completed) else 'Incomplete'
-                activity_log.log.append((f'{user.username} marked \'{old_task.title}\' as {completion}', current_time))
-        activity_log.save()
-
-#eam Model
-@receiver(pre_save, sender=Team)
+        log_activity(user, 'task_created', f'{user.username} created a new task with title \'{task.title}\'', target=task, title=task.title)
+
+#Team Model
+@receiver(post_save, sender=Team)
 def team_save(sender, **kwargs):
-    #We only use this to log creating teams, so the user has to be the admini
+    #We only use this to log creating teams, so the user has to be the admin
     team = kwargs['instance']
     user = team.admin_user 
-    if user!=None:
-        team = kwargs['instance']
-        activity_log = get_activity_log(user)
-        current_time = datetime.now().strftime("%d/%m/%Y, %H:%M:%S")
-        if not Team.objects.filter(pk=team.id).exists():
-            #They created a new task
-            activity_log.log.append((f'{user.username} created a new team \'{team.team_name}\'', current_time))
-        #no checks for edits because apart from many to many fields, you can't change teams
-        activity_log.save()
+    #no checks for edits because apart from many to many fields, you can't change teams
+    if user!=None and kwargs['created']:
+        log_activity(user, 'team_created', f'{user.username} created a new team \'{team.team_name}\'', target=team, team_name=team.team_name)
 
 """Below Signals are for every ManyToMany field change"""
+def changed_m2m_objects(kwargs, related_name):
+    """Return the objects added, removed or cleared in an m2m_changed signal, looked up in one query.
+
+    Removed and cleared objects are looked up before they go (pre_remove/pre_clear), cleared ones
+    are kept on the instance until post_clear. Other actions return an empty list.
+    """
+
+    instance = kwargs['instance']
+    action = kwargs['action']
+    related = getattr(instance, related_name)
+    cleared_attr = f'_cleared_{related_name}'
+    if action == 'post_add':
+        objects = kwargs['model'].objects.in_bulk(kwargs['pk_set'])
+    elif action == 'pre_remove':
+        #only the ones that are actually there get removed
+        objects = related.in_bulk(kwargs['pk_set'])
+    elif action == 'pre_clear':
+        setattr(instance, cleared_attr, list(related.order_by('pk')))
+        return []
+    elif action == 'post_clear':
+        return instance.__dict__.pop(cleared_attr, [])
+    else:
+        return []
+    return [objects[pk] for pk in sorted(objects)]
+
+def changed_m2m_pairs(kwargs, related_name, reverse_related_name):
+    """Same as changed_m2m_objects, but as (instance, related object) pairs from the forward side of the field."""
+
+    if kwargs['reverse']:
+        return [(obj, kwargs['instance']) for obj in changed_m2m_objects(kwargs, reverse_related_name)]
+    return [(kwargs['instance'], obj) for obj in changed_m2m_objects(kwargs, related_name)]
+
 #Team model members m2m field
 @receiver(m2m_changed, sender=Team.members.through)
 def team_members_changed(sender, **kwargs):
     user = get_requested_user()
-    #This line is for tests, as get_requested_user() doesn't work in tests because we aren't doing real requests
+    #This line is for tests that save models directly instead of doing real requests
     if user is None:
         user = getattr(kwargs['instance'], '_user',None)
     if user!=None:
-        activity_log = get_activity_log(user)
-        team = kwargs['instance']
-        current_time = datetime.now().strftime("%d/%m/%Y, %H:%M:%S")
-        #check what they did to the team members
         action = kwargs['action']
-        if action=="post_add":
-            #team members added
-            #say what members added 
-            member_pk = list(kwargs['pk_set'])[0]
-            member = team.members.all().filter(id =member_pk).first()#find most recent member added
-            activity_log.log.append((f'{user.username} added {member.username} to \'{team.team_name}\'', current_time))
-        elif action=="pre_remove":
-            #team members removed
-            #find the member removed. Don't know how though. Find different between two teams
-            member_pk = list(kwargs['pk_set'])[0]
-            member = team.members.all().filter(id =member_pk).first()
-            activity_log.log.append((f'{user.username} removed {member.username} from \'{team.team_name}\'', current_time))
-        activity_log.save()
+        #check what they did to the team members, all the members are found in one query and logged in one write
+        with buffered_activity():
+            for team, member in changed_m2m_pairs(kwargs, 'members', 'membership'):
+                if action=="post_add":
+                    log_activity(user, 'member_added', f'{user.username} added {member.username} to \'{team.team_name}\'', target=team,
+                                 member=member.username)
+                else:
+                    log_activity(user, 'member_removed', f'{user.username} removed {member.username} from \'{team.team_name}\'', target=team,
+                                 member=member.username)
 
 #Task model assigned to m2m field
 @receiver(m2m_changed, sender=Task.assigned_to.through)
 def task_assigned_to_changed(sender, **kwargs):
     user = get_requested_user()
-    #This line is for tests, as get_requested_user() doesn't work in tests because we aren't doing real requests
+    #This line is for tests that save models directly instead of doing real requests
     if user is None:
         user = getattr(kwargs['instance'], '_user',None)
     if user!=None:
-        activity_log = get_activity_log(user)
-        task = kwargs['instance']
-        current_time = datetime.now().strftime("%d/%m/%Y, %H:%M:%S")
         action = kwargs['action']
-        #Unlike team members, we can add and remove multiple users at once
-        if action=="post_add":
-            #users assigned to task
-            #say what members added 
-            member_pks = kwargs['pk_set']
-            for pk in member_pks:
-                #for each member, show that they have been added/deleted
-                member = task.assigned_to.all().filter(id =pk).first()#find most recent member added
-                activity_log.log.append((f'{user.username} assigned {member.username} to the task \'{task.title}\'', current_time))
-        elif action=="pre_remove":
-            #users removed from assignment
-            member_pks = kwargs['pk_set']
-            for pk in member_pks:
-                #for each member, show that they have been added/deleted
-                member = task.assigned_to.all().filter(id =pk).first()#find most recent member added
-                activity_log.log.append((f'{user.username} removed {member.username} from the task \'{task.title}\'', current_time))
-        activity_log.save()
+        #we can add and remove multiple users at once, so they are found in one query and logged in one write
+        with buffered_activity():
+            for task, member in changed_m2m_pairs(kwargs, 'assigned_to', 'task_set'):
+                if action=="post_add":
+                    log_activity(user, 'user_assigned', f'{user.username} assigned {member.username} to the task \'{task.title}\'', target=task,
+                                 member=member.username)
+                else:
+                    log_activity(user, 'user_unassigned', f'{user.username} removed {member.username} from the task \'{task.title}\'', target=task,
+                                 member=member.username)
 
 """Signals for deleting entries"""
 #Delete Task
 @receiver(pre_delete, sender=Task)
 def task_deleted(sender, **kwargs):
     user = get_requested_user()
-    #This line is for tests, as get_requested_user() doesn't work in tests because we aren't doing real requests
+    #This line is for tests that save models directly instead of doing real requests
     if user is None:
         user = getattr(kwargs['instance'], '_user',None)
     if user!=None:
-        activity_log = get_activity_log(user)
         task = kwargs['instance']
-        current_time = datetime.now().strftime("%d/%m/%Y, %H:%M:%S")
-        activity_log.log.append((f'{user.username} deleted task {task.title}', current_time))
-        activity_log.save()
+        log_activity(user, 'task_deleted', f'{user.username} deleted task {task.title}', target=task, title=task.title)
 
 #Delete Team
 @receiver(pre_delete, sender=Team)
 def team_deleted(sender, **kwargs):
     user = get_requested_user()
-    #This line is for tests, as get_requested_user() doesn't work in tests because we aren't doing real requests
+    #This line is for tests that save models directly instead of doing real requests
     if user is None:
         user = getattr(kwargs['instance'], '_user',None)
     if user!=None:
-        activity_log = get_activity_log(user)
         team = kwargs['instance']
-        current_time = datetime.now().strftime("%d/%m/%Y, %H:%M:%S")
-        activity_log.log.append((f'{user.username} deleted team {team.team_name}', current_time))
-        activity_log.save()
+        log_activity(user, 'team_deleted', f'{user.username} deleted team {team.team_name}', target=team, team_name=team.team_name)
+
+
+"""Signals that keep the reminder inbox and the cached notifications up to date"""
+@receiver(post_save, sender=Task)
+def task_save_update_reminders(sender, **kwargs):
+    task = kwargs['instance']
+    update_fields = kwargs['update_fields']
+    fields = [name for name in REMINDER_FIELDS if update_fields is None or name in update_fields]
+    #skip saves that only change e.g. the description
+    if not kwargs['created'] and task.is_tracking(fields) and not task.changed_fields(fields):
+        return
+    update_task_reminders([task.pk])
+
+@receiver(pre_delete, sender=Task)
+def task_deleted_invalidate_notifications(sender, **kwargs):
+    #the reminders themselves are deleted by the cascade
+    task = kwargs['instance']
+    invalidate_notifications(Reminder.objects.filter(task=task).values_list('user_id', flat=True))
+
+@receiver(m2m_changed, sender=Task.assigned_to.through)
+def task_assigned_to_update_reminders(sender, **kwargs):
+    instance = kwargs['instance']
+    action = kwargs['action']
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not kwargs['reverse']:
+        update_task_reminders([instance.pk])
+    elif action == 'post_clear':
+        #changed from the user's side with user.task_set.clear(), so update every task they had a reminder for
+        update_task_reminders(list(Reminder.objects.filter(user=instance).values_list('task_id', flat=True)))
+    else:
+        #changed from the user's side, e.g. user.task_set.add(task)
+        update_task_reminders(kwargs['pk_set'])
+
+@receiver(m2m_changed, sender=Team.members.through)
+def team_members_invalidate_notifications(sender, **kwargs):
+    instance = kwargs['instance']
+    action = kwargs['action']
+    if kwargs['reverse']:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_notifications([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        invalidate_notifications(kwargs['pk_set'])
+    elif action == 'pre_clear':
+        invalidate_notifications(instance.members.values_list('pk', flat=True))
+
+#Notifications are worked out from user.teams, which is kept alongside team.members
+@receiver(m2m_changed, sender=User.teams.through)
+def user_teams_invalidate_notifications(sender, **kwargs):
+    instance = kwargs['instance']
+    action = kwargs['action']
+    if not kwargs['reverse']:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_notifications([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        invalidate_notifications(kwargs['pk_set'])
+    elif action == 'pre_clear':
+        invalidate_notifications(instance.user_set.values_list('pk', flat=True))
 
+"""Signals that keep the task search table up to date"""
+@receiver(post_save, sender=Task)
+def task_save_update_search(sender, **kwargs):
+    task = kwargs['instance']
+    update_fields = kwargs['update_fields']
+    fields = [name for name in SEARCH_FIELDS if update_fields is None or name in update_fields]
+    if not fields:
+        return
+    #skip saves that don't change the title or description
+    if not kwargs['created'] and task.is_tracking(fields) and not task.changed_fields(fields):
+        return
+    index_task(task, using=kwargs['using'])
 
+@receiver(post_delete, sender=Task)
+def task_deleted_update_search(sender, **kwargs):
+    unindex_task(kwargs['instance'].pk, using=kwargs['using'])
+
+"""Signals that mark teams and tasks as changed: a new cache generation once the change commits, so their
+cached pages aren't used again, and updated_at for changes that aren't saves (many-to-many fields), see tasks/conditional.py"""
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def task_changed_bump_team_generation(sender, **kwargs):
+    bump_team_generations_on_commit([kwargs['instance'].created_by_id])
+
+@receiver(post_save, sender=Team)
+@receiver(post_delete, sender=Team)
+def team_changed_bump_team_generation(sender, **kwargs):
+    bump_team_generations_on_commit([kwargs['instance'].pk])
+
+@receiver(post_save, sender=User)
+def user_save_mark_teams_changed(sender, **kwargs):
+    #their name is shown on their teams' pages, logging in doesn't change it
+    update_fields = kwargs['update_fields']
+    if kwargs['created'] or (update_fields is not None and set(update_fields) <= {'last_login', 'password'}):
+        return
+    team_ids = list(kwargs['instance'].membership.values_list('pk', flat=True))
+    bump_team_generations_on_commit(team_ids)
+    Team.touch(team_ids)
+
+def m2m_changed_ids(kwargs, ids, label):
+    """Return the ids of the objects (e.g. teams) an m2m change affects, once it has happened.
+
+    ids(pk_set) works them out from the changed pks, or from everything that is there when pk_set
+    is None (for clear(), this is done in pre_clear and kept on the instance until post_clear).
+    """
+
+    instance = kwargs['instance']
+    action = kwargs['action']
+    cleared_attr = f"_cleared_{label}_{kwargs['model']._meta.model_name}"
+    if action in ('post_add', 'post_remove'):
+        return list(ids(kwargs['pk_set']))
+    elif action == 'pre_clear':
+        setattr(instance, cleared_attr, list(ids(None)))
+    elif action == 'post_clear':
+        return instance.__dict__.pop(cleared_attr, [])
+    return []
+
+@receiver(m2m_changed, sender=Team.members.through)
+def team_members_mark_teams_changed(sender, **kwargs):
+    instance = kwargs['instance']
+    if kwargs['reverse']:
+        #changed from the user's side, e.g. user.membership.add(team)
+        team_ids = lambda pks: pks if pks is not None else instance.membership.values_list('pk', flat=True)
+    else:
+        team_ids = lambda pks: [instance.pk]
+    team_ids = m2m_changed_ids(kwargs, team_ids, 'teams')
+    bump_team_generations_on_commit(team_ids)
+    Team.touch(team_ids)
+
+@receiver(m2m_changed, sender=User.teams.through)
+def user_teams_mark_teams_changed(sender, **kwargs):
+    instance = kwargs['instance']
+    if kwargs['reverse']:
+        team_ids = lambda pks: [instance.pk]
+    else:
+        team_ids = lambda pks: pks if pks is not None else instance.teams.values_list('pk', flat=True)
+    team_ids = m2m_changed_ids(kwargs, team_ids, 'teams')
+    bump_team_generations_on_commit(team_ids)
+    Team.touch(team_ids)
+
+@receiver(m2m_changed, sender=Task.assigned_to.through)
+def task_assigned_to_mark_tasks_changed(sender, **kwargs):
+    instance = kwargs['instance']
+    if kwargs['reverse']:
+        #changed from the user's side, e.g. user.task_set.add(task)
+        task_ids = lambda pks: pks if pks is not None else instance.task_set.values_list('pk', flat=True)
+    else:
+        task_ids = lambda pks: [instance.pk]
+    task_ids = m2m_changed_ids(kwargs, task_ids, 'tasks')
+    if task_ids:
+        bump_team_generations_on_commit(Task.objects.filter(pk__in=task_ids).values_list('created_by_id', flat=True))
+        Task.touch(task_ids)
+
+"""Signals that write the change journal read by /api/changes, see tasks/changes.py"""
+@receiver(post_save, sender=Task)
+def task_save_record_change(sender, **kwargs):
+    task = kwargs['instance']
+    update_fields = kwargs['update_fields']
+    fields = [name for name in task.tracked_fields if update_fields is None or name in update_fields]
+    #skip saves that don't change anything
+    if not kwargs['created'] and task.is_tracking(fields) and not task.changed_fields(fields):
+        return
+    record_changes([task_changed(task)])
+
+@receiver(post_delete, sender=Task)
+def task_deleted_record_change(sender, **kwargs):
+    record_changes([task_changed(kwargs['instance'], 'delete')])
+
+@receiver(post_save, sender=Team)
+def team_save_record_change(sender, **kwargs):
+    record_changes([team_changed(kwargs['instance'])])
+
+@receiver(pre_delete, sender=Team)
+def team_deleted_record_change(sender, **kwargs):
+    #the memberships go with the team, so the members are told directly
+    team = kwargs['instance']
+    member_ids = set(team.members.values_list('pk', flat=True)) | set(team.user_set.values_list('pk', flat=True))
+    record_changes([team_changed(team, 'delete')] + [team_changed(team, 'delete', user_id) for user_id in sorted(member_ids)])
+
+@receiver(m2m_changed, sender=Task.assigned_to.through)
+def task_assigned_to_record_changes(sender, **kwargs):
+    instance = kwargs['instance']
+    action = 'add' if kwargs['action'] == 'post_add' else 'remove'
+    if kwargs['reverse']:
+        #changed from the user's side, e.g. user.task_set.add(task)
+        task_ids = m2m_changed_ids(kwargs, lambda pks: pks if pks is not None else instance.task_set.values_list('pk', flat=True), 'assignments')
+        tasks = Task.objects.filter(pk__in=task_ids).values_list('pk', 'created_by_id').order_by('pk')
+        record_changes([assignment_changed(task_id, team_id, instance.pk, action) for task_id, team_id in tasks])
+    else:
+        user_ids = m2m_changed_ids(kwargs, lambda pks: pks if pks is not None else instance.assigned_to.values_list('pk', flat=True), 'assignments')
+        record_changes([assignment_changed(instance.pk, instance.created_by_id, user_id, action) for user_id in sorted(user_ids)])
+
+#team.members and user.teams are kept alongside each other, so both are recorded (clients get the latest of the two)
+@receiver(m2m_changed, sender=Team.members.through)
+@receiver(m2m_changed, sender=User.teams.through)
+def team_membership_record_changes(sender, **kwargs):
+    instance = kwargs['instance']
+    action = 'add' if kwargs['action'] == 'post_add' else 'remove'
+    if isinstance(instance, Team):
+        related = instance.members if sender is Team.members.through else instance.user_set
+        user_ids = m2m_changed_ids(kwargs, lambda pks: pks if pks is not None else related.values_list('pk', flat=True), 'memberships')
+        pairs = [(instance.pk, user_id) for user_id in user_ids]
+    else:
+        related = instance.membership if sender is Team.members.through else instance.teams
+        team_ids = m2m_changed_ids(kwargs, lambda pks: pks if pks is not None else related.values_list('pk', flat=True), 'memberships')
+        pairs = [(team_id, instance.pk) for team_id in team_ids]
+    record_changes([membership_changed(team_id, user_id, action) for team_id, user_id in sorted(pairs)])
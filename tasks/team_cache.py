@@ -0,0 +1,106 @@
+"""Caching of rendered HTML for a team's pages, invalidated by a per-team generation number.
+
+Every team has a generation number in the cache, which the signals in tasks/signals.py bump whenever
+the team, its members or its tasks change (once the change commits). Fragments are cached under
+(team id, generation, user id, fragment name, variant), so a change to a team makes all of its cached
+HTML unreachable at once, and unchanged pages are served without their queries or template rendering.
+The old entries are left to expire (TEAM_FRAGMENT_CACHE_TIMEOUT).
+
+Every lookup sends the team_fragment_lookup signal, which is how the hit rate is measured
+(see team_fragment_cache_stats and `python manage.py team_cache_stats`).
+"""
+import hashlib
+import time
+from datetime import date
+from functools import partial
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.dispatch import Signal, receiver
+from tasks.notifications import count_cache_event
+
+CACHE_HITS_KEY = 'team_fragment:hits'
+CACHE_MISSES_KEY = 'team_fragment:misses'
+
+#sent with name (the fragment's name), team_id and hit (True if it came from the cache) on every lookup
+team_fragment_lookup = Signal()
+
+def team_generation_key(team_id):
+    return f'team_generation:{team_id}'
+
+def new_generation():
+    #if a generation number is evicted it starts again from the time, so it can't go back to a number
+    #that cached fragments were stored under before
+    return time.time_ns()
+
+def team_generation(team_id):
+    """Return the team's current generation number."""
+
+    key = team_generation_key(team_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, new_generation(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+def bump_team_generations(team_ids):
+    """Move these teams on to a new generation, so none of their cached fragments are used again."""
+
+    for team_id in set(team_ids):
+        key = team_generation_key(team_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            #there was no generation yet (or it was evicted)
+            cache.set(key, new_generation(), timeout=None)
+
+def bump_team_generations_on_commit(team_ids):
+    """Bump these teams' generations once the current transaction commits (straight away outside of one).
+
+    Bumping before the commit would let another request cache the old rows under the new generation,
+    and a rolled back change shouldn't throw away the cached pages.
+    """
+
+    team_ids = set(team_ids)
+    if team_ids:
+        transaction.on_commit(partial(bump_team_generations, team_ids))
+
+def team_fragment_key(name, team_id, generation, user_id, variant):
+    #the variant is hashed so any values make a valid cache key
+    variant = hashlib.sha1(repr(list(variant)).encode()).hexdigest()
+    return f'team_fragment:{team_id}:{generation}:{user_id}:{name}:{variant}'
+
+def cached_team_fragment(request, name, team_id, variant, render):
+    """Return the fragment's HTML from the cache, or from render() (and cache it) if it isn't there.
+
+    variant is anything else the HTML depends on, e.g. the dashboard's search options. Today's date is
+    always included (pages show what is overdue), and so is the CSRF secret, so cached forms keep
+    working tokens. Without a CSRF secret yet the fragment is rendered but not cached.
+    """
+
+    csrf_secret = request.META.get('CSRF_COOKIE')
+    if csrf_secret is None or not request.user.is_authenticated:
+        return render()
+    variant = [csrf_secret, date.today().isoformat(), *variant]
+    key = team_fragment_key(name, team_id, team_generation(team_id), request.user.pk, variant)
+    html = cache.get(key)
+    team_fragment_lookup.send(sender=None, name=name, team_id=team_id, hit=html is not None)
+    if html is None:
+        html = render()
+        cache.set(key, html, getattr(settings, 'TEAM_FRAGMENT_CACHE_TIMEOUT', 60 * 60 * 24))
+    return html
+
+@receiver(team_fragment_lookup)
+def count_team_fragment_lookup(sender, hit, **kwargs):
+    count_cache_event(CACHE_HITS_KEY if hit else CACHE_MISSES_KEY)
+
+def team_fragment_cache_stats():
+    """Return the team fragment cache hits, misses and hit ratio (counted from team_fragment_lookup)."""
+
+    hits = cache.get(CACHE_HITS_KEY, 0)
+    misses = cache.get(CACHE_MISSES_KEY, 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': hits / total if total else 0.0}
+
+def reset_team_fragment_cache_stats():
+    cache.delete_many([CACHE_HITS_KEY, CACHE_MISSES_KEY])
@@ -0,0 +1,9 @@
+from django import template
+from tasks.search import highlight_matches
+register = template.Library()
+
+
+@register.filter
+def highlight(value):
+    """Show a search_title or search_snippet with the search matches in <mark> tags."""
+    return highlight_matches(value)
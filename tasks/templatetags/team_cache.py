@@ -0,0 +1,31 @@
+from django import template
+from tasks.team_cache import cached_team_fragment
+register = template.Library()
+
+
+class TeamFragmentNode(template.Node):
+    def __init__(self, nodelist, name, team_id, variant):
+        self.nodelist = nodelist
+        self.name = name
+        self.team_id = team_id
+        self.variant = variant
+
+    def render(self, context):
+        team_id = self.team_id.resolve(context)
+        variant = [value.resolve(context) for value in self.variant]
+        return cached_team_fragment(context['request'], self.name, team_id, variant, lambda: self.nodelist.render(context))
+
+
+@register.tag
+def team_fragment(parser, token):
+    """Cache what is inside until the team changes (see tasks/team_cache.py).
+
+    {% team_fragment name team.id [variant ...] %} ... {% endteam_fragment %}
+    The variants are anything else the HTML depends on.
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes a name and a team id")
+    nodelist = parser.parse(('endteam_fragment',))
+    parser.delete_first_token()
+    return TeamFragmentNode(nodelist, bits[1], parser.compile_filter(bits[2]), [parser.compile_filter(bit) for bit in bits[3:]])
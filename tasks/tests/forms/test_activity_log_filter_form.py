@@ -0,0 +1,53 @@
+"""Unit tests of the Activity Log filter form."""
+from django.test import TestCase
+from django.utils import timezone
+from tasks.forms import ActivityLogFilterForm
+from tasks.models import User, ActivityEvent
+from datetime import date, datetime
+
+class ActivityLogFilterFormTestCase(TestCase):
+    """Unit tests of the Activity Log filter form."""
+
+    fixtures = ['tasks/tests/fixtures/default_user.json']
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        ActivityEvent.objects.all().delete()
+        self.first = self._create_event('logged_in', datetime(2023, 1, 2, 0, 0, 0))
+        self.second = self._create_event('logged_out', datetime(2023, 1, 8, 23, 59, 59))
+        self.third = self._create_event('logged_in', datetime(2023, 1, 9, 0, 0, 0))
+        self.events = ActivityEvent.objects.filter(actor=self.user).order_by('timestamp')
+
+    def test_form_contains_required_fields(self):
+        form = ActivityLogFilterForm()
+        self.assertIn('date_from', form.fields)
+        self.assertIn('date_to', form.fields)
+        self.assertIn('event_type', form.fields)
+
+    def test_form_accepts_no_filters(self):
+        form = ActivityLogFilterForm(data={})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(list(form.filter(self.events)), [self.first, self.second, self.third])
+
+    def test_dates_include_the_whole_day(self):
+        form = ActivityLogFilterForm(data={'date_from': '2023-01-02', 'date_to': '2023-01-08'})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(list(form.filter(self.events)), [self.first, self.second])
+
+    def test_filter_by_event_type(self):
+        form = ActivityLogFilterForm(data={'event_type': 'logged_in'})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(list(form.filter(self.events)), [self.first, self.third])
+
+    def test_form_rejects_unknown_event_type(self):
+        form = ActivityLogFilterForm(data={'event_type': 'not_an_event'})
+        self.assertFalse(form.is_valid())
+
+    def test_form_rejects_end_date_before_start_date(self):
+        form = ActivityLogFilterForm(data={'date_from': date(2023, 1, 9), 'date_to': date(2023, 1, 2)})
+        self.assertFalse(form.is_valid())
+        self.assertIn('date_to', form.errors)
+
+    def _create_event(self, event_type, timestamp):
+        return ActivityEvent.objects.create(actor=self.user, event_type=event_type, description=event_type,
+                                            timestamp=timezone.make_aware(timestamp))
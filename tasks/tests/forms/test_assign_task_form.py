@@ -1,5 +1,6 @@
 """Unit tests of the assign task form."""
 from django import forms
+from django.db.models.signals import m2m_changed
 from django.test import TestCase
 from django.urls import reverse
 from tasks.forms import AssignTaskForm
@@ -43,6 +44,28 @@ class AssignTaskFormTestCase(TestCase):
     def test_assign_task_form_has_necessary_fields(self):
         form = AssignTaskForm(self.team, self.task)
         self.assertIn('usernames', form.fields)
+        self.assertIn('remove_usernames', form.fields)
+
+    def test_only_team_members_can_be_assigned(self):
+        outsider = User.objects.create_user('@outsider', email='outsider@example.org', password='Password123')
+        form = AssignTaskForm(self.team, self.task, data={'usernames': [outsider.username]})
+        self.assertFalse(form.is_valid())
+
+    def test_cannot_assign_and_unassign_the_same_user(self):
+        form = AssignTaskForm(self.team, self.task, data={'usernames': ['@janedoe'], 'remove_usernames': ['@janedoe']})
+        self.assertFalse(form.is_valid())
+
+    def test_save_leaves_users_that_are_not_mentioned(self):
+        self.task.assigned_to.add(self.user, self.second_user)
+        form = AssignTaskForm(self.team, self.task, data={'usernames': ['@petrapickles']})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.save(self.task), ([self.third_user], []))
+        self.assertEqual(set(self.task.assigned_to.all()), {self.user, self.second_user, self.third_user})
+
+    def test_unassigning_a_user_that_is_not_assigned_does_nothing(self):
+        form = AssignTaskForm(self.team, self.task, data={'remove_usernames': ['@janedoe']})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.save(self.task), ([], []))
     
     def test_assign_task_must_save_correctly(self):
         self.client.login(username=self.user.username, password='Password123')
@@ -64,4 +87,29 @@ class AssignTaskFormTestCase(TestCase):
         before_count = self.task.assigned_to.count()
         self.client.post(self.url, self.form_input)
         after_count = self.task.assigned_to.count()
-        self.assertEqual(after_count, before_count+3)
\ No newline at end of file
+        self.assertEqual(after_count, before_count+3)
+    def test_save_adds_and_removes_the_difference_in_one_go(self):
+        self.task.assigned_to.add(self.user, self.second_user)
+        events = []
+        def record(sender, **kwargs):
+            events.append((kwargs['action'], set(kwargs['pk_set'] or ())))
+        m2m_changed.connect(record, sender=Task.assigned_to.through)
+        self.addCleanup(m2m_changed.disconnect, record, sender=Task.assigned_to.through)
+        form = AssignTaskForm(self.team, self.task, data={'usernames': ['@johndoe', '@petrapickles'], 'remove_usernames': ['@janedoe']})
+        self.assertTrue(form.is_valid())
+        new_users, removed_users = form.save(self.task)
+        self.assertEqual(new_users, [self.third_user])
+        self.assertEqual(removed_users, [self.second_user])
+        self.assertEqual(set(self.task.assigned_to.all()), {self.user, self.third_user})
+        self.assertEqual(events, [
+            ('pre_remove', {self.second_user.pk}), ('post_remove', {self.second_user.pk}),
+            ('pre_add', {self.third_user.pk}), ('post_add', {self.third_user.pk}),
+        ])
+
+    def test_save_without_changes_does_nothing(self):
+        self.task.assigned_to.add(self.second_user)
+        form = AssignTaskForm(self.team, self.task, data=self.form_input)
+        self.assertTrue(form.is_valid())
+        #only the current assignments are read (inside the transaction's savepoint)
+        with self.assertNumQueries(3):
+            self.assertEqual(form.save(self.task), ([], []))
@@ -1,5 +1,6 @@
 """Unit tests of the Edit Task form."""
 from django import forms
+from django.db.models.signals import pre_save
 from django.test import TestCase
 from tasks.forms import EditTaskForm
 from tasks.models import Task
@@ -97,3 +98,18 @@ class EditTaskFormTestCase(TestCase):
         self.assertEqual(task.assigned_to, self.task.assigned_to)
 
     
+
+    def test_form_save_tracks_changes_from_the_old_task(self):
+        old_task = Task.objects.get(pk=self.task.pk)
+        self.form_input['title'] = 'New title'
+        form = EditTaskForm(data=self.form_input)
+        self.assertTrue(form.is_valid())
+        changes = {}
+        def record_changes(sender, instance, **kwargs):
+            changes.update(instance.changed_fields())
+        pre_save.connect(record_changes, sender=Task)
+        try:
+            form.save(old_task)
+        finally:
+            pre_save.disconnect(record_changes, sender=Task)
+        self.assertEqual(changes, {'title': ('Task1', 'New title')})
@@ -1,4 +1,5 @@
 """Unit tests of the submit time form."""
+from unittest import mock
 from django import forms
 from django.test import TestCase
 from django.urls import reverse
@@ -148,3 +149,13 @@ class SubmitTimeFormTestCase(TestCase):
 
         # Each logged time should be 1 hour 1 minute 1 second (3661 seconds)
         self.assertTrue(log_instance1.logged_time == log_instance2.logged_time == 3661)
+
+    def test_time_is_not_added_if_it_cannot_be_logged(self):
+        TimeSpent.objects.create(user=self.user, task=self.task, time_spent=60)
+        form = SubmitTimeForm(data=self.form_input)
+        self.assertTrue(form.is_valid())
+        with mock.patch.object(TimeLog.objects, 'create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                form.save(user=self.user, task=self.task)
+        self.assertEqual(TimeSpent.objects.get(user=self.user, task=self.task).time_spent, 60)
+
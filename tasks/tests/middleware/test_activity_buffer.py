@@ -0,0 +1,99 @@
+"""Unit tests for buffering the activity events logged during a request"""
+
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from tasks.activity import buffered_activity, log_activity
+from tasks.models import User, Task, Team, ActivityEvent
+from datetime import date
+
+class ActivityBufferTestCase(TestCase):
+
+    fixtures = [
+        'tasks/tests/fixtures/default_user.json',
+        'tasks/tests/fixtures/other_users.json',
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.second_user = User.objects.get(username='@janedoe')
+        self.third_user = User.objects.get(username='@petrapickles')
+        self.team = Team.objects.create(team_name='Team 1', admin_user=self.user)
+        self.team.members.set([self.user, self.second_user, self.third_user])
+        self.user.teams.set([self.team])
+        self.task = Task.objects.create(title='Task 1', description='This is a task', due_date=date.today(), created_by=self.team)
+        ActivityEvent.objects.all().delete()
+
+    def test_events_are_saved_straight_away_without_a_buffer(self):
+        log_activity(self.user, 'other', 'Entry')
+        self.assertEqual(ActivityEvent.objects.count(), 1)
+
+    def test_events_are_saved_when_the_buffer_ends(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with buffered_activity():
+                log_activity(self.user, 'other', 'First')
+                log_activity(self.user, 'other', 'Second')
+                self.assertEqual(ActivityEvent.objects.count(), 0)
+        descriptions = list(ActivityEvent.objects.order_by('id').values_list('description', flat=True))
+        self.assertEqual(descriptions, ['First', 'Second'])
+
+    def test_buffer_is_saved_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            with buffered_activity():
+                for number in range(5):
+                    log_activity(self.user, 'other', f'Entry {number}')
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(ActivityEvent.objects.count(), 5)
+
+    def test_nested_buffers_are_saved_by_the_outer_buffer(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with buffered_activity():
+                with buffered_activity():
+                    log_activity(self.user, 'other', 'Entry')
+                self.assertEqual(ActivityEvent.objects.count(), 0)
+        self.assertEqual(ActivityEvent.objects.count(), 1)
+
+    def test_buffer_is_dropped_if_the_block_raises(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError):
+                with buffered_activity():
+                    log_activity(self.user, 'other', 'Entry')
+                    raise ValueError
+        self.assertEqual(ActivityEvent.objects.count(), 0)
+
+    def test_buffer_is_not_saved_if_the_transaction_is_rolled_back(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError):
+                with transaction.atomic():
+                    with buffered_activity():
+                        log_activity(self.user, 'other', 'Entry')
+                    raise ValueError
+        self.assertEqual(ActivityEvent.objects.count(), 0)
+
+    def test_buffer_is_only_saved_once_the_transaction_commits(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with buffered_activity():
+                log_activity(self.user, 'other', 'Entry')
+        self.assertEqual(ActivityEvent.objects.count(), 0)
+        callbacks[0]()
+        self.assertEqual(ActivityEvent.objects.count(), 1)
+
+    def test_request_saves_its_events_in_one_insert(self):
+        self.client.login(username=self.user.username, password='Password123')
+        url = reverse('view_task', kwargs={'team_id': self.team.id, 'task_id': self.task.id})
+        usernames = [self.user.username, self.second_user.username, self.third_user.username]
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {'usernames': usernames, 'assign_submit': ''})
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "tasks_activityevent"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(ActivityEvent.objects.filter(actor=self.user, event_type='user_assigned').count(), 3)
+
+    def test_events_about_deleted_objects_are_saved(self):
+        task_id = self.task.id
+        with self.captureOnCommitCallbacks(execute=True):
+            with buffered_activity():
+                log_activity(self.user, 'task_deleted', 'Deleted', target=self.task)
+                self.task.delete()
+        event = ActivityEvent.objects.get()
+        self.assertEqual(event.target_id, task_id)
@@ -0,0 +1,55 @@
+"""Unit tests for the current user middleware used by the signals"""
+
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase
+from django.urls import reverse
+from tasks.middleware import acting_as, get_current_user
+from tasks.models import User, Task, Team, ActivityEvent
+from datetime import date
+
+class CurrentUserTestCase(TestCase):
+
+    fixtures = [
+        'tasks/tests/fixtures/default_user.json',
+        'tasks/tests/fixtures/other_users.json',
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.second_user = User.objects.get(username='@janedoe')
+        self.team = Team.objects.create(team_name='Team 1', admin_user=self.user)
+        self.team.members.set([self.user, self.second_user])
+        self.user.teams.set([self.team])
+        self.task = Task.objects.create(title='Task 1', description='This is a task', due_date=date.today(), created_by=self.team)
+
+    def test_no_current_user_outside_of_a_request(self):
+        self.assertIsNone(get_current_user())
+
+    def test_acting_as_sets_and_resets_the_current_user(self):
+        with acting_as(self.user):
+            self.assertEqual(get_current_user(), self.user)
+            with acting_as(self.second_user):
+                self.assertEqual(get_current_user(), self.second_user)
+            self.assertEqual(get_current_user(), self.user)
+        self.assertIsNone(get_current_user())
+
+    def test_signals_log_actions_for_the_acting_user(self):
+        with acting_as(self.second_user):
+            self.task.title = 'New title'
+            self.task.save()
+        event = ActivityEvent.objects.filter(actor=self.second_user).latest('timestamp', 'id')
+        self.assertEqual(event.description, f"{self.second_user.username} changed task 'Task 1's title to New title")
+
+    def test_signals_log_actions_for_the_user_making_the_request(self):
+        self.client.login(username=self.second_user.username, password='Password123')
+        url = reverse('view_task', kwargs={'team_id': self.team.id, 'task_id': self.task.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {'usernames': [self.user.username], 'assign_submit': ''})
+        event = ActivityEvent.objects.filter(actor=self.second_user).latest('timestamp', 'id')
+        self.assertEqual(event.description, f"{self.second_user.username} assigned {self.user.username} to the task 'Task 1'")
+        # The user is only set for the length of the request
+        self.assertIsNone(get_current_user())
+
+    def test_anonymous_users_are_not_returned(self):
+        with acting_as(AnonymousUser()):
+            self.assertIsNone(get_current_user())
@@ -1,8 +1,11 @@
 """Unit tests for the notification middleware"""
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils.functional import empty
 from tasks.models import User, Task, Team
+from tasks.notifications import get_notifications
 from datetime import date, timedelta
 
 class NotificationsTestCase(TestCase):
@@ -14,6 +17,7 @@ class NotificationsTestCase(TestCase):
     ]
 
     def setUp(self):
+        cache.clear()
         self.user = User.objects.get(username='@johndoe')
         self.second_user = User.objects.get(username='@janedoe')
         self.team = Team.objects.get(team_name='Team 1')
@@ -171,6 +175,80 @@ class NotificationsTestCase(TestCase):
         # Assert count decreased by 1
         self.assertEqual(after_count, before_count - 1)
 
+    def test_notification_messages_keep_their_format(self):
+        self.task.assigned_to.set([self.user])
+        self.second_task.assigned_to.set([self.user])
+        self.second_task.priority = 'high'
+        self.second_task.save()
+
+        notifications = get_notifications(self.user)
+        self.assertEqual(notifications[0], (f"<strong>REMINDER:</strong> <span style='color: red;'> <strong>High</strong> </span> priority task 'Task 2' is due on {date.today()}.", self.second_task.id))
+        self.assertEqual(notifications[1], (f"<strong>REMINDER:</strong> <span style='color: yellow;'> <strong>Medium</strong> </span> priority task 'Task 1' is due on {date.today()}.", self.task.id))
+
+    def test_completed_and_unassigned_team_tasks_are_not_notified(self):
+        self.task.assigned_to.set([self.user])
+        self.second_task.assigned_to.set([self.user])
+        self.second_task.task_completed = True
+        self.second_task.save()
+        # Task from a team the user is not in
+        other_team = Team.objects.create(team_name='Team 2', admin_user=self.second_user)
+        other_task = Task.objects.create(title='Task 4', due_date=date.today(), created_by=other_team, reminder_days=1)
+        other_task.assigned_to.set([self.user])
+
+        id_list = [pair[1] for pair in get_notifications(self.user)]
+        self.assertListEqual(id_list, [self.task.id])
+
+    def test_notification_query_count_does_not_depend_on_teams_or_tasks(self):
+        self.task.assigned_to.set([self.user])
+        with self.assertNumQueries(1):
+            self.assertEqual(len(get_notifications(self.user)), 1)
+
+        # Add lots more teams and due tasks for the user
+        for team_number in range(10):
+            team = Team.objects.create(team_name=f'Extra team {team_number}', admin_user=self.user)
+            self.user.teams.add(team)
+            for task_number in range(5):
+                task = Task.objects.create(title=f'Extra task {task_number}', due_date=date.today(), created_by=team, reminder_days=1)
+                task.assigned_to.set([self.user])
+
+        with self.assertNumQueries(1):
+            self.assertEqual(len(get_notifications(self.user)), 51)
+
+    def test_notifications_are_not_queried_unless_they_are_read(self):
+        self.task.assigned_to.set([self.user])
+        # The create task page doesn't display notifications, so they are never worked out
+        response = self.client.get(reverse('create_task', kwargs={'pk': self.team.id}))
+        self.assertIs(response.wsgi_request.notifications_list._wrapped, empty)
+        # The dashboard displays them
+        response = self.client.get(self.url)
+        self.assertIsNot(response.wsgi_request.notifications_list._wrapped, empty)
+        self.assertContains(response, "priority task 'Task 1'")
+
+    def test_redirect_only_urls_skip_notifications(self):
+        self.task.assigned_to.set([self.user])
+        response = self.client.get(f"{reverse('mark_as_seen')}?task_id={self.second_task.id}")
+        self.assertIsNone(response.wsgi_request.notifications_list)
+        response = self.client.post(reverse('submit_time', kwargs={'team_id': self.team.id, 'task_id': self.task.id}), {'hours': 1})
+        self.assertIsNone(response.wsgi_request.notifications_list)
+
+    def test_admin_namespace_skips_notifications(self):
+        response = self.client.get(reverse('admin:index'))
+        self.assertIsNone(response.wsgi_request.notifications_list)
+
+    @override_settings(NOTIFICATION_URL_NAMES=['dashboard'])
+    def test_allow_list_only_gives_notifications_to_listed_urls(self):
+        self.task.assigned_to.set([self.user])
+        self.check_notifications(reverse('dashboard'), 1)
+        response = self.client.get(reverse('show_team', kwargs={'team_id': self.team.id}))
+        self.assertIsNone(response.wsgi_request.notifications_list)
+
+    @override_settings(NOTIFICATION_SKIP_URL_NAMES=['show_team'])
+    def test_skip_list_can_be_configured(self):
+        self.task.assigned_to.set([self.user])
+        self.check_notifications(reverse('dashboard'), 1)
+        response = self.client.get(reverse('show_team', kwargs={'team_id': self.team.id}))
+        self.assertIsNone(response.wsgi_request.notifications_list)
+
     def check_notifications(self, url, number):
         response = self.client.get(url)
         notifications_list = response.wsgi_request.notifications_list
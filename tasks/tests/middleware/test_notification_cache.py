@@ -0,0 +1,115 @@
+"""Unit tests for the per-user notification cache"""
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from tasks.models import User, Task, Team
+from tasks.notifications import get_cached_notifications, notifications_cache_key, notification_cache_stats, reset_notification_cache_stats
+from datetime import date, timedelta
+from unittest import mock
+
+class NotificationCacheTestCase(TestCase):
+
+    fixtures = [
+        'tasks/tests/fixtures/default_user.json',
+        'tasks/tests/fixtures/other_users.json',
+        'tasks/tests/fixtures/default_team.json'
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.get(username='@johndoe')
+        self.second_user = User.objects.get(username='@janedoe')
+        self.team = Team.objects.get(team_name='Team 1')
+        self.user.teams.set([self.team])
+        self.second_user.teams.set([self.team])
+        self.task = Task.objects.create(title='Task 1', description='This is a test task.', due_date=date.today(), priority='medium', created_by=self.team, reminder_days=1)
+        self.task.assigned_to.set([self.user])
+        self.second_task = Task.objects.create(title='Task 2', description='This is a second test task.', due_date=date.today(), priority='medium', created_by=self.team, reminder_days=1)
+
+    def test_second_lookup_is_served_from_the_cache(self):
+        with self.assertNumQueries(1):
+            notifications = get_cached_notifications(self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_cached_notifications(self.user), notifications)
+
+    def test_cache_key_changes_at_midnight(self):
+        today = date.today()
+        self.assertNotEqual(notifications_cache_key(self.user.pk, today), notifications_cache_key(self.user.pk, today + timedelta(days=1)))
+
+    def test_next_day_recalculates_notifications(self):
+        # Not due soon today, but it will be tomorrow
+        self.second_task.due_date = date.today() + timedelta(days=2)
+        self.second_task.save()
+        self.second_task.assigned_to.add(self.user)
+        self.assertEqual([pair[1] for pair in get_cached_notifications(self.user)], [self.task.id])
+        tomorrow = date.today() + timedelta(days=1)
+        with mock.patch('tasks.notifications.date') as mock_date:
+            mock_date.today.return_value = tomorrow
+            # Task 1 is overdue by then, Task 2 is now due soon
+            self.assertEqual([pair[1] for pair in get_cached_notifications(self.user)], [self.second_task.id])
+
+    def test_editing_a_task_clears_the_cache(self):
+        self.assertEqual(len(get_cached_notifications(self.user)), 1)
+        self.task.due_date = date.today() + timedelta(days=5)
+        self.task.save()
+        self.assertEqual(len(get_cached_notifications(self.user)), 0)
+
+    def test_deleting_a_task_clears_the_cache(self):
+        self.assertEqual(len(get_cached_notifications(self.user)), 1)
+        self.task.delete()
+        self.assertEqual(len(get_cached_notifications(self.user)), 0)
+
+    def test_assigning_and_unassigning_clears_the_cache(self):
+        self.assertEqual(len(get_cached_notifications(self.user)), 1)
+        self.second_task.assigned_to.add(self.user)
+        self.assertEqual(len(get_cached_notifications(self.user)), 2)
+        self.second_task.assigned_to.remove(self.user)
+        self.assertEqual(len(get_cached_notifications(self.user)), 1)
+        self.task.assigned_to.clear()
+        self.assertEqual(len(get_cached_notifications(self.user)), 0)
+        # Assigning from the user's side
+        self.user.task_set.add(self.task)
+        self.assertEqual(len(get_cached_notifications(self.user)), 1)
+
+    def test_leaving_a_team_clears_the_cache(self):
+        self.assertEqual(len(get_cached_notifications(self.user)), 1)
+        self.team.members.remove(self.user)
+        self.user.teams.remove(self.team)
+        self.assertEqual(len(get_cached_notifications(self.user)), 0)
+        self.team.user_set.add(self.user)
+        self.assertEqual(len(get_cached_notifications(self.user)), 1)
+
+    def test_changes_only_clear_the_affected_users(self):
+        self.second_task.assigned_to.add(self.second_user)
+        get_cached_notifications(self.user)
+        get_cached_notifications(self.second_user)
+        self.task.title = 'New title'
+        self.task.save()
+        self.assertIsNone(cache.get(notifications_cache_key(self.user.pk)))
+        self.assertIsNotNone(cache.get(notifications_cache_key(self.second_user.pk)))
+
+    def test_changes_not_shown_in_notifications_keep_the_cache(self):
+        get_cached_notifications(self.user)
+        task = Task.objects.get(pk=self.task.pk)
+        task.description = 'New description'
+        task.save()
+        self.assertIsNotNone(cache.get(notifications_cache_key(self.user.pk)))
+
+    def test_mark_as_seen_clears_the_cache(self):
+        self.client.login(username=self.user.username, password='Password123')
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(len(response.wsgi_request.notifications_list), 1)
+        self.client.get(f"{reverse('mark_as_seen')}?task_id={self.task.id}")
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(len(response.wsgi_request.notifications_list), 0)
+
+    def test_hit_and_miss_counters(self):
+        reset_notification_cache_stats()
+        get_cached_notifications(self.user)
+        get_cached_notifications(self.user)
+        get_cached_notifications(self.user)
+        stats = notification_cache_stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 2)
+        self.assertAlmostEqual(stats['hit_ratio'], 2 / 3)
@@ -0,0 +1,59 @@
+"""Unit tests for the Activity Event model."""
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from tasks.models import User, Team, ActivityEvent
+
+class ActivityEventModelTestCase(TestCase):
+    """Unit tests for the Activity Event model."""
+
+    fixtures = [
+        'tasks/tests/fixtures/default_user.json',
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.team = Team.objects.create(team_name='Team 1', admin_user=self.user)
+        self.event = ActivityEvent.objects.create(actor=self.user, event_type='team_created', description='Valid Entry', target=self.team)
+
+    def test_valid_activity_event(self):
+        self._assert_activity_event_is_valid()
+
+    def test_description_cannot_be_blank(self):
+        self.event.description = ''
+        self._assert_activity_event_is_invalid()
+
+    def test_actor_cannot_be_null(self):
+        self.event.actor = None
+        self._assert_activity_event_is_invalid()
+
+    def test_event_type_must_be_a_valid_choice(self):
+        self.event.event_type = 'not_an_event'
+        self._assert_activity_event_is_invalid()
+
+    def test_target_can_be_blank(self):
+        self.event.target = None
+        self._assert_activity_event_is_valid()
+
+    def test_payload_default(self):
+        self.assertEqual(self.event.payload, {})
+
+    def test_timestamp_default(self):
+        self.assertIsNotNone(self.event.timestamp)
+        self.assertIsNotNone(self.event.timestamp.tzinfo)
+
+    def test_target_is_kept_after_it_is_deleted(self):
+        team_id = self.team.id
+        self.team.delete()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.target_id, team_id)
+        self.assertIsNone(self.event.target)
+
+    def _assert_activity_event_is_valid(self):
+        try:
+            self.event.full_clean()
+        except (ValidationError):
+            self.fail('Test activity event should be valid')
+
+    def _assert_activity_event_is_invalid(self):
+        with self.assertRaises(ValidationError):
+            self.event.full_clean()
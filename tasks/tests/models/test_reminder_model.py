@@ -0,0 +1,113 @@
+"""Unit tests for the Reminder model (the notification inbox)."""
+from django.core.management import call_command
+from django.test import TestCase
+from tasks.models import User, Team, Task, Reminder
+from tasks.notifications import build_reminders, get_notifications
+from datetime import date, timedelta
+from io import StringIO
+
+class ReminderModelTestCase(TestCase):
+
+    fixtures = [
+        'tasks/tests/fixtures/default_user.json',
+        'tasks/tests/fixtures/other_users.json',
+        'tasks/tests/fixtures/default_team.json'
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.second_user = User.objects.get(username='@janedoe')
+        self.team = Team.objects.get(team_name='Team 1')
+        self.user.teams.set([self.team])
+        self.second_user.teams.set([self.team])
+        self.task = Task.objects.create(
+            title='Task 1',
+            description='This is a task',
+            due_date=date.today() + timedelta(days=3),
+            priority='high',
+            created_by=self.team,
+            reminder_days=2,
+        )
+
+    def test_assigning_a_task_adds_a_reminder(self):
+        self.assertFalse(Reminder.objects.exists())
+        self.task.assigned_to.add(self.user, self.second_user)
+        reminder = Reminder.objects.get(user=self.user)
+        self.assertEqual(reminder.task, self.task)
+        self.assertEqual(reminder.priority, Task.PRIORITY_RANKS['high'])
+        self.assertEqual(reminder.remind_from, date.today() + timedelta(days=1))
+        self.assertEqual(reminder.due_date, self.task.due_date)
+        self.assertFalse(reminder.seen)
+        self.assertEqual(Reminder.objects.count(), 2)
+
+    def test_unassigning_a_task_removes_the_reminder(self):
+        self.task.assigned_to.add(self.user, self.second_user)
+        self.task.assigned_to.remove(self.second_user)
+        self.assertEqual(list(Reminder.objects.values_list('user', flat=True)), [self.user.id])
+        self.task.assigned_to.clear()
+        self.assertFalse(Reminder.objects.exists())
+        # From the user's side
+        self.user.task_set.add(self.task)
+        self.assertTrue(Reminder.objects.filter(user=self.user).exists())
+        self.user.task_set.clear()
+        self.assertFalse(Reminder.objects.exists())
+
+    def test_editing_a_task_updates_its_reminders(self):
+        self.task.assigned_to.add(self.user)
+        self.task.priority = 'low'
+        self.task.due_date = date.today() + timedelta(days=5)
+        self.task.reminder_days = 5
+        self.task.save()
+        reminder = Reminder.objects.get(user=self.user)
+        self.assertEqual(reminder.priority, Task.PRIORITY_RANKS['low'])
+        self.assertEqual(reminder.remind_from, date.today())
+
+    def test_completing_or_removing_the_reminder_removes_it(self):
+        self.task.assigned_to.add(self.user)
+        self.task.task_completed = True
+        self.task.save()
+        self.assertFalse(Reminder.objects.exists())
+        self.task.task_completed = False
+        self.task.save()
+        self.assertTrue(Reminder.objects.exists())
+        self.task.reminder_days = None
+        self.task.save()
+        self.assertFalse(Reminder.objects.exists())
+
+    def test_seeing_a_task_marks_the_reminder_as_seen(self):
+        self.task.assigned_to.add(self.user)
+        self.task.seen = True
+        self.task.save()
+        self.assertTrue(Reminder.objects.get(user=self.user).seen)
+
+    def test_deleting_a_task_deletes_its_reminders(self):
+        self.task.assigned_to.add(self.user)
+        self.task.delete()
+        self.assertFalse(Reminder.objects.exists())
+
+    def test_build_reminders_rebuilds_the_inbox(self):
+        self.task.assigned_to.add(self.user, self.second_user)
+        overdue_task = Task.objects.create(title='Task 2', due_date=date.today() + timedelta(days=1), created_by=self.team, reminder_days=1)
+        overdue_task.assigned_to.add(self.user)
+        # Simulate the day passing without the task being edited
+        Task.objects.filter(pk=overdue_task.pk).update(due_date=date.today() - timedelta(days=1))
+        Reminder.objects.filter(user=self.second_user).delete()
+        self.assertEqual(build_reminders(), 2)
+        self.assertEqual(set(Reminder.objects.values_list('user', 'task')), {(self.user.id, self.task.id), (self.second_user.id, self.task.id)})
+
+    def test_build_reminders_command(self):
+        self.task.assigned_to.add(self.user)
+        Reminder.objects.all().delete()
+        output = StringIO()
+        call_command('build_reminders', stdout=output)
+        self.assertIn('Built 1 reminders.', output.getvalue())
+        self.assertTrue(Reminder.objects.filter(user=self.user, task=self.task).exists())
+
+    def test_notifications_are_read_from_the_inbox(self):
+        self.task.assigned_to.add(self.user)
+        self.task.due_date = date.today()
+        self.task.save()
+        self.assertEqual([pair[1] for pair in get_notifications(self.user)], [self.task.id])
+        # Without an inbox row there is no notification
+        Reminder.objects.all().delete()
+        self.assertEqual(get_notifications(self.user), [])
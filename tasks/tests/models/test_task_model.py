@@ -59,6 +59,59 @@ class TaskModelTestCase(TestCase):
         self.task.priority = None
         self._assert_task_is_invalid()
 
+    def test_loaded_task_has_no_changes(self):
+        task = Task.objects.get(pk=self.task.pk)
+        self.assertEqual(task.changed_fields(), {})
+
+    def test_changed_fields_without_queries(self):
+        task = Task.objects.get(pk=self.task.pk)
+        task.title = 'New title'
+        task.task_completed = 'True'
+        with self.assertNumQueries(0):
+            changes = task.changed_fields()
+        self.assertEqual(changes, {'title': ('Task 1', 'New title'), 'task_completed': (False, True)})
+
+    def test_changed_fields_are_cleaned_before_comparing(self):
+        task = Task.objects.get(pk=self.task.pk)
+        task.task_completed = 'False'
+        task.due_date = '2024-02-01'
+        self.assertEqual(task.changed_fields(), {})
+
+    def test_changed_fields_can_be_limited(self):
+        task = Task.objects.get(pk=self.task.pk)
+        task.title = 'New title'
+        task.description = 'New description'
+        self.assertEqual(list(task.changed_fields(['description'])), ['description'])
+
+    def test_no_changes_after_saving(self):
+        task = Task.objects.get(pk=self.task.pk)
+        task.title = 'New title'
+        task.save()
+        self.assertEqual(task.changed_fields(), {})
+        self.assertEqual(task.loaded_value('title'), 'New title')
+
+    def test_only_update_fields_are_saved_as_unchanged(self):
+        task = Task.objects.get(pk=self.task.pk)
+        task.title = 'New title'
+        task.description = 'New description'
+        task.save(update_fields=['title'])
+        self.assertEqual(list(task.changed_fields()), ['description'])
+
+    def test_deferred_fields_are_not_tracked(self):
+        task = Task.objects.only('title').get(pk=self.task.pk)
+        self.assertEqual(task.changed_fields(), {})
+        task.description = 'New description'
+        self.assertEqual(task.changed_fields(), {})
+
+    def test_new_task_has_no_changes(self):
+        task = Task(title='Task 2', due_date='2024-02-01')
+        self.assertEqual(task.changed_fields(), {})
+
+    def test_track_changes_from_another_instance(self):
+        task = Task(id=self.task.id, title='New title', description='This is a task', due_date='2024-02-01')
+        task.track_changes_from(Task.objects.get(pk=self.task.pk))
+        self.assertEqual(task.changed_fields(), {'title': ('Task 1', 'New title')})
+
     def _assert_task_is_valid(self):
         try:
             self.task.full_clean()
@@ -1,5 +1,8 @@
 """Unit tests for the TimeSpent model."""
+from unittest import mock
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import QuerySet
 from django.test import TestCase
 from tasks.models import User, Team, Task, TimeSpent
 
@@ -46,11 +49,40 @@ class TimeSpentModelTestCase(TestCase):
     
     def test_time_spent_defaults_to_0_when_unspecified(self):
         second_time_spent = TimeSpent.objects.create(
-            user=self.user,
+            user=User.objects.get(username='@janedoe'),
             task=self.task,
         )
         self.assertEqual(second_time_spent.time_spent, 0)
 
+    def test_user_can_only_have_one_time_spent_per_task(self):
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                TimeSpent.objects.create(user=self.user, task=self.task)
+        self._assert_time_spent_is_valid()
+
+    def test_add_time_adds_to_the_existing_time(self):
+        TimeSpent.add_time(self.user, self.task, 15)
+        self.time_spent.refresh_from_db()
+        self.assertEqual(self.time_spent.time_spent, 45)
+
+    def test_add_time_creates_the_time_spent(self):
+        other_user = User.objects.get(username='@janedoe')
+        TimeSpent.add_time(other_user, self.task, 15)
+        self.assertEqual(TimeSpent.objects.get(user=other_user, task=self.task).time_spent, 15)
+
+    def test_add_time_adds_to_a_time_spent_created_at_the_same_time(self):
+        #the first update finds no row, as if another request created it just after
+        original_update = QuerySet.update
+        calls = []
+        def update(queryset, **kwargs):
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else original_update(queryset, **kwargs)
+        with mock.patch.object(QuerySet, 'update', update):
+            TimeSpent.add_time(self.user, self.task, 15)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(TimeSpent.objects.filter(user=self.user, task=self.task).count(), 1)
+        self.time_spent.refresh_from_db()
+        self.assertEqual(self.time_spent.time_spent, 45)
 
     def _assert_time_spent_is_valid(self):
         try:
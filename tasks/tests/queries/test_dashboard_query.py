@@ -0,0 +1,92 @@
+"""Unit tests for the dashboard's search, sort and filter query."""
+from django.test import TestCase
+from tasks.models import User, Team, Task
+from tasks.queries import DashboardQuery
+from datetime import date, timedelta
+
+class DashboardQueryTestCase(TestCase):
+    """Unit tests for the dashboard's search, sort and filter query."""
+
+    fixtures = [
+        'tasks/tests/fixtures/default_user.json',
+        'tasks/tests/fixtures/other_users.json',
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.second_user = User.objects.get(username='@janedoe')
+        self.team = Team.objects.create(team_name='Team 1', admin_user=self.user)
+        self.low = Task.objects.create(title='Write report', description='Low task', due_date=date.today() + timedelta(3),
+                                       created_by=self.team, priority='low', task_completed=True)
+        self.high = Task.objects.create(title='Fix bug', description='Report the bug', due_date=date.today() + timedelta(1),
+                                        created_by=self.team, priority='high')
+        self.medium = Task.objects.create(title='Plan meeting', description='Medium task', due_date=date.today() + timedelta(2),
+                                          created_by=self.team, priority='medium')
+        self.low.assigned_to.add(self.user, self.second_user)
+        self.medium.assigned_to.add(self.second_user)
+        self.tasks = Task.objects.filter(created_by=self.team)
+
+    def test_default_query_keeps_every_task(self):
+        query = DashboardQuery()
+        self.assertEqual(set(query.apply(self.tasks)), {self.low, self.high, self.medium})
+
+    def test_sort_by_priority(self):
+        query = DashboardQuery(order='priority')
+        self.assertEqual(list(query.apply(self.tasks)), [self.high, self.medium, self.low])
+
+    def test_sort_by_due_date(self):
+        query = DashboardQuery(order='due_date')
+        self.assertEqual(list(query.apply(self.tasks)), [self.high, self.medium, self.low])
+
+    def test_sort_by_assigned_to_has_one_row_per_task(self):
+        query = DashboardQuery(order='assigned_to')
+        #no one is assigned to the high priority task, so it comes first
+        self.assertEqual(list(query.apply(self.tasks)), [self.high, self.low, self.medium])
+
+    def test_search_title_and_description(self):
+        query = DashboardQuery(search='report')
+        self.assertEqual(set(query.apply(self.tasks)), {self.low, self.high})
+
+    def test_filter(self):
+        query = DashboardQuery(filter='CompletedFalse')
+        self.assertEqual(set(query.apply(self.tasks)), {self.high, self.medium})
+        self.assertEqual(query.filter_description, 'tasks that are incomplete')
+
+    def test_search_sort_and_filter_together(self):
+        query = DashboardQuery(search='task', order='priority', filter='CompletedFalse')
+        self.assertEqual(list(query.apply(self.tasks)), [self.medium])
+        query = DashboardQuery(search='report', order='priority')
+        self.assertEqual(list(query.apply(self.tasks)), [self.high, self.low])
+
+    def test_query_is_one_database_query(self):
+        query = DashboardQuery(search='a', order='assigned_to', filter='priorityLow')
+        with self.assertNumQueries(1):
+            list(query.apply(self.tasks))
+
+    def test_every_order_can_be_paged_through(self):
+        for order in ['default'] + list(DashboardQuery.ORDERINGS):
+            query = DashboardQuery(order=order)
+            pages = [query.page(self.tasks, 2)]
+            pages.append(query.page(self.tasks, 2, after=pages[0].next_cursor))
+            self.assertEqual([task for page in pages for task in page], list(query.apply(self.tasks)), order)
+            self.assertFalse(pages[1].has_next)
+
+    def test_search_results_can_be_paged_through(self):
+        query = DashboardQuery(search='report')
+        first_page = query.page(self.tasks, 1)
+        second_page = query.page(self.tasks, 1, after=first_page.next_cursor)
+        self.assertEqual(list(first_page) + list(second_page), list(query.apply(self.tasks)))
+        self.assertEqual(set(first_page) | set(second_page), {self.low, self.high})
+
+    def test_unknown_options_are_ignored(self):
+        query = DashboardQuery(order='password', filter='everything')
+        self.assertEqual(query.order, 'default')
+        self.assertIsNone(query.filter)
+        self.assertEqual(query.filter_description, '')
+        self.assertEqual(len(query.apply(self.tasks)), 3)
+
+    def test_params_keep_the_other_options(self):
+        query = DashboardQuery(search='bug fix', order='priority', filter='priorityHigh')
+        self.assertEqual(query.params_without_order, 'search_query=bug+fix&filter=priorityHigh')
+        self.assertEqual(query.params_without_filter, 'search_query=bug+fix&order=priority')
+        self.assertEqual(DashboardQuery().params(), '')
@@ -0,0 +1,98 @@
+"""Unit tests for keyset pagination."""
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from tasks.models import User, Team, Task
+from tasks.pagination import keyset_paginate, encode_cursor, decode_cursor
+from datetime import date, timedelta
+
+class KeysetPaginationTestCase(TestCase):
+    """Unit tests for keyset pagination."""
+
+    KEYS = ('last_name', 'first_name', 'id')
+
+    def setUp(self):
+        names = [('Amy', 'Brown'), ('Ben', 'Adams'), ('Cat', 'Brown'), ('Amy', 'Brown'), ('Dan', 'Clark')]
+        for i, (first_name, last_name) in enumerate(names):
+            User.objects.create_user(f'@user{i}', first_name=first_name, last_name=last_name,
+                                     email=f'user{i}@example.org', password='Password123')
+        self.users = list(User.objects.order_by(*self.KEYS))
+
+    def test_first_page(self):
+        page = keyset_paginate(User.objects.all(), self.KEYS, 2)
+        self.assertEqual(list(page), self.users[:2])
+        self.assertTrue(page.has_next)
+        self.assertFalse(page.has_previous)
+        self.assertIsNone(page.previous_cursor)
+
+    def test_pages_follow_on_from_each_other(self):
+        seen = []
+        after = None
+        while True:
+            page = keyset_paginate(User.objects.all(), self.KEYS, 2, after=after)
+            seen += list(page)
+            if not page.has_next:
+                break
+            after = page.next_cursor
+        #users with the same name are told apart by id, so none are skipped or shown twice
+        self.assertEqual(seen, self.users)
+        self.assertIsNone(page.next_cursor)
+
+    def test_page_before_a_cursor(self):
+        second_page = keyset_paginate(User.objects.all(), self.KEYS, 2, after=keyset_paginate(User.objects.all(), self.KEYS, 2).next_cursor)
+        third_page = keyset_paginate(User.objects.all(), self.KEYS, 2, after=second_page.next_cursor)
+        self.assertEqual(list(third_page), self.users[4:])
+        second_page = keyset_paginate(User.objects.all(), self.KEYS, 2, before=third_page.previous_cursor)
+        self.assertEqual(list(second_page), self.users[2:4])
+        self.assertTrue(second_page.has_next)
+        self.assertTrue(second_page.has_previous)
+        first_page = keyset_paginate(User.objects.all(), self.KEYS, 2, before=second_page.previous_cursor)
+        self.assertEqual(list(first_page), self.users[:2])
+        self.assertFalse(first_page.has_previous)
+
+    def test_invalid_cursors_give_the_first_page(self):
+        for cursor in ['nonsense', '!!!', encode_cursor(['Brown']), encode_cursor({'id': 1})]:
+            page = keyset_paginate(User.objects.all(), self.KEYS, 2, after=cursor)
+            self.assertEqual(list(page), self.users[:2])
+            self.assertFalse(page.has_previous)
+
+    def test_cursors_with_the_wrong_types_give_the_first_page(self):
+        for values in [['Adams', 'Ben', 'abc'], ['Adams', 'Ben', None], [['Adams'], 'Ben', 1]]:
+            page = keyset_paginate(User.objects.all(), self.KEYS, 2, after=encode_cursor(values))
+            self.assertIsNone(page.after)
+            self.assertEqual(list(page), self.users[:2])
+
+    def test_cursors_for_annotations_are_checked(self):
+        users = User.objects.annotate(task_count=Count('task'))
+        page = keyset_paginate(users, ('task_count', 'id'), 2, after=encode_cursor(['lots', 1]))
+        self.assertIsNone(page.after)
+        page = keyset_paginate(users, ('task_count', 'id'), 2, after=encode_cursor([0, self.users[0].id]))
+        self.assertIsNotNone(page.after)
+
+    def test_cursors_keep_dates(self):
+        user = self.users[0]
+        team = Team.objects.create(team_name='Team', admin_user=user)
+        tasks = [Task.objects.create(title=f'Task {i}', due_date=date(2030, 1, 1) + timedelta(i // 2), created_by=team)
+                 for i in range(5)]
+        page = keyset_paginate(Task.objects.all(), ('due_date', 'id'), 3)
+        fields = [Task._meta.get_field('due_date'), Task._meta.pk]
+        self.assertEqual(decode_cursor(page.next_cursor, fields), [date(2030, 1, 2), tasks[2].id])
+        page = keyset_paginate(Task.objects.all(), ('due_date', 'id'), 3, after=page.next_cursor)
+        self.assertEqual(list(page), tasks[3:])
+
+    def test_pages_are_fetched_when_used(self):
+        with self.assertNumQueries(0):
+            page = keyset_paginate(User.objects.all(), self.KEYS, 2, after=encode_cursor(['Adams', 'Ben', 1]))
+            self.assertIsNotNone(page.after)
+
+    def test_a_page_is_one_query_without_offset_or_count(self):
+        cursor = keyset_paginate(User.objects.all(), self.KEYS, 2).next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            page = keyset_paginate(User.objects.all(), self.KEYS, 2, after=cursor)
+            list(page)
+            page.has_next
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]['sql'].upper()
+        self.assertNotIn('OFFSET', sql)
+        self.assertNotIn('COUNT(', sql)
@@ -0,0 +1,114 @@
+"""Unit tests for the full-text task search."""
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from tasks.models import User, Team, Task
+from tasks.queries import DashboardQuery
+from tasks.search import FTS_TABLE, fts_enabled, match_expression, search_tasks, highlight_matches
+from datetime import date
+
+class TaskSearchTestCase(TestCase):
+    """Unit tests for the full-text task search."""
+
+    fixtures = ['tasks/tests/fixtures/default_user.json']
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.team = Team.objects.create(team_name='Team 1', admin_user=self.user)
+        self.team.members.add(self.user)
+        self.user.teams.add(self.team)
+        self.report = Task.objects.create(title='Quarterly report', description='Write the report for the report meeting',
+                                          due_date=date.today(), created_by=self.team)
+        self.meeting = Task.objects.create(title='Book a room', description='Room for the report meeting',
+                                           due_date=date.today(), created_by=self.team)
+        self.other = Task.objects.create(title='Fix the <b>bug</b>', description='Nothing to see here',
+                                         due_date=date.today(), created_by=self.team)
+        self.tasks = Task.objects.filter(created_by=self.team)
+
+    def test_full_text_search_is_available(self):
+        self.assertTrue(fts_enabled())
+
+    def test_match_expression(self):
+        self.assertEqual(match_expression('report meet'), '"report" "meet"*')
+        #operators are searched for as words
+        self.assertEqual(match_expression('bug OR NOT'), '"bug" "OR" "NOT"*')
+        self.assertIsNone(match_expression('%%'))
+
+    def test_search_ranks_the_best_match_first(self):
+        self.assertEqual(list(search_tasks(self.tasks, 'report')), [self.report, self.meeting])
+
+    def test_search_reads_the_search_table_once(self):
+        #one join for the ranked ids and marked matches, then the tasks by id
+        with CaptureQueriesContext(connection) as queries:
+            search_tasks(self.tasks, 'report')
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(sum(query['sql'].count('MATCH') for query in queries), 1)
+
+    def test_search_continues_after_a_task(self):
+        [first] = search_tasks(self.tasks, 'report', limit=1)
+        self.assertEqual(first, self.report)
+        self.assertEqual(search_tasks(self.tasks, 'report', after=(first.search_rank, first.id)), [self.meeting])
+
+    def test_search_of_no_tasks(self):
+        self.assertEqual(search_tasks(self.tasks.none(), 'report'), [])
+
+    def test_search_sorted_another_way_marks_the_page(self):
+        page = DashboardQuery(search='report', order='title').page(self.tasks, 10)
+        self.assertEqual(list(page), [self.meeting, self.report])
+        self.assertEqual(highlight_matches(page[1].search_title), 'Quarterly <mark>report</mark>')
+
+    def test_search_matches_the_start_of_the_last_word(self):
+        self.assertEqual(list(search_tasks(self.tasks, 'boo')), [self.meeting])
+        self.assertEqual(list(search_tasks(self.tasks, 'room meet')), [self.meeting])
+
+    def test_search_only_looks_in_the_given_tasks(self):
+        tasks = self.tasks.exclude(pk=self.report.pk)
+        self.assertEqual(list(search_tasks(tasks, 'report')), [self.meeting])
+
+    def test_search_marks_the_matches(self):
+        [task] = search_tasks(self.tasks, 'bug')
+        self.assertEqual(highlight_matches(task.search_title), 'Fix the &lt;b&gt;<mark>bug</mark>&lt;/b&gt;')
+        [task] = search_tasks(self.tasks, 'room')
+        self.assertIn('<mark>Room</mark>', highlight_matches(task.search_snippet))
+
+    def test_search_is_kept_up_to_date_when_tasks_change(self):
+        self.other.title = 'Renamed task'
+        self.other.save()
+        self.assertEqual(list(search_tasks(self.tasks, 'bug')), [])
+        self.assertEqual(list(search_tasks(self.tasks, 'renamed')), [self.other])
+        new_task = Task.objects.create(title='Brand new', due_date=date.today(), created_by=self.team)
+        self.assertEqual(list(search_tasks(self.tasks, 'brand')), [new_task])
+
+    def test_deleted_tasks_are_removed_from_the_search_table(self):
+        task_id = self.other.id
+        self.other.delete()
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE} WHERE rowid = %s', [task_id])
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_rebuild_command(self):
+        #update() doesn't send signals, so the search table is out of date until it is rebuilt
+        Task.objects.filter(pk=self.other.pk).update(title='Updated directly')
+        self.assertEqual(list(search_tasks(self.tasks, 'directly')), [])
+        out = StringIO()
+        call_command('rebuild_task_search', stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'Indexed 3 tasks.')
+        self.assertEqual(list(search_tasks(self.tasks, 'directly')), [self.other])
+
+    def test_search_without_full_text_search_uses_like(self):
+        with mock.patch('tasks.search.fts_enabled', return_value=False):
+            #LIKE matches inside words too
+            self.assertEqual(set(search_tasks(self.tasks, 'eport')), {self.report, self.meeting})
+
+    def test_search_without_words_uses_like(self):
+        self.assertEqual(list(search_tasks(self.tasks, '</')), [self.other])
+
+    def test_dashboard_shows_the_marked_matches(self):
+        self.client.login(username=self.user.username, password='Password123')
+        response = self.client.get(reverse('dashboard'), {'search_query': 'quarter'})
+        self.assertEqual(list(response.context['team_tasks'][0][1]), [self.report])
+        self.assertContains(response, '<mark>Quarterly</mark> report')
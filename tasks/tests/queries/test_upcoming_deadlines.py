@@ -0,0 +1,49 @@
+"""Unit tests for the dashboard's upcoming deadlines."""
+from django.test import TestCase
+from tasks.models import User, Team, Task
+from tasks.queries import upcoming_deadlines, upcoming_deadlines_queryset
+from datetime import date, timedelta
+
+class UpcomingDeadlinesTestCase(TestCase):
+    """Unit tests for the dashboard's upcoming deadlines."""
+
+    fixtures = ['tasks/tests/fixtures/default_user.json']
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.team = Team.objects.create(team_name='Team 1', admin_user=self.user)
+        self.second_team = Team.objects.create(team_name='Team 2', admin_user=self.user)
+        self.other_team = Team.objects.create(team_name='Team 3', admin_user=self.user)
+        self.today = date(2030, 1, 1)
+        self.later = Task.objects.create(title='Later', due_date=self.today + timedelta(5), created_by=self.team)
+        self.soon = Task.objects.create(title='Soon', due_date=self.today + timedelta(1), created_by=self.second_team)
+        self.due_today = Task.objects.create(title='Today', due_date=self.today, created_by=self.team)
+        self.also_soon = Task.objects.create(title='Also soon', due_date=self.today + timedelta(1), created_by=self.team)
+        #none of these are shown
+        Task.objects.create(title='Overdue', due_date=self.today - timedelta(1), created_by=self.team)
+        Task.objects.create(title='Done', due_date=self.today + timedelta(1), created_by=self.team, task_completed=True)
+        Task.objects.create(title='Other team', due_date=self.today, created_by=self.other_team)
+        self.teams = [self.team, self.second_team]
+
+    def test_incomplete_tasks_soonest_first(self):
+        tasks, has_more = upcoming_deadlines(self.teams, 10, today=self.today)
+        self.assertEqual(tasks, [self.due_today, self.soon, self.also_soon, self.later])
+        self.assertFalse(has_more)
+
+    def test_deadlines_are_limited(self):
+        tasks, has_more = upcoming_deadlines(self.teams, 2, today=self.today)
+        self.assertEqual(tasks, [self.due_today, self.soon])
+        self.assertTrue(has_more)
+
+    def test_deadlines_after_the_last_one_shown(self):
+        tasks, has_more = upcoming_deadlines(self.teams, 2, after=(self.soon.due_date, self.soon.id), today=self.today)
+        self.assertEqual(tasks, [self.also_soon, self.later])
+        self.assertFalse(has_more)
+
+    def test_deadlines_are_one_query(self):
+        with self.assertNumQueries(1):
+            upcoming_deadlines(Team.objects.filter(pk__in=[self.team.pk, self.second_team.pk]), 2, today=self.today)
+
+    def test_deadlines_use_the_index(self):
+        plan = upcoming_deadlines_queryset(self.teams, today=self.today).explain()
+        self.assertIn('task_deadline_idx (created_by_id=? AND task_completed=? AND due_date>?)', plan)
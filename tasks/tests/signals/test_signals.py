@@ -1,18 +1,22 @@
 """Unit tests for the """
 from django.core.exceptions import ValidationError
 from django.core.handlers import base
+from django.db import connection
 from django.test import TestCase
-from tasks.models import Team, User, Activity_Log, Task
+from django.test.utils import CaptureQueriesContext
+from tasks.models import Team, User, ActivityEvent, Task
 from django.urls import reverse
 from tasks.signals import *
 from django.db.models.signals import m2m_changed
 from django.db.models.signals import pre_save, post_save, pre_delete
 from django.contrib.auth.signals import user_logged_in, user_logged_out
 from datetime import datetime, timedelta
+from django.utils import timezone
 from django.http import HttpRequest
 import inspect
 from django.test import RequestFactory
 from tasks.views import view_task
+from tasks.middleware import acting_as
 import time
 
 #test the generation of each signal and what activity log stuff is there
@@ -46,11 +50,8 @@ class SignalsTestCase(TestCase):
         self.team.members.set([self.user, self.member_with_log])
         self.user.teams.set([self.team])
         self.member_with_log.teams.set([self.team])
-        self.activity_log = Activity_Log.objects.get(user=self.user)
-        self.format = "%d/%m/%Y, %H:%M:%S" 
         self.disconnect_signals()
-        self.activity_log.log = []
-        self.activity_log.save()
+        ActivityEvent.objects.filter(actor=self.user).delete()
     
     def disconnect_signals(self):
         #Disconnect all signals for now
@@ -59,181 +60,282 @@ class SignalsTestCase(TestCase):
         user_logged_in.disconnect(user_has_logged_in)
         user_logged_out.disconnect(user_has_logged_out)
         post_save.disconnect(user_save, sender=User)
-        pre_save.disconnect(team_save, sender=Team)
+        post_save.disconnect(team_save, sender=Team)
         pre_save.disconnect(task_save, sender=Task)
+        post_save.disconnect(task_created, sender=Task)
         pre_delete.disconnect(task_deleted, sender=Task)
         pre_delete.disconnect(team_deleted, sender=Team)
 
 
     #test for each signal and function
 
-    #Return the activity log for the user, or create a new one if they don't have one yet
-    def test_get_activity_log_function(self):
-        #test it gets correct activity log
-        self.assertEqual(Activity_Log.objects.get(user=self.user), get_activity_log(self.user))
-        #test it creates new one with a new user
-        new_user = User.objects.create(username='@newuser', first_name='New', last_name='user', email='newuser@org.uk', password="Password123")
-        self.assertFalse(Activity_Log.objects.filter(user=new_user).exists()) #it doesn't exist
-        get_activity_log(new_user)
-        self.assertEqual(Activity_Log.objects.get(user=new_user), get_activity_log(new_user)) #now it does
+    #Add an entry to the user's activity log
+    def test_log_activity_function(self):
+        event = log_activity(self.user, 'task_edited', 'A description', target=self.task, field='title')
+        self.assertEqual(list(ActivityEvent.objects.filter(actor=self.user)), [event])
+        event.refresh_from_db()
+        self.assertEqual(event.event_type, 'task_edited')
+        self.assertEqual(event.description, 'A description')
+        self.assertEqual(event.target, self.task)
+        self.assertEqual(event.payload, {'field': 'title'})
+        self.assertAlmostEqual(event.timestamp, timezone.now(), delta=timedelta(seconds=5))
+
+    def test_log_activity_only_adds_a_row(self):
+        log_activity(self.user, 'logged_in', 'First')
+        #adding to a long history doesn't read or rewrite the history
+        with self.assertNumQueries(1):
+            log_activity(self.user, 'logged_out', 'Second')
 
     def test_user_log_in_signal(self):
         user_logged_in.connect(user_has_logged_in)
         self.client.login(username=self.user.username, password='Password123')
-        self.activity_log.refresh_from_db()
-        current_time = datetime.now()
+        log = self.get_log(self.user)
+        current_time = timezone.now()
         #check activity log includes the new entry
-        self.assertEqual(self.activity_log.log[0][0], f'{self.user.username} has logged in')
-        self.assertEqual(datetime.strptime(self.activity_log.log[0][1], self.format).date(), current_time.date())
+        self.assertEqual(log[0].description, f'{self.user.username} has logged in')
+        self.assertEqual(log[0].timestamp.date(), current_time.date())
 
     def test_user_log_out_signal(self):
         user_logged_out.connect(user_has_logged_out)
         self.client.login(username=self.user.username, password='Password123')
         self.client.logout()
-        self.activity_log.refresh_from_db()
-        current_time = datetime.now()
+        log = self.get_log(self.user)
+        current_time = timezone.now()
         #check activity log includes the new entry
-        self.assertEqual(self.activity_log.log[0][0], f'{self.user.username} has logged out')
-        self.assertEqual(datetime.strptime(self.activity_log.log[0][1], self.format).date(), current_time.date())
+        self.assertEqual(log[0].description, f'{self.user.username} has logged out')
+        self.assertEqual(log[0].timestamp.date(), current_time.date())
+
+    def test_log_in_does_not_log_a_user_edit(self):
+        user_logged_in.connect(user_has_logged_in)
+        post_save.connect(user_save, sender=User)
+        self.client.login(username=self.user.username, password='Password123')
+        log = self.get_log(self.user)
+        #logging in saves last_login, which shouldn't show up as editing their details
+        self.assertEqual([event.event_type for event in log], ['logged_in'])
 
     #User Model
     def test_user_sign_up_signal(self):
         post_save.connect(user_save, sender=User)
-        current_time = datetime.now()
+        current_time = timezone.now()
         new_user = User.objects.create(username='@newuser', first_name='New', last_name='user', email='newuser@org.uk', password="Password123")
-        activity_log = Activity_Log.objects.get(user=new_user)
+        log = self.get_log(new_user)
         #check activity log includes the new entry
-        self.assertEqual(activity_log.log[0][0], f'{new_user.username} signed up')
-        self.assertEqual(datetime.strptime(activity_log.log[0][1], self.format).date(), current_time.date())
+        self.assertEqual(log[0].description, f'{new_user.username} signed up')
+        self.assertEqual(log[0].event_type, 'signed_up')
+        self.assertEqual(log[0].timestamp.date(), current_time.date())
 
     def test_user_edit_signal(self):
         post_save.connect(user_save, sender=User)
-        current_time = datetime.now()
+        current_time = timezone.now()
         self.user.first_name = "Jon"
         self.user.save()
-        self.activity_log.refresh_from_db()
+        log = self.get_log(self.user)
         #check activity log includes the new entry
-        self.assertEqual(self.activity_log.log[0][0], f'{self.user.username} edited their user details')
-        self.assertEqual(datetime.strptime(self.activity_log.log[0][1], self.format).date(), current_time.date())
+        self.assertEqual(log[0].description, f'{self.user.username} edited their user details')
+        self.assertEqual(log[0].timestamp.date(), current_time.date())
 
     #Task Model
     def test_task_create_signal(self):
-        pre_save.connect(task_save, sender=Task) 
-        current_time = datetime.now()
+        post_save.connect(task_created, sender=Task)
+        current_time = timezone.now()
         #create a new task
         task = Task.objects.create(title="Task1", description="This is a task", due_date=datetime.now())
         task._user = self.user
         Task.objects.filter(pk=task.id).delete() #delete it so we can redo the create signal with _user attached
         task.save()
-        self.activity_log.refresh_from_db()
-        self.assertEqual(self.activity_log.log[0][0], f'{self.user.username} created a new task with title \'{task.title}\'')
-        self.assertEqual(datetime.strptime(self.activity_log.log[0][1], self.format).date(), current_time.date())
+        log = self.get_log(self.user)
+        self.assertEqual(log[0].description, f'{self.user.username} created a new task with title \'{task.title}\'')
+        self.assertEqual(log[0].timestamp.date(), current_time.date())
     
     def test_task_save_signal_title_change(self):
         pre_save.connect(task_save, sender=Task) 
-        current_time = datetime.now()
+        current_time = timezone.now()
         #Test title change
         old_title = self.task.title
         self.task.title = "NewTitle"
         self.task.save()
-        self.activity_log.refresh_from_db()
-        self.assertEqual(self.activity_log.log[0][0], f'{self.user.username} changed task \'{old_title}\'s title to {self.task.title}')
-        self.assertEqual(datetime.strptime(self.activity_log.log[0][1], self.format).date(), current_time.date())
+        log = self.get_log(self.user)
+        self.assertEqual(log[0].description, f'{self.user.username} changed task \'{old_title}\'s title to {self.task.title}')
+        self.assertEqual(log[0].timestamp.date(), current_time.date())
     
     def test_task_save_signal_change_change_description(self):
         pre_save.connect(task_save, sender=Task) 
-        current_time = datetime.now()
+        current_time = timezone.now()
         self.task.description = "NewDescription"
         self.task.save()
-        self.activity_log.refresh_from_db()
-        self.assertEqual(self.activity_log.log[0][0], f'{self.user.username} changed task \'{self.task.title}\'s description to {self.task.description}')
-        self.assertEqual(datetime.strptime(self.activity_log.log[0][1], self.format).date(), current_time.date())
+        log = self.get_log(self.user)
+        self.assertEqual(log[0].description, f'{self.user.username} changed task \'{self.task.title}\'s description to {self.task.description}')
+        self.assertEqual(log[0].timestamp.date(), current_time.date())
 
     def test_task_save_signal_change_due_date(self):
         pre_save.connect(task_save, sender=Task) 
-        current_time = datetime.now()
+        current_time = timezone.now()
         self.task.due_date = datetime.now() + timedelta(1)
         self.task.save()
-        self.activity_log.refresh_from_db()
-        self.assertEqual(self.activity_log.log[0][0], f'{self.user.username} updated task \'{self.task.title}\'s due date to {self.task.due_date}')
-        self.assertEqual(datetime.strptime(self.activity_log.log[0][1], self.format).date(), current_time.date())
+        log = self.get_log(self.user)
+        self.assertEqual(log[0].description, f'{self.user.username} updated task \'{self.task.title}\'s due date to {self.task.due_date.date()}')
+        self.assertEqual(log[0].timestamp.date(), current_time.date())
 
     def test_task_save_signal_change_completion(self):
         pre_save.connect(task_save, sender=Task) 
-        current_time = datetime.now()
+        current_time = timezone.now()
         self.task.task_completed= "True"
         self.task.save()
-        self.activity_log.refresh_from_db()
-        self.assertEqual(self.activity_log.log[1][0], f'{self.user.username} marked \'{self.task.title}\' as Complete')
-        self.assertEqual(datetime.strptime(self.activity_log.log[1][1], self.format).date(), current_time.date())
+        log = self.get_log(self.user)
+        self.assertEqual(log[0].description, f'{self.user.username} marked \'{self.task.title}\' as Complete')
+        self.assertEqual(log[0].timestamp.date(), current_time.date())
+        #due_date was set to a datetime in setUp, but it's the same day, so it isn't logged as a change
+        self.assertEqual(len(log), 1)
+
+    def test_task_save_signal_does_not_read_the_task(self):
+        pre_save.connect(task_save, sender=Task)
+        self.task.description = "NewDescription"
+        with CaptureQueriesContext(connection) as queries:
+            self.task.save(update_fields=['description'])
+        #the changes are worked out from the values the task was loaded with, not by reading it again
+        self.assertFalse([query for query in queries if query['sql'].startswith('SELECT')])
+
+    def test_task_save_signal_only_logs_update_fields(self):
+        pre_save.connect(task_save, sender=Task)
+        self.task.title = "NewTitle"
+        self.task.description = "NewDescription"
+        self.task.save(update_fields=['description'])
+        log = self.get_log(self.user)
+        self.assertEqual([event.payload['field'] for event in log], ['description'])
+
+    def test_task_save_signal_with_deferred_fields(self):
+        pre_save.connect(task_save, sender=Task)
+        self.task.save()
+        with acting_as(self.user):
+            task = Task.objects.only('id', 'seen').get(pk=self.task.pk)
+            task.seen = True
+            task.save(update_fields=['seen'])
+            task = Task.objects.defer('title').get(pk=self.task.pk)
+            task.description = 'NewDescription'
+            task.save(update_fields=['description'])
+        log = self.get_log(self.user)
+        self.assertEqual([event.payload['field'] for event in log], ['description'])
+        self.assertEqual(log[0].description, f"{self.user.username} changed task '{self.task.title}'s description to NewDescription")
 
 
     def test_team_save_signal(self):
-        pre_save.connect(team_save, sender=Team)
+        post_save.connect(team_save, sender=Team)
         #create a new team
-        current_time = datetime.now()
+        current_time = timezone.now()
         self.team = Team.objects.create(team_name='Team 2',admin_user=self.user)
-        self.activity_log.refresh_from_db()
-        self.assertEqual(self.activity_log.log[0][0], f'{self.user.username} created a new team \'{self.team.team_name}\'')
-        self.assertEqual(datetime.strptime(self.activity_log.log[0][1], self.format).date(), current_time.date())
+        log = self.get_log(self.user)
+        self.assertEqual(log[0].description, f'{self.user.username} created a new team \'{self.team.team_name}\'')
+        self.assertEqual(log[0].timestamp.date(), current_time.date())
 
 
     #Team model members m2m field
     def test_team_members_added_signal(self):
         m2m_changed.connect(team_members_changed, sender=Team.members.through)
-        current_time = datetime.now()
-        self.team.members.add(self.member_without_log)
-        self.activity_log.refresh_from_db()
-        self.assertEqual(self.activity_log.log[0][0], f'{self.user.username} added {self.member_without_log.username} to \'{self.team.team_name}\'')
-        self.assertEqual(datetime.strptime(self.activity_log.log[0][1], self.format).date(), current_time.date())
+        current_time = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.team.members.add(self.member_without_log)
+        log = self.get_log(self.user)
+        self.assertEqual(log[0].description, f'{self.user.username} added {self.member_without_log.username} to \'{self.team.team_name}\'')
+        self.assertEqual(log[0].timestamp.date(), current_time.date())
 
     def test_team_members_removed_signal(self):
         m2m_changed.connect(team_members_changed, sender=Team.members.through)
-        current_time = datetime.now()
-        self.team.members.remove(self.member_with_log)
-        self.activity_log.refresh_from_db()
-        self.assertEqual(self.activity_log.log[0][0], f'{self.user.username} removed {self.member_with_log.username} from \'{self.team.team_name}\'')
-        self.assertEqual(datetime.strptime(self.activity_log.log[0][1], self.format).date(), current_time.date())
+        current_time = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.team.members.remove(self.member_with_log)
+        log = self.get_log(self.user)
+        self.assertEqual(log[0].description, f'{self.user.username} removed {self.member_with_log.username} from \'{self.team.team_name}\'')
+        self.assertEqual(log[0].timestamp.date(), current_time.date())
 
     #Task model assigned to m2m field
     def test_assign_to_task_signal(self):
         m2m_changed.connect(task_assigned_to_changed, sender=Task.assigned_to.through)
-        current_time = datetime.now()
-        self.task.assigned_to.add(self.member_with_log)
-        self.activity_log.refresh_from_db()
-        self.assertEqual(self.activity_log.log[0][0], f'{self.user.username} assigned {self.member_with_log.username} to the task \'{self.task.title}\'')
-        self.assertEqual(datetime.strptime(self.activity_log.log[0][1], self.format).date(), current_time.date())
+        current_time = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.assigned_to.add(self.member_with_log)
+        log = self.get_log(self.user)
+        self.assertEqual(log[0].description, f'{self.user.username} assigned {self.member_with_log.username} to the task \'{self.task.title}\'')
+        self.assertEqual(log[0].timestamp.date(), current_time.date())
 
     def test_remove_from_task_signal(self):
         m2m_changed.connect(task_assigned_to_changed, sender=Task.assigned_to.through)
-        current_time = datetime.now()
+        current_time = timezone.now()
         #add and remove
-        self.task.assigned_to.add(self.member_with_log)
-        self.task.assigned_to.remove(self.member_with_log)
-        self.activity_log.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.assigned_to.add(self.member_with_log)
+            self.task.assigned_to.remove(self.member_with_log)
+        log = self.get_log(self.user)
         #check for add and remove
-        self.assertEqual(self.activity_log.log[0][0], f'{self.user.username} assigned {self.member_with_log.username} to the task \'{self.task.title}\'')
-        self.assertEqual(datetime.strptime(self.activity_log.log[0][1], self.format).date(), current_time.date())
-        self.assertEqual(self.activity_log.log[1][0], f'{self.user.username} removed {self.member_with_log.username} from the task \'{self.task.title}\'')
-        self.assertEqual(datetime.strptime(self.activity_log.log[1][1], self.format).date(), current_time.date())
+        self.assertEqual(log[0].description, f'{self.user.username} assigned {self.member_with_log.username} to the task \'{self.task.title}\'')
+        self.assertEqual(log[0].timestamp.date(), current_time.date())
+        self.assertEqual(log[1].description, f'{self.user.username} removed {self.member_with_log.username} from the task \'{self.task.title}\'')
+        self.assertEqual(log[1].timestamp.date(), current_time.date())
+
+    def test_assign_many_users_to_task_signal(self):
+        m2m_changed.connect(task_assigned_to_changed, sender=Task.assigned_to.through)
+        members = [self.user, self.member_with_log, self.member_without_log]
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            self.task.assigned_to.add(*members)
+        #the members are found in one query and logged in one insert
+        user_queries = [query for query in queries if 'FROM "tasks_user"' in query['sql']]
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "tasks_activityevent"')]
+        self.assertEqual(len(user_queries), 1)
+        self.assertEqual(len(inserts), 1)
+        log = self.get_log(self.user)
+        self.assertEqual([event.payload['member'] for event in log], [member.username for member in members])
+
+    def test_clear_task_assignment_signal(self):
+        self.task.assigned_to.add(self.member_with_log, self.member_without_log)
+        m2m_changed.connect(task_assigned_to_changed, sender=Task.assigned_to.through)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.assigned_to.clear()
+        log = self.get_log(self.user)
+        self.assertEqual(log[0].description, f'{self.user.username} removed {self.member_with_log.username} from the task \'{self.task.title}\'')
+        self.assertEqual(log[1].description, f'{self.user.username} removed {self.member_without_log.username} from the task \'{self.task.title}\'')
+        self.assertEqual(len(log), 2)
+
+    def test_clear_team_members_signal(self):
+        m2m_changed.connect(team_members_changed, sender=Team.members.through)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.team.members.clear()
+        log = self.get_log(self.user)
+        self.assertEqual({event.payload['member'] for event in log}, {self.user.username, self.member_with_log.username})
+        self.assertTrue(all(event.event_type == 'member_removed' for event in log))
+
+    def test_removing_a_user_who_is_not_assigned_logs_nothing(self):
+        m2m_changed.connect(task_assigned_to_changed, sender=Task.assigned_to.through)
+        self.task.assigned_to.remove(self.member_without_log)
+        self.assertEqual(self.get_log(self.user), [])
+
+    def test_assign_to_task_from_the_user_side_signal(self):
+        m2m_changed.connect(task_assigned_to_changed, sender=Task.assigned_to.through)
+        self.member_with_log._user = self.user
+        with self.captureOnCommitCallbacks(execute=True):
+            self.member_with_log.task_set.add(self.task)
+        log = self.get_log(self.user)
+        self.assertEqual(log[0].description, f'{self.user.username} assigned {self.member_with_log.username} to the task \'{self.task.title}\'')
 
     #Delete Task
     def task_deleted_signal(self):
         pre_delete.connect(task_deleted, sender=Task)
-        current_time = datetime.now()
+        current_time = timezone.now()
         old_title = self.task.title
         Task.objects.filter(pk=self.task.id).delete()
-        self.activity_log.refresh_from_db()
-        self.assertEqual(self.activity_log.log[0][0], f'{self.user.username} deleted task {old_title}')
-        self.assertEqual(datetime.strptime(self.activity_log.log[0][1], self.format).date(), current_time.date())
+        log = self.get_log(self.user)
+        self.assertEqual(log[0].description, f'{self.user.username} deleted task {old_title}')
+        self.assertEqual(log[0].timestamp.date(), current_time.date())
 
 
     #Delete Team
     def team_deleted_signal(self):
         pre_delete.connect(team_deleted, sender=Team)
-        current_time = datetime.now()
+        current_time = timezone.now()
         old_team_name = self.team.team_name
         Team.objects.filter(pk=self.team.id).delete()
-        self.activity_log.refresh_from_db()
-        self.assertEqual(self.activity_log.log[0][0], f'{self.user.username} deleted team {old_team_name}')
-        self.assertEqual(datetime.strptime(self.activity_log.log[0][1], self.format).date(), current_time.date())
+        log = self.get_log(self.user)
+        self.assertEqual(log[0].description, f'{self.user.username} deleted team {old_team_name}')
+        self.assertEqual(log[0].timestamp.date(), current_time.date())
+
+    def get_log(self, user):
+        """Return the user's activity log, oldest entry first."""
+        return list(ActivityEvent.objects.filter(actor=user).order_by('timestamp', 'id'))
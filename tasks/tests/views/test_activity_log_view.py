@@ -2,8 +2,10 @@
 from django.contrib import messages
 from django.test import TestCase
 from django.urls import reverse
+from django.utils import timezone
+from datetime import datetime
 from tasks.forms import CreateTaskForm
-from tasks.models import User, Task, Team, Activity_Log
+from tasks.models import User, Task, Team, ActivityEvent
 
 class ActivityLogViewTestCase(TestCase):
     """Unit tests for the Activity Log view."""
@@ -36,16 +38,17 @@ class ActivityLogViewTestCase(TestCase):
 
     def test_activity_log_passed_in_correctly(self):
         self.client.login(username=self.user.username, password='Password123')
-        activity_log = Activity_Log.objects.get(user = self.member_with_log)
+        sign_up = ActivityEvent.objects.get(actor = self.member_with_log)
         response = self.client.get(self.url)
         page_obj = response.context['page_obj']
         #check that jane's sign up log is in the page 
-        self.assertEqual(page_obj[0], activity_log.log[0])
+        self.assertEqual(page_obj[0], sign_up)
+        self.assertContains(response, sign_up.description)
 
     def test_render_when_no_log_available(self):
         self.client.login(username=self.user.username, password='Password123')
         #delete log
-        Activity_Log.objects.filter(user = self.member_without_log).delete()
+        ActivityEvent.objects.filter(actor = self.member_without_log).delete()
         #Now it should redirect
         url_of_no_log = reverse("activity_log", args=[self.team.id, self.member_without_log.id])
         response = self.client.get(url_of_no_log, follow=True)
@@ -53,6 +56,53 @@ class ActivityLogViewTestCase(TestCase):
         self.assertRedirects(response, redirect_url, status_code=302, target_status_code=200)
         self.assertTemplateUsed(response, 'show_team.html')
     
+    def test_log_is_paged_most_recent_first(self):
+        self.client.login(username=self.user.username, password='Password123')
+        for number in range(25):
+            ActivityEvent.objects.create(actor=self.member_with_log, event_type='other', description=f'Entry {number}')
+        response = self.client.get(self.url)
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 10)
+        self.assertEqual(page_obj.paginator.num_pages, 3)
+        self.assertEqual(page_obj[0].description, 'Entry 24')
+        response = self.client.get(self.url, {'page': 3})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 6)
+        #the sign up entry is the oldest
+        self.assertEqual(page_obj[5].event_type, 'signed_up')
+
+    def test_log_can_be_filtered_by_date_and_event_type(self):
+        self.client.login(username=self.user.username, password='Password123')
+        ActivityEvent.objects.create(actor=self.member_with_log, event_type='logged_in', description='Old log in',
+                                     timestamp=timezone.make_aware(datetime(2023, 1, 3, 12, 0, 0)))
+        ActivityEvent.objects.create(actor=self.member_with_log, event_type='logged_out', description='Old log out',
+                                     timestamp=timezone.make_aware(datetime(2023, 1, 3, 13, 0, 0)))
+        response = self.client.get(self.url, {'date_from': '2023-01-01', 'date_to': '2023-01-07', 'event_type': 'logged_in'})
+        page_obj = response.context['page_obj']
+        self.assertEqual([event.description for event in page_obj], ['Old log in'])
+
+    def test_filters_are_kept_when_changing_page(self):
+        self.client.login(username=self.user.username, password='Password123')
+        for number in range(15):
+            ActivityEvent.objects.create(actor=self.member_with_log, event_type='other', description=f'Entry {number}')
+        response = self.client.get(self.url, {'event_type': 'other'})
+        self.assertEqual(response.context['page_obj'].paginator.count, 15)
+        self.assertContains(response, 'href="?event_type=other&page=2"')
+
+    def test_no_matching_entries_shows_an_empty_log(self):
+        self.client.login(username=self.user.username, password='Password123')
+        response = self.client.get(self.url, {'event_type': 'team_deleted'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 0)
+        self.assertContains(response, 'No activity matches these filters.')
+
+    def test_invalid_filters_show_the_form_errors(self):
+        self.client.login(username=self.user.username, password='Password123')
+        response = self.client.get(self.url, {'date_from': '2023-01-09', 'date_to': '2023-01-02'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors)
+        self.assertEqual(len(response.context['page_obj']), 0)
+
     def test_redirect_when_this_team_is_deleted_elsewhere(self):
         self.client.login(username=self.user.username, password='Password123')
         self.team.delete()
@@ -0,0 +1,146 @@
+"""Tests for the /api/changes sync API"""
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from tasks.models import User, Team, Task
+from datetime import date
+
+class ChangesAPIViewTestCase(TestCase):
+    fixtures = [
+        'tasks/tests/fixtures/default_user.json',
+        'tasks/tests/fixtures/other_users.json',
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.get(username='@johndoe')
+        self.other_user = User.objects.get(username='@janedoe')
+        self.team = Team.objects.create(team_name='Team 1', admin_user=self.user)
+        self.other_team = Team.objects.create(team_name='Other team', admin_user=self.other_user)
+        self.user.teams.set([self.team])
+        self.team.members.set([self.user])
+        self.other_user.teams.set([self.other_team])
+        self.other_team.members.set([self.other_user])
+        self.task = Task.objects.create(title='Report', description='Write it', due_date=date(2030, 1, 1), created_by=self.team)
+        self.url = reverse('changes_api')
+        self.client.login(username='@johndoe', password='Password123')
+        self.cursor = self.client.get(self.url).json()['cursor']
+
+    def changes(self, since=None):
+        response = self.client.get(self.url, {'since': self.cursor if since is None else since})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_changes_api_url(self):
+        self.assertEqual(self.url, '/api/changes')
+
+    def test_without_since_returns_the_latest_cursor_only(self):
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['changes'], [])
+        self.assertFalse(data['has_more'])
+        self.assertEqual(self.changes(data['cursor'])['changes'], [])
+
+    def test_invalid_since_is_rejected(self):
+        response = self.client.get(self.url, {'since': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+
+    def test_redirects_when_not_logged_in(self):
+        self.client.logout()
+        response = self.client.get(self.url, {'since': 0})
+        self.assertEqual(response.status_code, 302)
+
+    def test_new_and_edited_tasks_are_returned_once_as_they_are_now(self):
+        task = Task.objects.create(title='New', description='A task', due_date=date(2030, 2, 1), created_by=self.team)
+        task.title = 'New title'
+        task.save()
+        data = self.changes()
+        self.assertEqual(len(data['changes']), 1)
+        change = data['changes'][0]
+        self.assertEqual((change['type'], change['action'], change['id'], change['team']), ('task', 'upsert', task.id, self.team.id))
+        self.assertEqual(change['task']['title'], 'New title')
+        self.assertEqual(change['task']['due_date'], '2030-02-01')
+        self.assertEqual(data['cursor'], change['cursor'])
+        self.assertEqual(self.changes(data['cursor'])['changes'], [])
+
+    def test_saving_an_unchanged_task_records_nothing(self):
+        self.task.save()
+        self.assertEqual(self.changes()['changes'], [])
+
+    def test_deleted_task_leaves_a_tombstone(self):
+        task_id = self.task.id
+        self.task.title = 'Edited'
+        self.task.save()
+        self.task.delete()
+        changes = self.changes()['changes']
+        self.assertEqual(changes, [{'cursor': changes[0]['cursor'], 'type': 'task', 'action': 'delete', 'team': self.team.id, 'id': task_id}])
+
+    def test_assignments_are_returned(self):
+        self.task.assigned_to.add(self.user, self.other_user)
+        self.task.assigned_to.remove(self.other_user)
+        changes = {(change['user'], change['action']) for change in self.changes()['changes'] if change['type'] == 'assignment'}
+        self.assertEqual(changes, {(self.user.id, 'add'), (self.other_user.id, 'remove')})
+
+    def test_changes_in_other_teams_are_not_returned(self):
+        Task.objects.create(title='Secret', description='Not for johndoe', due_date=date(2030, 1, 1), created_by=self.other_team)
+        self.other_team.team_name = 'Renamed'
+        self.other_team.save()
+        self.assertEqual(self.changes()['changes'], [])
+
+    def test_new_member_is_told_about_the_team(self):
+        self.other_team.members.add(self.user)
+        self.user.teams.add(self.other_team)
+        changes = self.changes()['changes']
+        self.assertEqual([(change['type'], change['action'], change['team'], change['user']) for change in changes],
+                         [('membership', 'add', self.other_team.id, self.user.id)])
+
+    def test_removed_member_is_told_about_the_removal(self):
+        self.team.members.remove(self.user)
+        self.user.teams.remove(self.team)
+        Task.objects.create(title='After', description='Not seen any more', due_date=date(2030, 1, 1), created_by=self.team)
+        changes = self.changes()['changes']
+        self.assertEqual([(change['type'], change['action'], change['user']) for change in changes],
+                         [('membership', 'remove', self.user.id)])
+
+    def test_cleared_memberships_are_returned(self):
+        self.user.teams.clear()
+        changes = self.changes()['changes']
+        self.assertEqual([(change['type'], change['action'], change['team']) for change in changes],
+                         [('membership', 'remove', self.team.id)])
+
+    def test_deleted_team_is_returned_to_its_members(self):
+        team_id = self.team.id
+        self.team.delete()
+        changes = self.changes()['changes']
+        self.assertIn({'cursor': changes[-1]['cursor'], 'type': 'team', 'action': 'delete', 'team': team_id, 'id': team_id}, changes)
+        #its tasks go with it
+        self.assertEqual([change for change in changes if change['type'] == 'task'], [])
+
+    def test_renamed_team_is_returned(self):
+        self.team.team_name = 'Renamed'
+        self.team.save()
+        changes = self.changes()['changes']
+        self.assertEqual([(change['type'], change['name']) for change in changes], [('team', 'Renamed')])
+
+    @override_settings(CHANGE_FEED_PAGE_SIZE=2)
+    def test_changes_are_paged_by_cursor(self):
+        tasks = [Task.objects.create(title=f'Task {i}', description='A task', due_date=date(2030, 1, 1), created_by=self.team) for i in range(5)]
+        seen = []
+        cursor = self.cursor
+        while True:
+            data = self.changes(cursor)
+            self.assertLessEqual(len(data['changes']), 2)
+            seen += [change['id'] for change in data['changes']]
+            cursor = data['cursor']
+            if not data['has_more']:
+                break
+        self.assertEqual(seen, [task.id for task in tasks])
+
+    def test_changes_take_a_fixed_number_of_queries(self):
+        for i in range(10):
+            task = Task.objects.create(title=f'Task {i}', description='A task', due_date=date(2030, 1, 1), created_by=self.team)
+            task.assigned_to.add(self.user)
+        #session, user, changes, tasks
+        with self.assertNumQueries(4):
+            data = self.changes()
+        self.assertEqual(len(data['changes']), 20)
@@ -0,0 +1,133 @@
+"""Tests of the ETags on the dashboard, show_team and view_task, and 304 Not Modified responses"""
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from tasks.models import User, Task, Team, TimeLog, TimeSpent
+from datetime import date, timedelta
+
+class ConditionalGetTestCase(TestCase):
+
+    fixtures = [
+        'tasks/tests/fixtures/default_user.json',
+        'tasks/tests/fixtures/other_users.json',
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.get(username='@johndoe')
+        self.other_user = User.objects.get(username='@janedoe')
+        self.team = Team.objects.create(team_name='Team 1', admin_user=self.user)
+        self.team.members.add(self.user)
+        self.user.teams.add(self.team)
+        self.task = Task.objects.create(title='Write report', due_date=date.today() + timedelta(5), created_by=self.team)
+        self.dashboard_url = reverse('dashboard')
+        self.team_url = reverse('show_team', kwargs={'team_id': self.team.id})
+        self.task_url = reverse('view_task', kwargs={'team_id': self.team.id, 'task_id': self.task.id})
+        self.client.login(username='@johndoe', password='Password123')
+        #the first page with a form sets the CSRF cookie, which is part of the ETag
+        self.client.get(self.team_url)
+
+    def assertNotModified(self, url, **headers):
+        etag = self.client.get(url, **headers)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, **headers)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        return etag
+
+    def assertModified(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_pages_are_revalidated_every_time(self):
+        response = self.client.get(self.dashboard_url)
+        self.assertIn('ETag', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_unchanged_dashboard_is_not_modified(self):
+        etag = self.client.get(self.dashboard_url)['ETag']
+        #session, user and the ETag, nothing is rendered
+        with self.assertNumQueries(3):
+            response = self.client.get(self.dashboard_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_editing_a_task_changes_the_dashboard(self):
+        etag = self.assertNotModified(self.dashboard_url)
+        self.task.title = 'Write summary'
+        self.task.save(update_fields=['title'])
+        self.assertModified(self.dashboard_url, etag)
+
+    def test_deleting_a_task_changes_the_dashboard(self):
+        Task.objects.create(title='Fix bug', due_date=date.today() + timedelta(5), created_by=self.team)
+        etag = self.assertNotModified(self.dashboard_url)
+        self.task.delete()
+        self.assertModified(self.dashboard_url, etag)
+
+    def test_assigning_a_task_changes_the_task_page(self):
+        self.team.members.add(self.other_user)
+        etag = self.assertNotModified(self.task_url)
+        self.task.assigned_to.add(self.other_user)
+        self.assertModified(self.task_url, etag)
+
+    def test_time_spent_changes_the_task_page(self):
+        etag = self.assertNotModified(self.task_url)
+        TimeSpent.objects.create(user=self.user, task=self.task, time_spent=60)
+        self.assertModified(self.task_url, etag)
+
+    def test_moving_time_between_members_changes_the_task_page(self):
+        self.team.members.add(self.other_user)
+        self.log_time(self.user, 60)
+        etag = self.assertNotModified(self.task_url)
+        #the total stays the same, but each member's time shown on the page changes
+        TimeSpent.reset([self.task], user=self.user)
+        self.log_time(self.other_user, 60)
+        self.assertModified(self.task_url, etag)
+
+    def test_resetting_time_changes_the_task_page(self):
+        self.log_time(self.user, 60)
+        self.log_time(self.other_user, 0)
+        etag = self.assertNotModified(self.task_url)
+        TimeSpent.reset([self.task], user=self.other_user)
+        self.assertModified(self.task_url, etag)
+
+    def log_time(self, user, seconds):
+        TimeSpent.add_time(user, self.task, seconds)
+        TimeLog.objects.create(user=user, task=self.task, logged_time=seconds)
+
+    def test_adding_a_member_changes_the_team_page(self):
+        etag = self.assertNotModified(self.team_url)
+        self.team.members.add(self.other_user)
+        self.assertModified(self.team_url, etag)
+
+    def test_query_string_and_active_team_give_different_pages(self):
+        etag = self.client.get(self.dashboard_url)['ETag']
+        self.assertModified(self.dashboard_url + '?order=title', etag)
+        self.client.cookies['active_team'] = str(self.team.id)
+        self.assertModified(self.dashboard_url, etag)
+
+    def test_other_users_get_their_own_page(self):
+        self.team.members.add(self.other_user)
+        etag = self.assertNotModified(self.team_url)
+        self.client.login(username='@janedoe', password='Password123')
+        self.client.get(self.team_url)
+        self.assertModified(self.team_url, etag)
+
+    def test_pages_with_messages_are_always_sent(self):
+        self.client.get(reverse('view_task', kwargs={'team_id': self.team.id, 'task_id': 999}))
+        response = self.client.get(self.dashboard_url)
+        self.assertNotIn('ETag', response)
+        self.assertContains(response, 'This task was deleted')
+
+    def test_timestamps_are_kept_up_to_date(self):
+        created_at = self.task.created_at
+        updated_at = self.task.updated_at
+        self.task.title = 'Write summary'
+        self.task.save(update_fields=['title'])
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.created_at, created_at)
+        self.assertGreater(self.task.updated_at, updated_at)
+        team_updated_at = Team.objects.get(pk=self.team.pk).updated_at
+        self.team.members.add(self.other_user)
+        self.assertGreater(Team.objects.get(pk=self.team.pk).updated_at, team_updated_at)
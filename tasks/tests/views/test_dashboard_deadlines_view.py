@@ -0,0 +1,55 @@
+"""Tests for the dashboard's "Show more" upcoming deadlines"""
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from tasks.tests.helpers import reverse_with_next
+from tasks.models import User, Team, Task
+from datetime import date, timedelta
+
+@override_settings(DEADLINE_SIDEBAR_SIZE=2)
+class DashboardDeadlinesViewTestCase(TestCase):
+    fixtures = ['tasks/tests/fixtures/default_user.json']
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.team = Team.objects.create(team_name='Team 1', admin_user=self.user)
+        self.team.members.add(self.user)
+        self.user.teams.add(self.team)
+        self.tasks = [
+            Task.objects.create(title=f'Task {number}', due_date=date.today() + timedelta(number), created_by=self.team)
+            for number in range(5)
+        ]
+        self.url = reverse('dashboard_deadlines')
+        self.client.login(username='@johndoe', password='Password123')
+
+    def test_dashboard_deadlines_url(self):
+        self.assertEqual(self.url, '/dashboard/deadlines/')
+
+    def test_dashboard_shows_the_first_deadlines(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['due_dates'], self.tasks[:2])
+        self.assertTrue(response.context['more_due_dates'])
+        self.assertContains(response, f'{self.url}?after={self.tasks[1].due_date.isoformat()}_{self.tasks[1].id}')
+
+    def test_show_more_returns_the_next_deadlines(self):
+        after = f'{self.tasks[1].due_date.isoformat()}_{self.tasks[1].id}'
+        response = self.client.get(self.url, {'after': after})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'partials/due_date_cards.html')
+        self.assertEqual(response.context['due_dates'], self.tasks[2:4])
+        self.assertContains(response, 'Show more')
+
+    def test_last_page_has_no_show_more(self):
+        after = f'{self.tasks[3].due_date.isoformat()}_{self.tasks[3].id}'
+        response = self.client.get(self.url, {'after': after})
+        self.assertEqual(response.context['due_dates'], self.tasks[4:])
+        self.assertNotContains(response, 'Show more')
+
+    def test_bad_after_starts_from_the_beginning(self):
+        response = self.client.get(self.url, {'after': 'yesterday'})
+        self.assertEqual(response.context['due_dates'], self.tasks[:2])
+
+    def test_dashboard_deadlines_redirects_when_not_logged_in(self):
+        self.client.logout()
+        redirect_url = reverse_with_next('log_in', self.url)
+        response = self.client.get(self.url)
+        self.assertRedirects(response, redirect_url, status_code=302, target_status_code=200)
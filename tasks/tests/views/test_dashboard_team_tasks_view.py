@@ -0,0 +1,73 @@
+"""Tests for loading a team's tasks tab on the dashboard"""
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from tasks.tests.helpers import reverse_with_next
+from tasks.models import User, Team, Task
+from datetime import date, timedelta
+
+class DashboardTeamTasksViewTestCase(TestCase):
+    fixtures = [
+        'tasks/tests/fixtures/default_user.json',
+        'tasks/tests/fixtures/other_users.json',
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.other_user = User.objects.get(username='@janedoe')
+        self.team = Team.objects.create(team_name='Team 1', admin_user=self.user)
+        self.other_team = Team.objects.create(team_name='Other team', admin_user=self.other_user)
+        self.user.teams.set([self.team])
+        self.other_user.teams.set([self.other_team])
+        self.high = Task.objects.create(title='High task', due_date=date.today() + timedelta(2), created_by=self.team, priority='high')
+        self.low = Task.objects.create(title='Low task', due_date=date.today() + timedelta(1), created_by=self.team, priority='low')
+        Task.objects.create(title='Not mine', due_date=date.today(), created_by=self.other_team)
+        self.url = reverse('dashboard_team_tasks', kwargs={'team_id': self.team.id})
+        self.client.login(username='@johndoe', password='Password123')
+
+    def test_dashboard_team_tasks_url(self):
+        self.assertEqual(self.url, f'/dashboard/team/{self.team.id}/tasks/')
+
+    def test_get_team_tasks(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'partials/team_tasks.html')
+        self.assertTemplateNotUsed(response, 'dashboard.html')
+        self.assertEqual(response.context['team'], self.team)
+        self.assertEqual(set(response.context['tasks']), {self.high, self.low})
+        self.assertContains(response, 'High task')
+        self.assertNotContains(response, 'Not mine')
+
+    def test_team_tasks_use_the_dashboard_options(self):
+        response = self.client.get(self.url, {'order': 'due_date'})
+        self.assertEqual(list(response.context['tasks']), [self.low, self.high])
+        response = self.client.get(self.url, {'filter': 'priorityHigh'})
+        self.assertEqual(list(response.context['tasks']), [self.high])
+
+    @override_settings(DASHBOARD_TASKS_PAGE_SIZE=1)
+    def test_load_more_team_tasks(self):
+        response = self.client.get(self.url, {'order': 'due_date'})
+        tasks = response.context['tasks']
+        self.assertEqual(list(tasks), [self.low])
+        self.assertContains(response, 'Load more')
+        response = self.client.get(self.url, {'order': 'due_date', 'after': tasks.next_cursor})
+        #just the next cards, without the tab's header and search bar
+        self.assertTemplateUsed(response, 'partials/team_task_cards.html')
+        self.assertTemplateNotUsed(response, 'partials/team_tasks.html')
+        self.assertEqual(list(response.context['tasks']), [self.high])
+        self.assertNotContains(response, 'Load more')
+
+    def test_team_tasks_are_one_page_of_queries(self):
+        #session, user, team, tasks and who they are assigned to
+        with self.assertNumQueries(5):
+            self.client.get(self.url)
+
+    def test_other_teams_tasks_are_not_found(self):
+        url = reverse('dashboard_team_tasks', kwargs={'team_id': self.other_team.id})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
+
+    def test_get_team_tasks_redirects_when_not_logged_in(self):
+        self.client.logout()
+        redirect_url = reverse_with_next('log_in', self.url)
+        response = self.client.get(self.url)
+        self.assertRedirects(response, redirect_url, status_code=302, target_status_code=200)
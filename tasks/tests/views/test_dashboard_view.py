@@ -112,3 +112,112 @@ class DashboardViewTestCase(TestCase):
         #test that it has found task 1 and nothing else
         self.assertEqual(tasks_for_team_1[0], self.task1)
         self.assertEqual(len(tasks_for_team_1), 1)
+
+    def test_dashboard_view_searching_sorting_and_filtering_together(self):
+        self.task1.priority = "high"
+        self.task2.priority = "low"
+        self.task1.save()
+        self.task2.save()
+        response = self.client.get(self.url, {'search_query': 'task', 'order': 'priority', 'filter': 'CompletedFalse'})
+        self.assertEqual(response.status_code, 200)
+        tasks_for_team_1 = response.context['team_tasks'][0][1]
+        self.assertEqual(list(tasks_for_team_1), [self.task1, self.task2])
+        self.assertEqual(response.context['filter'], 'tasks that are incomplete')
+        #the links and search box keep the other options
+        self.assertContains(response, '?order=due_date&search_query=task&amp;filter=CompletedFalse')
+        self.assertContains(response, '<input type="hidden" name="order" value="priority">')
+
+    def test_dashboard_view_ignores_unknown_ordering(self):
+        response = self.client.get(self.url, {'order': 'password'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['sort_order'], 'default')
+
+
+class DashboardQueryBudgetTestCase(TestCase):
+    """The dashboard's queries must not grow with the number of teams or tasks."""
+
+    fixtures = [
+        'tasks/tests/fixtures/default_user.json',
+        'tasks/tests/fixtures/other_users.json',
+    ]
+
+    #session, user, ETag, teams, due dates, tasks with their team, assigned users (notifications are cached)
+    QUERY_BUDGET = 7
+    #searches also read the search table once, for the ranked ids or the marked matches of the page
+    SEARCH_QUERY_BUDGET = QUERY_BUDGET + 1
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.other_user = User.objects.get(username='@janedoe')
+        self.url = reverse('dashboard')
+        self.client.login(username='@johndoe', password='Password123')
+
+    def test_queries_are_within_budget_for_2_teams(self):
+        self._create_teams(2)
+        self._assert_dashboard_is_within_budget()
+
+    def test_queries_are_within_budget_for_50_teams(self):
+        self._create_teams(50)
+        self._assert_dashboard_is_within_budget()
+
+    def test_queries_are_within_budget_when_sorting_and_filtering(self):
+        self._create_teams(5)
+        self._assert_dashboard_is_within_budget({'order': 'priority'})
+        self._assert_dashboard_is_within_budget({'order': 'assigned_to'})
+        self._assert_dashboard_is_within_budget({'filter': 'priorityHigh'})
+        self._assert_dashboard_is_within_budget({'search_query': 'Task'}, self.SEARCH_QUERY_BUDGET)
+        self._assert_dashboard_is_within_budget({'search_query': 'Task', 'order': 'priority'}, self.SEARCH_QUERY_BUDGET)
+
+    def test_only_the_first_teams_tasks_are_loaded(self):
+        teams = self._create_teams(3)
+        response = self.client.get(self.url)
+        team_tasks = response.context['team_tasks']
+        self.assertEqual([team for team, tasks in team_tasks], teams)
+        self.assertEqual({task.created_by_id for task in team_tasks[0][1]}, {teams[0].id})
+        self.assertEqual(len(team_tasks[0][1]), 3)
+        self.assertEqual([tasks for team, tasks in team_tasks[1:]], [None, None])
+        self.assertContains(response, reverse('dashboard_team_tasks', kwargs={'team_id': teams[1].id}))
+
+    def test_team_can_be_chosen(self):
+        teams = self._create_teams(3)
+        response = self.client.get(self.url, {'team': teams[2].id})
+        team_tasks = response.context['team_tasks']
+        self.assertIsNone(team_tasks[0][1])
+        self.assertEqual(len(team_tasks[2][1]), 3)
+
+    def test_last_opened_team_is_loaded(self):
+        teams = self._create_teams(3)
+        self.client.cookies['active_team'] = str(teams[1].id)
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.context['team_tasks'][1][1]), 3)
+
+    def test_other_users_teams_cannot_be_chosen(self):
+        teams = self._create_teams(2)
+        other_team = Team.objects.create(team_name='Not mine', admin_user=self.other_user)
+        response = self.client.get(self.url, {'team': other_team.id})
+        self.assertEqual(len(response.context['team_tasks'][0][1]), 3)
+
+    def test_ordering_by_assigned_to_has_no_duplicates(self):
+        self._create_teams(1)
+        response = self.client.get(self.url, {'order': 'assigned_to'})
+        tasks = response.context['team_tasks'][0][1]
+        self.assertEqual(len(tasks), len(set(task.id for task in tasks)))
+
+    def _create_teams(self, count):
+        teams = []
+        for number in range(count):
+            team = Team.objects.create(team_name=f'Team {number}', admin_user=self.user)
+            team.members.add(self.user, self.other_user)
+            for priority in ['low', 'medium', 'high']:
+                task = Task.objects.create(title=f'Task {priority}', due_date=date.today() + timedelta(1), created_by=team, priority=priority)
+                task.assigned_to.add(self.user, self.other_user)
+            teams.append(team)
+        self.user.teams.add(*teams)
+        return teams
+
+    def _assert_dashboard_is_within_budget(self, data=None, budget=None):
+        #the first request fills the notifications cache
+        self.client.get(self.url, data)
+        with self.assertNumQueries(budget or self.QUERY_BUDGET):
+            response = self.client.get(self.url, data)
+        self.assertEqual(response.status_code, 200)
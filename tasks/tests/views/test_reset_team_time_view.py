@@ -0,0 +1,82 @@
+"""Tests of the team admin's reset of the time spent on the team's tasks."""
+from django.test import TestCase
+from django.urls import reverse
+from tasks.models import User, Team, Task, TimeSpent, TimeLog
+from datetime import date
+
+class ResetTeamTimeViewTestCase(TestCase):
+
+    fixtures = ['tasks/tests/fixtures/default_user.json', 'tasks/tests/fixtures/other_users.json']
+
+    def setUp(self):
+        self.admin_user = User.objects.get(username='@johndoe')
+        self.member = User.objects.get(username='@janedoe')
+        self.team = Team.objects.create(team_name='Team 1', admin_user=self.admin_user)
+        self.team.members.set([self.admin_user, self.member])
+        self.admin_user.teams.set([self.team])
+        self.member.teams.set([self.team])
+        self.other_team = Team.objects.create(team_name='Team 2', admin_user=self.member)
+        self.tasks = [Task.objects.create(title=f'Task {i}', description='A task', due_date=date.today(), created_by=self.team) for i in range(3)]
+        self.other_task = Task.objects.create(title='Other task', description='A task', due_date=date.today(), created_by=self.other_team)
+        for task in [*self.tasks, self.other_task]:
+            for user in (self.admin_user, self.member):
+                TimeSpent.objects.create(user=user, task=task, time_spent=60)
+                TimeLog.objects.create(user=user, task=task, logged_time=60)
+        self.url = reverse('reset_team_time', kwargs={'team_id': self.team.id})
+
+    def time_spent(self, task):
+        return sorted(TimeSpent.objects.filter(task=task).values_list('time_spent', flat=True))
+
+    def test_reset_team_time_url(self):
+        self.assertEqual(self.url, f'/dashboard/show_team/{self.team.id}/reset_time/')
+
+    def test_admin_resets_the_whole_team(self):
+        self.client.login(username='@johndoe', password='Password123')
+        response = self.client.post(self.url, follow=True)
+        self.assertRedirects(response, reverse('show_team', kwargs={'team_id': self.team.id}))
+        self.assertContains(response, 'The time spent on the team&#x27;s tasks was reset')
+        for task in self.tasks:
+            self.assertEqual(self.time_spent(task), [0, 0])
+            self.assertFalse(TimeLog.objects.filter(task=task).exists())
+        self.assertEqual(self.time_spent(self.other_task), [60, 60])
+        self.assertEqual(TimeLog.objects.filter(task=self.other_task).count(), 2)
+
+    def test_admin_resets_some_tasks(self):
+        self.client.login(username='@johndoe', password='Password123')
+        self.client.post(self.url, {'task_ids': [self.tasks[0].id, self.tasks[2].id, self.other_task.id]})
+        self.assertEqual(self.time_spent(self.tasks[0]), [0, 0])
+        self.assertEqual(self.time_spent(self.tasks[1]), [60, 60])
+        self.assertEqual(self.time_spent(self.tasks[2]), [0, 0])
+        #tasks of other teams can't be reset from this team
+        self.assertEqual(self.time_spent(self.other_task), [60, 60])
+
+    def test_invalid_task_ids_reset_nothing(self):
+        self.client.login(username='@johndoe', password='Password123')
+        self.client.post(self.url, {'task_ids': ['abc']})
+        for task in self.tasks:
+            self.assertEqual(self.time_spent(task), [60, 60])
+
+    def test_only_the_admin_can_reset(self):
+        self.client.login(username='@janedoe', password='Password123')
+        self.client.post(self.url)
+        for task in self.tasks:
+            self.assertEqual(self.time_spent(task), [60, 60])
+
+    def test_get_does_not_reset(self):
+        self.client.login(username='@johndoe', password='Password123')
+        self.client.get(self.url)
+        self.assertEqual(self.time_spent(self.tasks[0]), [60, 60])
+
+    def test_reset_takes_the_same_queries_however_many_tasks(self):
+        self.client.login(username='@johndoe', password='Password123')
+        Task.objects.bulk_create([Task(title=f'More {i}', description='A task', due_date=date.today(), created_by=self.team) for i in range(20)])
+        #session, user, team, savepoint, update, delete, release
+        with self.assertNumQueries(7):
+            self.client.post(self.url)
+
+    def test_deleted_team_redirects_to_the_dashboard(self):
+        self.client.login(username='@johndoe', password='Password123')
+        url = reverse('reset_team_time', kwargs={'team_id': self.other_team.id + 1})
+        response = self.client.post(url, follow=True)
+        self.assertRedirects(response, reverse('dashboard'))
+        self.assertContains(response, 'This team was deleted')
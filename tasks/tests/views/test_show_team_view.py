@@ -1,6 +1,6 @@
 "Tests of the show team view."""
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from tasks.models import User, Team
 from tasks.forms import CreateTeamForm
@@ -66,4 +66,24 @@ class ShowTeamViewTestCase(TestCase):
         self.assertTemplateUsed(response, 'dashboard.html') #check redirect back to dashboard
         self.assertContains(response, 'This team was deleted')
 
-
+    @override_settings(TEAM_MEMBERS_PAGE_SIZE=1)
+    def test_team_members_are_paged_by_name(self):
+        response = self.client.get(self.url)
+        page_obj = response.context['page_obj']
+        #Doe, Jane comes before Doe, John
+        self.assertEqual([member.username for member in page_obj], ['@janedoe'])
+        self.assertTrue(page_obj.has_next)
+        self.assertContains(response, f'href="?after={page_obj.next_cursor}"')
+        response = self.client.get(self.url, {'after': page_obj.next_cursor})
+        page_obj = response.context['page_obj']
+        self.assertEqual([member.username for member in page_obj], ['@johndoe'])
+        self.assertFalse(page_obj.has_next)
+        self.assertTrue(page_obj.has_previous)
+        response = self.client.get(self.url, {'before': page_obj.previous_cursor})
+        self.assertEqual([member.username for member in response.context['page_obj']], ['@janedoe'])
+
+    def test_team_members_page_does_not_count_members(self):
+        #session, user, ETag, team, one page of members and notifications
+        with self.assertNumQueries(6):
+            response = self.client.get(self.url)
+        self.assertContains(response, '@janedoe')
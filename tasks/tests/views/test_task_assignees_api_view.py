@@ -0,0 +1,78 @@
+"""Tests for the task assignee picker API"""
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from tasks.models import User, Team, Task
+from datetime import date
+
+class TaskAssigneesAPIViewTestCase(TestCase):
+    fixtures = [
+        'tasks/tests/fixtures/default_user.json',
+        'tasks/tests/fixtures/other_users.json',
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.get(username='@johndoe')
+        self.other_user = User.objects.get(username='@janedoe')
+        self.team = Team.objects.create(team_name='Team 1', admin_user=self.user)
+        self.user.teams.add(self.team)
+        self.members = User.objects.bulk_create([
+            User(username=f'@member{i:02}', email=f'member{i}@example.org', first_name='Member', last_name=f'Number{i:02}')
+            for i in range(30)
+        ])
+        self.team.members.add(self.user, *self.members)
+        self.task = Task.objects.create(title='Report', description='Write it', due_date=date(2030, 1, 1), created_by=self.team)
+        self.task.assigned_to.add(self.members[20])
+        self.url = reverse('task_assignees_api', kwargs={'team_id': self.team.id, 'task_id': self.task.id})
+        self.client.login(username='@johndoe', password='Password123')
+
+    def test_task_assignees_api_url(self):
+        self.assertEqual(self.url, f'/api/teams/{self.team.id}/tasks/{self.task.id}/assignees')
+
+    @override_settings(ASSIGNEE_PAGE_SIZE=10)
+    def test_members_are_paged_assigned_first(self):
+        data = self.client.get(self.url).json()
+        self.assertEqual(len(data['results']), 10)
+        self.assertEqual(data['results'][0], {'username': '@member20', 'first_name': 'Member', 'last_name': 'Number20', 'assigned': True})
+        self.assertFalse(any(result['assigned'] for result in data['results'][1:]))
+        usernames = [result['username'] for result in data['results']]
+        while data['next']:
+            data = self.client.get(self.url, {'after': data['next']}).json()
+            usernames += [result['username'] for result in data['results']]
+        self.assertEqual(len(usernames), 31)
+        self.assertEqual(len(set(usernames)), 31)
+
+    def test_search_by_username_prefix(self):
+        data = self.client.get(self.url, {'q': 'member1'}).json()
+        self.assertEqual([result['username'] for result in data['results']], [f'@member1{i}' for i in range(10)])
+        data = self.client.get(self.url, {'q': '@JOHN'}).json()
+        self.assertEqual([result['username'] for result in data['results']], ['@johndoe'])
+
+    def test_search_by_name_prefix(self):
+        data = self.client.get(self.url, {'q': 'number2'}).json()
+        self.assertEqual(data['results'][0]['username'], '@member20')
+        self.assertEqual(len(data['results']), 10)
+
+    def test_only_members_of_the_team_are_returned(self):
+        data = self.client.get(self.url, {'q': 'jane'}).json()
+        self.assertEqual(data['results'], [])
+
+    def test_other_teams_are_not_found(self):
+        self.client.login(username='@janedoe', password='Password123')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 404)
+
+    def test_tasks_of_other_teams_are_not_found(self):
+        other_team = Team.objects.create(team_name='Team 2', admin_user=self.other_user)
+        other_task = Task.objects.create(title='Secret', description='Not for team 1', due_date=date(2030, 1, 1), created_by=other_team)
+        other_task.assigned_to.add(self.members[0])
+        url = reverse('task_assignees_api', kwargs={'team_id': self.team.id, 'task_id': other_task.id})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(ASSIGNEE_PAGE_SIZE=10)
+    def test_query_count_does_not_depend_on_the_team_size(self):
+        #session, user, team, task, members
+        with self.assertNumQueries(5):
+            self.client.get(self.url)
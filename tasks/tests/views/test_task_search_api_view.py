@@ -0,0 +1,87 @@
+"""Tests for the search as you type task search API"""
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from tasks.tests.helpers import reverse_with_next
+from tasks.models import User, Team, Task
+from datetime import date
+
+class TaskSearchAPIViewTestCase(TestCase):
+    fixtures = [
+        'tasks/tests/fixtures/default_user.json',
+        'tasks/tests/fixtures/other_users.json',
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.get(username='@johndoe')
+        self.other_user = User.objects.get(username='@janedoe')
+        self.team = Team.objects.create(team_name='Team 1', admin_user=self.user)
+        self.second_team = Team.objects.create(team_name='Team 2', admin_user=self.user)
+        self.other_team = Team.objects.create(team_name='Other team', admin_user=self.other_user)
+        self.user.teams.set([self.team, self.second_team])
+        self.other_user.teams.set([self.other_team])
+        self.task = Task.objects.create(title='Quarterly report', description='Write the <i>report</i>', due_date=date(2030, 1, 1), created_by=self.team)
+        self.second_task = Task.objects.create(title='Report meeting', description='Book a room', due_date=date(2030, 1, 2), created_by=self.second_team)
+        self.other_task = Task.objects.create(title='Secret report', description='Not for johndoe', due_date=date(2030, 1, 3), created_by=self.other_team)
+        self.url = reverse('task_search_api')
+        self.client.login(username='@johndoe', password='Password123')
+
+    def test_task_search_api_url(self):
+        self.assertEqual(self.url, '/api/tasks/search')
+
+    def test_search_returns_tasks_from_every_team_of_the_user(self):
+        response = self.client.get(self.url, {'q': 'report'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['query'], 'report')
+        self.assertEqual({result['id'] for result in data['results']}, {self.task.id, self.second_task.id})
+
+    def test_search_result_fields(self):
+        response = self.client.get(self.url, {'q': 'quarter'})
+        result = response.json()['results'][0]
+        self.assertEqual(result['id'], self.task.id)
+        self.assertEqual(result['title'], 'Quarterly report')
+        self.assertEqual(result['title_html'], '<mark>Quarterly</mark> report')
+        self.assertEqual(result['snippet_html'], 'Write the &lt;i&gt;report&lt;/i&gt;')
+        self.assertEqual(result['team'], 'Team 1')
+        self.assertEqual(result['due_date'], '2030-01-01')
+        self.assertEqual(result['url'], reverse('view_task', kwargs={'team_id': self.team.id, 'task_id': self.task.id}))
+
+    def test_empty_search_returns_nothing(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'q': '  '})
+        self.assertEqual(response.json()['results'], [])
+
+    @override_settings(TASK_SEARCH_RESULT_LIMIT=1)
+    def test_results_are_limited(self):
+        response = self.client.get(self.url, {'q': 'report'})
+        self.assertEqual(len(response.json()['results']), 1)
+        response = self.client.get(self.url, {'q': 'report', 'limit': '50'})
+        self.assertEqual(len(response.json()['results']), 1)
+
+    def test_limit_can_be_lowered(self):
+        response = self.client.get(self.url, {'q': 'report', 'limit': '1'})
+        self.assertEqual(len(response.json()['results']), 1)
+        response = self.client.get(self.url, {'q': 'report', 'limit': 'lots'})
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_results_are_cached_per_user(self):
+        self.client.get(self.url, {'q': 'report'})
+        #only the session and user are loaded the second time
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'q': 'Report '})
+        self.assertEqual(len(response.json()['results']), 2)
+        self.client.login(username='@janedoe', password='Password123')
+        response = self.client.get(self.url, {'q': 'report'})
+        self.assertEqual([result['id'] for result in response.json()['results']], [self.other_task.id])
+
+    def test_get_task_search_api_redirects_when_not_logged_in(self):
+        self.client.logout()
+        redirect_url = reverse_with_next('log_in', self.url)
+        response = self.client.get(self.url)
+        self.assertRedirects(response, redirect_url, status_code=302, target_status_code=200)
+
+    def test_dashboard_search_box_uses_the_api(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, f'data-search-url="{self.url}"')
@@ -0,0 +1,162 @@
+"""Tests of caching the rendered team pages until the team changes"""
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+from io import StringIO
+from tasks.models import User, Task, Team
+from tasks.team_cache import team_fragment_lookup, team_generation, team_generation_key, bump_team_generations, team_fragment_cache_stats, reset_team_fragment_cache_stats
+from datetime import date, timedelta
+
+class TeamFragmentCacheTestCase(TestCase):
+
+    fixtures = [
+        'tasks/tests/fixtures/default_user.json',
+        'tasks/tests/fixtures/other_users.json',
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.get(username='@johndoe')
+        self.second_user = User.objects.get(username='@janedoe')
+        self.team = Team.objects.create(team_name='Team 1', admin_user=self.user)
+        self.team.members.add(self.user)
+        self.user.teams.add(self.team)
+        self.task = Task.objects.create(title='Write report', due_date=date.today() + timedelta(1), created_by=self.team)
+        self.tasks_url = reverse('dashboard_team_tasks', kwargs={'team_id': self.team.id})
+        self.team_url = reverse('show_team', kwargs={'team_id': self.team.id})
+        self.task_url = reverse('view_task', kwargs={'team_id': self.team.id, 'task_id': self.task.id})
+        self.client.login(username='@johndoe', password='Password123')
+        #the first page sets the CSRF cookie, cached fragments are keyed on it and aren't cached without one
+        self.client.get(self.team_url)
+        self.lookups = []
+        team_fragment_lookup.connect(self.record_lookup)
+        self.addCleanup(team_fragment_lookup.disconnect, self.record_lookup)
+
+    def record_lookup(self, sender, name, team_id, hit, **kwargs):
+        self.lookups.append((name, team_id, hit))
+
+    def test_unchanged_team_tasks_are_served_from_the_cache(self):
+        self.client.get(self.tasks_url)
+        #session, user and team, but not the tasks or who they are assigned to
+        with self.assertNumQueries(3):
+            response = self.client.get(self.tasks_url)
+        self.assertContains(response, 'Write report')
+        self.assertEqual(self.lookups, [('team_tasks', self.team.id, False), ('team_tasks', self.team.id, True)])
+
+    def test_changing_a_task_shows_on_the_next_page(self):
+        self.client.get(self.tasks_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.title = 'Write summary'
+            self.task.save()
+        response = self.client.get(self.tasks_url)
+        self.assertContains(response, 'Write summary')
+        self.assertEqual(self.lookups[-1][2], False)
+
+    def test_search_options_are_cached_separately(self):
+        Task.objects.create(title='Fix bug', due_date=date.today() + timedelta(1), created_by=self.team)
+        self.client.get(self.tasks_url)
+        response = self.client.get(self.tasks_url, {'search_query': 'bug'})
+        self.assertContains(response, 'Fix <mark>bug</mark>')
+        self.assertNotContains(response, 'Write report')
+
+    def test_team_members_are_served_from_the_cache_until_they_change(self):
+        self.client.get(self.team_url)
+        response = self.client.get(self.team_url)
+        self.assertNotContains(response, '@janedoe')
+        self.assertEqual(self.lookups[-1], ('team_members', self.team.id, True))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.team.members.add(self.second_user)
+        response = self.client.get(self.team_url)
+        self.assertContains(response, '@janedoe')
+        self.assertEqual(self.lookups[-1], ('team_members', self.team.id, False))
+
+    def test_cached_pages_are_per_user(self):
+        self.team.members.add(self.second_user)
+        self.second_user.teams.add(self.team)
+        self.client.get(self.team_url)
+        self.client.login(username='@janedoe', password='Password123')
+        response = self.client.get(self.team_url)
+        #jane isn't the admin, so she doesn't get john's remove buttons
+        self.assertNotContains(response, 'Remove Member')
+        self.assertEqual(self.lookups[-1][2], False)
+
+    def test_renaming_a_member_changes_their_teams(self):
+        generation = team_generation(self.team.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Johnny'
+            self.user.save()
+        self.assertNotEqual(team_generation(self.team.id), generation)
+
+    def test_logging_in_does_not_change_their_teams(self):
+        generation = team_generation(self.team.id)
+        self.client.login(username='@johndoe', password='Password123')
+        self.assertEqual(team_generation(self.team.id), generation)
+
+    def test_assigning_a_task_changes_its_team(self):
+        self.team.members.add(self.second_user)
+        self.client.get(self.task_url)
+        generation = team_generation(self.team.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second_user.task_set.add(self.task)
+        self.assertNotEqual(team_generation(self.team.id), generation)
+        response = self.client.get(self.task_url)
+        self.assertEqual(self.lookups[-1], ('task_assignees', self.team.id, False))
+        self.assertContains(response, 'value="@janedoe"  checked')
+
+    def test_clearing_a_users_teams_changes_the_teams(self):
+        generation = team_generation(self.team.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.membership.clear()
+        self.assertNotEqual(team_generation(self.team.id), generation)
+
+    def test_other_teams_are_not_changed(self):
+        other_team = Team.objects.create(team_name='Team 2', admin_user=self.second_user)
+        generation = team_generation(other_team.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.title = 'Write summary'
+            self.task.save()
+            self.team.members.add(self.second_user)
+        self.assertEqual(team_generation(other_team.id), generation)
+
+    def test_teams_are_changed_once_the_change_commits(self):
+        generation = team_generation(self.team.id)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.task.title = 'Write summary'
+            self.task.save()
+        self.assertEqual(team_generation(self.team.id), generation)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(team_generation(self.team.id), generation)
+
+    def test_rolled_back_changes_do_not_change_the_team(self):
+        generation = team_generation(self.team.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError):
+                with transaction.atomic():
+                    self.task.title = 'Write summary'
+                    self.task.save()
+                    raise ValueError
+        self.assertEqual(team_generation(self.team.id), generation)
+
+    def test_evicted_generation_starts_from_a_new_number(self):
+        generation = team_generation(self.team.id)
+        cache.delete(team_generation_key(self.team.id))
+        self.assertGreater(team_generation(self.team.id), generation)
+        cache.delete(team_generation_key(self.team.id))
+        bump_team_generations([self.team.id])
+        self.assertGreater(team_generation(self.team.id), generation)
+
+    def test_hit_ratio_is_reported(self):
+        reset_team_fragment_cache_stats()
+        self.client.get(self.tasks_url)
+        self.client.get(self.tasks_url)
+        self.client.get(self.tasks_url)
+        stats = team_fragment_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+        out = StringIO()
+        call_command('team_cache_stats', '--reset', stdout=out)
+        self.assertIn('Hit ratio: 66.7%', out.getvalue())
+        self.assertEqual(team_fragment_cache_stats()['hits'], 0)
@@ -1,6 +1,6 @@
 from django.test import TestCase
 from django.urls import reverse
-from tasks.models import User, Task, Team
+from tasks.models import User, Task, Team, TimeSpent, TimeLog
 from tasks.forms import SubmitTimeForm
 from tasks.templatetags.format_time import format
 from datetime import date, timedelta
@@ -111,6 +111,24 @@ class TimeModalViewTestCase(TestCase):
         total_time_spent = response.context['total_time_spent']
         self.assertEqual(total_time_spent, 0)
 
+    def test_total_reset_takes_the_same_queries_however_many_users_tracked_time(self):
+        self.client.login(username='@johndoe', password='Password123')
+        users = User.objects.bulk_create([User(username=f'@tracker{i}', email=f'tracker{i}@example.org') for i in range(10)])
+        TimeSpent.objects.bulk_create([TimeSpent(user=user, task=self.task, time_spent=60) for user in users])
+        TimeLog.objects.bulk_create([TimeLog(user=user, task=self.task, logged_time=60) for user in users])
+        #session, user, team and task exist, savepoint, update, delete, release
+        with self.assertNumQueries(8):
+            self.client.get(f'{self.reset_url}?action=total')
+        self.assertEqual(set(TimeSpent.objects.values_list('time_spent', flat=True)), {0})
+        self.assertFalse(TimeLog.objects.exists())
+
+    def test_user_reset_without_time_spent_changes_nothing(self):
+        self.client.login(username='@janedoe', password='Password123')
+        TimeSpent.objects.create(user=self.user, task=self.task, time_spent=60)
+        response = self.client.get(f'{self.reset_url}?action=user')
+        self.assertRedirects(response, self.url)
+        self.assertEqual(TimeSpent.objects.get(user=self.user, task=self.task).time_spent, 60)
+
 class FormatTimeTestCase(TestCase):
 
     def test_no_time_given_returns_message(self):
@@ -1,8 +1,9 @@
 """Unit tests of the view task view."""
 from django import forms
-from django.test import TestCase
-from tasks.forms import EditTaskForm, AssignTaskForm
-from tasks.models import User,Team, Task
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from tasks.forms import EditTaskForm
+from tasks.models import User,Team, Task, TimeSpent
 from django.urls import reverse
 from datetime import date, timedelta
 
@@ -29,6 +30,8 @@ class ViewTaskViewTestCase(TestCase):
         #create a team for this guy
         self.client.post(reverse("create_team"), {'team_name':'NewTeam'}, follow = True)
         self.team = Team.objects.get(team_name="NewTeam")
+        self.task.created_by = self.team
+        self.task.save()
         self.url = reverse('view_task', kwargs={'team_id': self.team.id, 'task_id':self.task.id})
         #dashboard/view-task/<int:team_id>/<int:task_id>/
     
@@ -45,7 +48,7 @@ class ViewTaskViewTestCase(TestCase):
         team = response.context['team']
         task = response.context['task']
         form = response.context['form']
-        form2 = response.context['form2']
+        assignees = response.context['assignees']
         is_admin = response.context['is_admin']
         can_mark_as_complete = response.context['can_mark_as_complete']
         self.assertEqual(team, self.team)
@@ -54,7 +57,17 @@ class ViewTaskViewTestCase(TestCase):
         self.assertTrue(can_mark_as_complete)
         self.assertTrue(form.is_bound) #check if data is filled in to begin with
         self.assertIsInstance(form, EditTaskForm)
-        self.assertIsInstance(form2, AssignTaskForm)
+        self.assertEqual(list(assignees), [self.user])
+
+    def test_task_of_another_team_is_not_shown(self):
+        other_team = Team.objects.create(team_name='Other team', admin_user=self.user)
+        other_task = Task.objects.create(title='Other task', due_date=date.today(), created_by=other_team)
+        url = reverse('view_task', kwargs={'team_id': self.team.id, 'task_id': other_task.id})
+        response = self.client.get(url, follow=True)
+        self.assertRedirects(response, reverse('dashboard'))
+        self.assertNotContains(response, 'Other task')
+        #the page would be cached as this team's, which changes to the task don't invalidate
+        self.assertNotIn('ETag', self.client.get(url))
 
     def test_form_initial_values(self):
         response = self.client.get(self.url, follow=True)
@@ -165,3 +178,59 @@ class ViewTaskViewTestCase(TestCase):
         self.assertRedirects(response, response_url, status_code=302, target_status_code=200)
         self.assertTemplateUsed(response, 'dashboard.html') #check redirect back to dashboard
         self.assertContains(response, 'This task was deleted')
+
+    def add_members_with_time(self, start, count):
+        users = User.objects.bulk_create([
+            User(username=f'@member{i}', email=f'member{i}@example.org', first_name='Member', last_name=str(i))
+            for i in range(start, start + count)
+        ])
+        self.team.members.add(*users)
+        self.task.assigned_to.add(*users)
+        TimeSpent.objects.bulk_create([TimeSpent(user=user, task=self.task, time_spent=60) for user in users])
+
+    def test_view_task_query_count_does_not_grow_with_the_team(self):
+        #session, user, ETag, team, task, assignment counts, first page of assignees, time by member, notifications
+        self.add_members_with_time(0, 2)
+        cache.clear()
+        with self.assertNumQueries(9):
+            self.client.get(self.url)
+        self.add_members_with_time(2, 20)
+        cache.clear()
+        with self.assertNumQueries(9):
+            response = self.client.get(self.url)
+        self.assertEqual(response.context['total_time_spent'], 22 * 60)
+
+    def test_time_by_member_is_shown(self):
+        self.task.assigned_to.add(self.user)
+        other_user = User.objects.get(username='@janedoe')
+        TimeSpent.objects.create(user=self.user, task=self.task, time_spent=120)
+        TimeSpent.objects.create(user=other_user, task=self.task, time_spent=3600)
+        response = self.client.get(self.url)
+        self.assertEqual([(member['user__username'], member['total']) for member in response.context['time_by_member']],
+                         [('@janedoe', 3600), ('@johndoe', 120)])
+        self.assertEqual(response.context['total_time_spent'], 3720)
+        self.assertContains(response, '1h')
+        self.assertContains(response, '2m')
+
+    @override_settings(ASSIGNEE_PAGE_SIZE=5)
+    def test_only_a_page_of_members_is_shown_assigned_first(self):
+        self.add_members_with_time(0, 12)
+        self.task.assigned_to.set([User.objects.get(username='@member9')])
+        response = self.client.get(self.url)
+        members = list(response.context['assignees'])
+        self.assertEqual(len(members), 5)
+        self.assertEqual(members[0].username, '@member9')
+        self.assertContains(response, 'value="@member9"  checked')
+        self.assertContains(response, 'moreAssignees')
+        self.assertNotContains(response, '@member8')
+
+    def test_assign_posts_only_the_change(self):
+        other_user = User.objects.get(username='@janedoe')
+        self.team.members.add(other_user)
+        self.task.assigned_to.add(self.user)
+        response = self.client.post(self.url, {'usernames': ['@janedoe'], 'assign_submit': ''})
+        self.assertEqual(set(self.task.assigned_to.all()), {self.user, other_user})
+        self.assertContains(response, 'Successfully assigned:<br>- @janedoe')
+        response = self.client.post(self.url, {'remove_usernames': ['@johndoe'], 'assign_submit': ''})
+        self.assertEqual(set(self.task.assigned_to.all()), {other_user})
+        self.assertContains(response, 'Successfully removed:<br>- @johndoe')
@@ -5,93 +5,62 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import ImproperlyConfigured
 from django.core.paginator import Paginator
-from django.db.models import Q, Count
+from django.db.models import BooleanField, Case, Count, Exists, OuterRef, Q, Value, When
+from django.http import JsonResponse
 from django.shortcuts import redirect, render, get_object_or_404
 from django.views import View
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django.views.generic.edit import FormView, UpdateView
 from django.urls import reverse
-from tasks.forms import LogInForm, PasswordForm, UserForm, SignUpForm, CreateTaskForm, CreateTeamForm, EditTaskForm, AssignTaskForm, SubmitTimeForm
+from tasks.changes import changes_since, latest_cursor
+from tasks.conditional import dashboard_etag, show_team_etag, view_task_etag
+from tasks.forms import LogInForm, PasswordForm, UserForm, SignUpForm, CreateTaskForm, CreateTeamForm, EditTaskForm, AssignTaskForm, SubmitTimeForm, ActivityLogFilterForm
 from tasks.helpers import login_prohibited
-from tasks.models import User, Task, Team, Activity_Log, TimeSpent, TimeLog
+from tasks.models import User, Task, Team, ActivityEvent, TimeSpent, TimeLog
+from tasks.pagination import keyset_paginate
+from tasks.queries import DashboardQuery, upcoming_deadlines
+from tasks.search import get_cached_search_results
 from datetime import datetime, timedelta
 from django.contrib import messages
 from django.core.exceptions import ValidationError
 
-def key_for_sorting_by_priority(task):
-        priority_map = {'high': 1, 'medium': 2, 'low': 3}
-        task_id = task.id
-        return priority_map[Task.objects.get(pk=task_id).priority]
-
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=dashboard_etag)
 def dashboard(request):
-    """Display the current user's dashboard."""
+    """Display the current user's dashboard.
+
+    Only the active team's tasks are shown, the other teams' tasks are loaded from dashboard_team_tasks
+    when their tab is opened. The number of queries doesn't depend on how many teams or tasks the user has:
+    one for the teams, one for the active team's tasks, one for who is assigned to them and one for the
+    upcoming deadlines (plus the session, user, notifications and the ETag), see DashboardQueryBudgetTestCase.
+    Unchanged pages get 304 Not Modified after just the ETag's query, see tasks/conditional.py.
+    """
     current_user = request.user
 
     if not current_user.is_authenticated:
         return render(request, 'home.html', {'user': current_user})
 
-    teams = current_user.teams.all()
+    teams = list(current_user.teams.all())
 
     # Check if the user is associated with any teams
-    if not teams.exists():
+    if not teams:
         # If the user is not associated with any teams
         return render(request, 'dashboard.html', {'user': current_user, 'teams': teams, 'team_id': 1, 'team_tasks': None})
 
-    # Get the sorting method and order field from the request
-    order_type = request.GET.get('order', 'default')
-    filter_type = request.GET.get('filter', None)
-    search_query = request.GET.get('search_query', '')
+    # Get the search, sorting and filter options from the request, they can all be used together
+    query = DashboardQuery.from_request(request)
 
-    team_tasks = []
     task_fields = [field for field in Task._meta.get_fields() if not field.name.startswith('_')]
 
-    # Checks and retrieves due dates
-    due_dates = []
-
-    for team in teams:
-        tasks_for_each_team = Task.objects.filter(created_by=team)
-        # Due dates and notifications
-        due_dates.extend(task for task in tasks_for_each_team if task.due_date)
-
-        # Apply sorting based on sort_type and order_type
-        if search_query:
-            tasks_for_each_team = tasks_for_each_team.filter(
-                Q(title__icontains=search_query) | Q(description__icontains=search_query)
-            )
-        elif order_type=='priority':
-            tasks_for_each_team = sorted(tasks_for_each_team, key=key_for_sorting_by_priority)
-
-        elif order_type != 'default':
-            tasks_for_each_team = list(tasks_for_each_team.order_by(order_type))
-            #Remove duplicates from tasks
-            new_tasks = []
-            for task in tasks_for_each_team:
-                if task not in new_tasks:
-                    new_tasks.append(task)
-            tasks_for_each_team = new_tasks
-        
+    # The next few deadlines in the user's teams, more are loaded with "Show more"
+    due_dates, more_due_dates = upcoming_deadlines(teams, settings.DEADLINE_SIDEBAR_SIZE)
 
-        # Filter conditions
-        filter_conditions={}
-        filter = ""
-        if filter_type in ['priorityLow', 'priorityMedium', 'priorityHigh']:
-            filter_conditions['priority'] = filter_type.replace('priority', '').lower()
-        elif filter_type in ['CompletedTrue', 'CompletedFalse']:
-            filter_conditions['task_completed'] = (filter_type == 'CompletedTrue')
-
-        #filter the tasks using filter_conditions
-        if 'priority' in filter_conditions:
-            filter = filter_conditions['priority'] + " priority"
-            tasks_for_each_team = tasks_for_each_team.filter(
-                Q(priority=filter_conditions['priority'] )
-            )
-        elif 'task_completed' in filter_conditions:
-            filter = "tasks that are complete" if filter_conditions['task_completed'] else "tasks that are incomplete"
-            tasks_for_each_team = tasks_for_each_team.filter(
-                Q(task_completed=filter_conditions['task_completed'])
-            )
-        # Append tasks for the current team to the team_tasks list
-        team_tasks.append((team, tasks_for_each_team))
+    # The other teams' tabs have no tasks (None) until they are opened
+    active_team = active_dashboard_team(request, teams)
+    tasks = query.page(team_tasks_queryset(active_team), settings.DASHBOARD_TASKS_PAGE_SIZE)
+    team_tasks = [(team, tasks if team == active_team else None) for team in teams]
 
     return render(request, 'dashboard.html', {'user': current_user,
                                                'teams': teams,
@@ -99,10 +68,103 @@ def dashboard(request):
                                                'team_tasks': team_tasks,
                                                'notifications_list': request.notifications_list,
                                                'due_dates': due_dates,
-                                               'filter': filter,
-                                               'sort_order': order_type,
+                                               'more_due_dates': more_due_dates,
+                                               'filter': query.filter_description,
+                                               'sort_order': query.order,
+                                               'query': query,
                                                })
 
+def active_dashboard_team(request, teams):
+    """Return the team whose tasks come with the dashboard page.
+
+    This is ?team=, or the team last opened (saved in the active_team cookie by the dashboard), or the first team.
+    """
+    team_id = request.GET.get('team', request.COOKIES.get('active_team'))
+    for team in teams:
+        if str(team.id) == team_id:
+            return team
+    return teams[0]
+
+def team_tasks_queryset(team):
+    return Task.objects.filter(created_by=team).select_related('created_by').prefetch_related('assigned_to')
+
+@login_required
+def dashboard_team_tasks(request, team_id):
+    """Return the tasks tab of one of the user's teams, for when it is opened on the dashboard.
+
+    Takes the same search, order and filter options as the dashboard. With ?after=<cursor> (from the
+    tab's "Load more" button) only the next page of task cards is returned.
+    """
+    team = get_object_or_404(request.user.teams.all(), pk=team_id)
+    query = DashboardQuery.from_request(request)
+    after = request.GET.get('after')
+    tasks = query.page(team_tasks_queryset(team), settings.DASHBOARD_TASKS_PAGE_SIZE, after=after)
+    template = 'partials/team_task_cards.html' if after else 'partials/team_tasks.html'
+    return render(request, template, {'team': team, 'tasks': tasks, 'query': query})
+
+@login_required
+def dashboard_deadlines(request):
+    """Return the next page of the dashboard's upcoming deadlines, for its "Show more" button.
+
+    ?after=<due date>_<task id> is the last deadline already shown.
+    """
+    try:
+        after_date, after_id = request.GET['after'].split('_')
+        after = (datetime.strptime(after_date, '%Y-%m-%d').date(), int(after_id))
+    except (KeyError, ValueError):
+        after = None
+    due_dates, more_due_dates = upcoming_deadlines(request.user.teams.all(), settings.DEADLINE_SIDEBAR_SIZE, after=after)
+    return render(request, 'partials/due_date_cards.html', {'due_dates': due_dates, 'more_due_dates': more_due_dates})
+
+@login_required
+def task_search_api(request):
+    """Return the tasks matching ?q= in all of the user's teams as JSON, for searching as you type.
+
+    ?limit= asks for fewer results than TASK_SEARCH_RESULT_LIMIT.
+    """
+    text = request.GET.get('q', '').strip()
+    limit = settings.TASK_SEARCH_RESULT_LIMIT
+    try:
+        limit = max(1, min(int(request.GET.get('limit', limit)), limit))
+    except ValueError:
+        pass
+    results = get_cached_search_results(request.user, text, limit) if text else []
+    return JsonResponse({'query': text, 'results': results})
+
+@login_required
+def task_assignees_api(request, team_id, task_id):
+    """Return a page of the team's members as JSON for the task's assignee picker, with who is assigned.
+
+    ?q= searches by the start of their username or name, ?after= is the next cursor from the last page.
+    """
+    team = request.user.teams.filter(pk=team_id).first()
+    #only the team's own tasks, so who is assigned to other teams' tasks isn't shown
+    task = Task.objects.filter(pk=task_id, created_by=team).first() if team is not None else None
+    if team is None or task is None:
+        return JsonResponse({'error': 'This team or task was deleted'}, status=404)
+    page = assignee_page(team, task, request.GET)
+    results = [
+        {'username': member.username, 'first_name': member.first_name, 'last_name': member.last_name, 'assigned': not member.unassigned}
+        for member in page
+    ]
+    return JsonResponse({'results': results, 'next': page.next_cursor})
+
+@login_required
+def changes_api(request):
+    """Return what changed in the user's teams after ?since=<cursor> as JSON, for clients that keep a copy.
+
+    Without since, only the current cursor is returned (to start from after loading everything).
+    There are at most CHANGE_FEED_PAGE_SIZE changes at a time, has_more says to ask again with the new cursor.
+    """
+    if 'since' not in request.GET:
+        return JsonResponse({'cursor': latest_cursor(), 'has_more': False, 'changes': []})
+    try:
+        since = int(request.GET['since'])
+    except ValueError:
+        return JsonResponse({'error': 'since must be a cursor from an earlier response'}, status=400)
+    changes, cursor, has_more = changes_since(request.user, since, settings.CHANGE_FEED_PAGE_SIZE)
+    return JsonResponse({'cursor': cursor, 'has_more': has_more, 'changes': changes})
+
 @login_required
 def mark_as_seen(request):
     task_id = request.GET.get('task_id')
@@ -143,19 +205,35 @@ def delete_team(request, team_id):
         messages.add_message(request, messages.ERROR, "This team was already deleted")
         return redirect('dashboard')
     
+def assignee_page(team, task, params):
+    """Return a page of the team's members with unassigned=False for those assigned to the task (listed first).
+
+    ?q= keeps the members whose username, first or last name starts with it, after= is where the last page ended.
+    """
+    assigned = Exists(Task.assigned_to.through.objects.filter(task=task, user=OuterRef('pk')))
+    #a Case rather than ~Exists, as SQLite reads NOT EXISTS (...) > 1 as NOT (EXISTS (...) > 1) in the page's filter
+    members = team.members.annotate(unassigned=Case(When(assigned, then=Value(False)), default=Value(True), output_field=BooleanField()))
+    text = params.get("q", "").strip().lstrip("@")
+    if text:
+        members = members.filter(Q(username__istartswith=f"@{text}") | Q(first_name__istartswith=text) | Q(last_name__istartswith=text))
+    return keyset_paginate(members, ('unassigned', 'username', 'id'), settings.ASSIGNEE_PAGE_SIZE, after=params.get("after"))
+
+def team_members_page(team, params):
+    """Return the page of the team's members (sorted by name) from where the last page ended (after=) or started (before=)."""
+
+    return keyset_paginate(team.members.all(), ('last_name', 'first_name', 'id'), settings.TEAM_MEMBERS_PAGE_SIZE,
+                           after=params.get("after"), before=params.get("before"))
+
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=show_team_etag)
 def show_team(request, team_id):
     #Make sure this team and task have not been deleted
-    if Team.objects.filter(pk=team_id).exists():
-        user = get_user(request)
-        team = Team.objects.get(pk=team_id)
+    team = Team.objects.select_related('admin_user').filter(pk=team_id).first()
+    if team is not None:
+        user = request.user
         is_admin = user == team.admin_user
-        team_members = team.members.all()
-        #Paginate the team members
-        paginator = Paginator(team.members.all(), 5) 
         if request.method == "POST":
-            page_number = request.POST.get("page")
-            page_obj = paginator.get_page(page_number)
             # User has added someone to the team
             if request.POST.get("userToAdd"):
                 userToAddString = request.POST['userToAdd']
@@ -174,16 +252,17 @@ def show_team(request, team_id):
                 else:
                     queried_users = User.objects.filter(first_name__iexact = q) | User.objects.filter(last_name__iexact = q)
                     
-                if(queried_users.count() > 0):
-                    page_number = request.POST.get("page")
-                    page_obj = paginator.get_page(page_number)
-                    return render(request, "show_team.html",{"q":q, "users":queried_users, "team": team, "team_id" : team_id, 'team_members': team_members, "page_obj": page_obj, 'is_admin':is_admin})
+                if queried_users.exists():
+                    #only offer to add users who aren't in the team already
+                    queried_users = queried_users.exclude(membership=team)
+                    page_obj = team_members_page(team, request.POST)
+                    return render(request, "show_team.html",{"q":q, "users":queried_users, "team": team, "team_id" : team_id, 'team_members': page_obj, "page_obj": page_obj, 'is_admin':is_admin})
             else:
-                return render(request, 'show_team.html', {'team' : team, 'team_members':team_members, 'is_admin':is_admin, "page_obj": page_obj})
+                page_obj = team_members_page(team, request.POST)
+                return render(request, 'show_team.html', {'team' : team, 'team_members':page_obj, 'is_admin':is_admin, "page_obj": page_obj})
                 
-        page_number = request.GET.get("page")
-        page_obj = paginator.get_page(page_number)
-        return render(request, 'show_team.html', {'team' : team, "page_obj": page_obj, 'team_members': team_members, 'is_admin':is_admin, 'notifications_list': request.notifications_list })
+        page_obj = team_members_page(team, request.GET)
+        return render(request, 'show_team.html', {'team' : team, "page_obj": page_obj, 'team_members': page_obj, 'is_admin':is_admin, 'notifications_list': request.notifications_list })
     else:
         #no team
         messages.add_message(request, messages.ERROR, "This team was deleted")
@@ -219,12 +298,15 @@ def remove_task(request,task_id):
         return redirect("dashboard")
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=view_task_etag)
 def view_task(request, team_id=1, task_id=1):
+    team = Team.objects.filter(pk=team_id).first()
+    #only the team's own tasks, as the page (and its cached assignee list) is the team's
+    task = Task.objects.filter(pk=task_id, created_by=team).first() if team is not None else None
     #Make sure this team and task have not been deleted
-    if Team.objects.filter(pk = team_id).exists() and Task.objects.filter(pk=task_id).exists():
-        team = Team.objects.get(pk=team_id)
-        task = Task.objects.get(pk=task_id)
-        user =  get_user(request)
+    if team is not None and task is not None:
+        user = request.user
         alert_message = remove_message = None
         selected_users = (None, None)
         if request.method == "POST":
@@ -276,7 +358,10 @@ def view_task(request, team_id=1, task_id=1):
             form.fields['due_date'].initial = task.due_date
             form.fields['priority'].disabled = True
             form.fields['reminder_days'].disabled = True
-        form2 = AssignTaskForm(specific_team=team, specific_task=task)
+        #whether anyone (and the user) is assigned, in one query however many are
+        assignments = task.assigned_to.aggregate(count=Count('id'), mine=Count('id', filter=Q(pk=user.pk)))
+        is_assigned = assignments['mine'] > 0
+        is_admin = team.admin_user_id == user.pk
 
 
         # Checking if a user has been added / removed to a task
@@ -286,28 +371,28 @@ def view_task(request, team_id=1, task_id=1):
             remove_message = None
 
         # Checking if no users have been assigned to a task
-        if not form2.get_assigned_users(task):
+        if not assignments['count']:
             alert_message = "This task has no assigned users." 
 
-        
-
-        # Calculate total time spent on a task
-        time_spent_queryset = TimeSpent.objects.filter(task=task)
-        total_time_spent = sum(instance.time_spent for instance in time_spent_queryset)
+        # Time spent on the task by each member, and in total, from one grouped query
+        time_by_member = list(TimeSpent.time_by_member(task))
+        total_time_spent = sum(member['total'] for member in time_by_member)
 
         context = {
             'team': team,
             'task': task,
             'form': form,
-            'form2': form2,
+            #the first page of the assignee picker, only fetched if it isn't cached
+            'assignees': assignee_page(team, task, {}),
             'alert_message': alert_message,
             'remove_message': remove_message,
             'new_users': selected_users[0],
             'removed_users': selected_users[1],
-            'is_admin' : team.admin_user==user,
-            'can_mark_as_complete': task.assigned_to.contains(user) or team.admin_user==user,
-            'is_assigned':  task.assigned_to.contains(user),
+            'is_admin' : is_admin,
+            'can_mark_as_complete': is_assigned or is_admin,
+            'is_assigned':  is_assigned,
             'total_time_spent': total_time_spent,
+            'time_by_member': time_by_member,
             'notifications_list': request.notifications_list
         }
         return render(request, 'task_information.html', context)
@@ -322,15 +407,24 @@ def user_activity_log(request, team_id, user_id):
     if not Team.objects.filter(pk=team_id).exists():
         messages.add_message(request, messages.ERROR, "This team was deleted")
         return redirect('dashboard')
-    if Activity_Log.objects.filter(user=user).exists():
-        log = Activity_Log.objects.get(user=user)
-        log.log.reverse() #reverse to have it in order of most recent
-        paginator = Paginator(log.log, 10)  # Show 10 logs per page
-        page_number = request.GET.get("page")
-        page_obj = paginator.get_page(page_number)
-        return render(request, "activity_log.html", {"page_obj": page_obj})
-    #otherwise, redirect them back to show team
-    return redirect('show_team', team_id=team_id)
+    #most recent first, the database only sends back the page we are showing
+    events = ActivityEvent.objects.filter(actor=user).order_by('-timestamp', '-id')
+    if not events.exists():
+        #redirect them back to show team
+        return redirect('show_team', team_id=team_id)
+    #the date and event type filters are done in the database as well
+    form = ActivityLogFilterForm(request.GET)
+    if form.is_valid():
+        events = form.filter(events)
+    else:
+        events = events.none()
+    paginator = Paginator(events, 10)  # Show 10 logs per page
+    page_number = request.GET.get("page")
+    page_obj = paginator.get_page(page_number)
+    #keep the filters when changing page
+    filter_query = request.GET.copy()
+    filter_query.pop('page', None)
+    return render(request, "activity_log.html", {"page_obj": page_obj, "form": form, "filter_query": filter_query.urlencode()})
 
 @login_required
 def summary_report(request):
@@ -372,38 +466,39 @@ def submit_time(request, team_id, task_id):
 def reset_time(request, team_id, task_id):
     if Team.objects.filter(pk = team_id).exists() and Task.objects.filter(pk=task_id).exists():
         action = request.GET.get('action')
-        task = Task.objects.get(pk=task_id)
-        user = request.user
 
-        # Reset ALL time spent
+        # Reset ALL time spent, and delete all time logs associated with the task
         if action == 'total':
-            all_user_time_spent = TimeSpent.objects.filter(task=task)
-            for user_time_spent in all_user_time_spent:
-                user_time_spent.time_spent = 0
-                user_time_spent.save()
-            # Delete all time logs associated with the task
-            TimeLog.objects.filter(task=task).delete() 
-
-        # Reset only the user's time spent
+            TimeSpent.reset([task_id])
+
+        # Reset only the user's time spent, and delete all time logs associated with the user on the task
         elif action == 'user':
-            try:
-                user_time_spent = TimeSpent.objects.get(
-                    user=user,
-                    task=task,
-                )
-            except TimeSpent.DoesNotExist:
-                return redirect('view_task', team_id=team_id, task_id=task_id) 
-            user_time_spent.time_spent = 0
-            user_time_spent.save()
-            # Delete all time logs associated with the user on the task
-            TimeLog.objects.filter(user=user, task=task).delete()
+            TimeSpent.reset([task_id], user=request.user)
 
         return redirect('view_task', team_id=team_id, task_id=task_id) 
     else:
         messages.add_message(request, messages.ERROR, "This task was deleted")
         return redirect('dashboard')
 
-    
+@login_required
+def reset_team_time(request, team_id):
+    """Reset the time spent on the team's tasks to 0 for everyone, for the team admin.
+
+    Only the tasks in task_ids are reset if it is posted, otherwise all of the team's tasks are.
+    """
+    team = Team.objects.filter(pk=team_id).first()
+    if team is None:
+        messages.add_message(request, messages.ERROR, "This team was deleted")
+        return redirect('dashboard')
+    if request.method == 'POST' and team.admin_user_id == request.user.pk:
+        tasks = Task.objects.filter(created_by=team)
+        task_ids = request.POST.getlist('task_ids')
+        if task_ids:
+            tasks = tasks.filter(pk__in=[task_id for task_id in task_ids if task_id.isdigit()])
+        TimeSpent.reset(tasks.values('pk'))
+        messages.add_message(request, messages.SUCCESS, "The time spent on the team's tasks was reset")
+    return redirect('show_team', team_id=team_id)
+
 @login_prohibited
 def home(request):
     """Display the application's start/home screen."""